@@ -32,8 +32,8 @@ from utils.static import (
     SESSION_FOLDER,
     STEAM_ACCOUNT_INFO_FILE_PATH,
 )
-from utils.steam_client import login_to_steam, steam_client_mutex
-from utils.tools import calculate_sha256, exit_code, get_encoding, pause
+from utils.steam_client import login_to_steam_accounts, steam_client_mutex
+from utils.tools import calculate_sha256, exit_code, get_encoding, get_memory_usage, log_memory_per_account, pause
 
 config = {}
 
@@ -282,6 +282,17 @@ def init_plugins_and_start(plugins_enabled):
         logger.warning("所有插件都已经退出！这不是一个正常情况，请检查配置文件！")
 
 
+# 插件运行后定期输出每个账号平均占用的内存, 用于评估多账号模式的内存开销
+def start_memory_monitor(account_count: int, baseline, interval: int = 1800, warmup: int = 300):
+    def monitor():
+        time.sleep(warmup)
+        while True:
+            log_memory_per_account(account_count, baseline, "[运行中] ")
+            time.sleep(interval)
+
+    threading.Thread(target=monitor, daemon=True).start()
+
+
 tried_exit = False
 
 
@@ -309,16 +320,18 @@ def main():
         pause()
         return 0
 
-    steam_client = None
-    steam_client = SteamClient("")
-    steam_client = login_to_steam(config)
-    if steam_client is None:
-        send_notification(steam_client, "登录Steam失败，程序停止运行")
+    memory_baseline = get_memory_usage()
+    steam_clients = login_to_steam_accounts(config)
+    if not steam_clients:
+        send_notification(None, "登录Steam失败，程序停止运行")
         pause()
         return 1
     # 仅用于获取启用的插件
     import_all_plugins()
-    plugins_enabled = get_plugins_enabled(steam_client, steam_client_mutex.get(steam_client.username))
+    # 每个账号各自拥有一组插件实例
+    plugins_enabled = []
+    for steam_client in steam_clients:
+        plugins_enabled += get_plugins_enabled(steam_client, steam_client_mutex.get(steam_client.username))
     # 检查插件是否正确初始化
     plugins_check_status = plugins_check(plugins_enabled)
     if plugins_check_status == 0:
@@ -326,9 +339,12 @@ def main():
         pause()
         return 1
 
-    if steam_client is not None:
+    log_memory_per_account(len(steam_clients), memory_baseline, "[登录完成] ")
+    start_memory_monitor(len(steam_clients), memory_baseline)
+
+    for steam_client in steam_clients:
         send_notification(steam_client, "Steamauto 已经成功登录Steam并开始运行")
-        init_plugins_and_start(plugins_enabled)
+    init_plugins_and_start(plugins_enabled)
 
     logger.info("由于所有插件已经关闭,程序即将退出...")
     pause()
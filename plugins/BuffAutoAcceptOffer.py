@@ -3,7 +3,7 @@ import time
 from BuffApi import BuffAccount
 from utils.buff_helper import get_valid_session_for_buff
 from utils.logger import PluginLogger, handle_caught_exception
-from utils.steam_client import accept_trade_offer
+from utils.steam_client import accept_trade_offers
 from utils.tools import exit_code
 
 
@@ -255,6 +255,7 @@ class BuffAutoAcceptOffer:
 
                     try:
                         if len(trades) != 0:
+                            to_accept = {}
                             for i, trade in enumerate(trades):
                                 offer_id = trade["tradeofferid"]
                                 self.logger.info(f"正在处理第 {i + 1} 个交易报价 报价ID：{offer_id}")
@@ -275,21 +276,15 @@ class BuffAutoAcceptOffer:
                                     process_this_offer = True
 
                                 if process_this_offer:
-                                    try:
-                                        self.logger.info("正在接受报价...")
-                                        desc = self.format_item_info(trade)
-                                        if accept_trade_offer(self.steam_client, self.steam_client_mutex, offer_id, desc=desc):
-                                            ignored_offer[offer_id] = 1  # 成功接受后，加入忽略字典，计数为1
-                                            self.logger.info("接受完成! 已经将此交易报价加入忽略名单!")
-                                        # else: # 可选：处理 accept_trade_offer 返回 False 但未抛出异常的情况
-                                        #     logger.warning(f"尝试接受报价 {offer_id} 失败，但未添加到忽略列表。")
-
-                                        if trades.index(trade) != len(trades) - 1:
-                                            self.logger.info("为了避免频繁访问Steam接口, 等待5秒后继续...")
-                                            time.sleep(5)
-                                    except Exception as e:
-                                        self.logger.error(f"处理交易报价时出错: {str(e)}", exc_info=True)
-                                        self.logger.info("出现错误, 稍后再试!")
+                                    to_accept[offer_id] = self.format_item_info(trade)
+
+                            if to_accept:
+                                # 所有报价统一进行一次手机确认
+                                self.logger.info(f"正在接受 {len(to_accept)} 个报价...")
+                                for offer_id, accepted in accept_trade_offers(self.steam_client, self.steam_client_mutex, to_accept).items():
+                                    if accepted:
+                                        ignored_offer[offer_id] = 1  # 成功接受后，加入忽略字典，计数为1
+                                        self.logger.info(f"报价 {offer_id} 接受完成! 已经将此交易报价加入忽略名单!")
 
                     except Exception as e:
                         handle_caught_exception(e, "BuffAutoAcceptOffer")
@@ -84,9 +84,6 @@ class C5AutoAcceptOffer:
                     ):
                         logger.info(f"订单 {deliveringOrder['name']} 发货完成")
                         ignored_list.append(offerId)
-                        if deliveringOrders.index(deliveringOrder) != len(deliveringOrders) - 1:
-                            logger.info("为避免频繁访问Steam接口，等待3秒后处理下一个订单")
-                            time.sleep(3)
                     else:
                         logger.error(f"订单 {deliveringOrder['name']} 发货失败，请检查网络或者Steam账号！")
             except Exception as e:
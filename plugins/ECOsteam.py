@@ -3,7 +3,7 @@ import datetime
 import json
 import os
 import time
-from threading import Thread
+from threading import Event, Lock, Thread
 from typing import Dict, List, Union
 
 from BuffApi import BuffAccount
@@ -17,15 +17,11 @@ from utils.models import Asset, LeaseAsset, ModelEncoder
 from utils.static import ECOSTEAM_RSAKEY_FILE
 from utils.steam_client import accept_trade_offer, external_handler, get_cs2_inventory
 from utils.tools import exit_code, get_encoding
+from utils.trade_delta import TradeDelta, get_trade_delta_worker
+from utils.trade_history import get_trade_history_store
 from utils.uu_helper import get_valid_token_for_uu
 from uuyoupinapi import UUAccount
 
-sync_sell_shelf_enabled = False
-sync_lease_shelf_enabled = False
-
-uu_queue = None
-eco_queue = None
-
 logger = PluginLogger("ECOsteam.cn")
 sell_logger = PluginLogger("[ECOsteam.cn] [同步多平台出售]")
 lease_logger = PluginLogger("[ECOsteam.cn] [同步租赁货架]")
@@ -222,9 +218,20 @@ class ECOsteamPlugin:
     def __init__(self, steam_client: SteamClient, steam_client_mutex, config):
         self.steam_client = steam_client
         self.steam_client_mutex = steam_client_mutex
-        self.config = config
+        # 同步货架时会按账号调整 enabled_platforms, 多账号模式下各实例使用各自的配置副本
+        self.config = copy.deepcopy(config)
         self.ignored_offer = []
         self.steam_id = steam_client.get_steam64id_from_cookies()
+        # 多账号模式下每个账号各有一个插件实例, 同步状态与任务队列均按实例保存
+        self.sync_sell_shelf_enabled = False
+        self.sync_lease_shelf_enabled = False
+        self.uu_queue = None
+        self.eco_queue = None
+        self.trade_history = get_trade_history_store(self.steam_id)
+        # 交易完成后由 TradeDeltaWorker 推送的已转出资产, 在下次处理任务队列前从队列中移除
+        self.traded_assetids = set()
+        self.traded_assetids_lock = Lock()
+        self.shelf_changed = Event()
 
     def init(self):
         if not os.path.exists(ECOSTEAM_RSAKEY_FILE):
@@ -271,7 +278,7 @@ class ECOsteamPlugin:
             exit_code.set(1)
             return 1
         if exist and len(accounts_list) > 1:
-            logger.warning(f"检测到你的ECOsteam绑定了多个Steam账号。插件的所有操作仅对SteamID为{self.steam_id}的账号生效！如需同时操作多个账号，请多开Steamauto实例！")
+            logger.info(f"检测到你的ECOsteam绑定了多个Steam账号，当前插件实例仅处理SteamID为{self.steam_id}的账号")
 
         threads = []
         threads.append(Thread(target=self.auto_accept_offer))
@@ -285,6 +292,24 @@ class ECOsteamPlugin:
         else:
             self.auto_accept_offer()
 
+    # 增量同步本地交易历史, 货架中的物品不在库存中时可直接在本地查询其去向
+    def sync_trade_history(self):
+        try:
+            with self.steam_client_mutex:
+                self.trade_history.sync(self.steam_client)
+        except Exception as e:
+            handle_caught_exception(e, "ECOsteam.cn", known=True)
+            logger.warning("同步Steam交易历史失败，将在下次同步时重试")
+
+    # 通过本地交易历史查询资产的去向
+    def describe_missing_asset(self, assetid) -> str:
+        given = [record for record in self.trade_history.get_asset_history(assetid) if record["direction"] == "given" and record["assetid"] == str(assetid)]
+        if not given:
+            return ""
+        record = given[-1]
+        trade_time = datetime.datetime.fromtimestamp(record["time_init"]).strftime("%Y-%m-%d %H:%M:%S")
+        return f"（该物品已于{trade_time}在交易{record['tradeid']}中转出）"
+
     # 获取各平台出售货架
     def get_shelf(self, platform, inventory):
         # 如果需要下架
@@ -303,7 +328,7 @@ class ECOsteamPlugin:
                     asset.market_hash_name = inventory[asset.assetid]["market_hash_name"]
                     assets.append(asset)
                 except KeyError:
-                    sell_logger.warning(f"检测到ECOsteam上架物品 {item['GoodsName']} 不在Steam库存中！")
+                    sell_logger.warning(f"检测到ECOsteam上架物品 {item['GoodsName']} 不在Steam库存中！{self.describe_missing_asset(asset.assetid)}")
                     assets.append(asset.orderNo)
             return assets
         elif platform == "buff":
@@ -321,7 +346,9 @@ class ECOsteamPlugin:
                     asset.market_hash_name = inventory[asset.assetid]["market_hash_name"]
                     assets.append(asset)
                 except KeyError:
-                    sell_logger.warning(f"检测到BUFF上架物品 {data['goods_infos'][str(item['goods_id'])]['market_hash_name']} 不在Steam库存中！")
+                    sell_logger.warning(
+                        f"检测到BUFF上架物品 {data['goods_infos'][str(item['goods_id'])]['market_hash_name']} 不在Steam库存中！{self.describe_missing_asset(asset.assetid)}"
+                    )
                     assets.append(asset.orderNo)
             return assets
         elif platform == "uu":
@@ -336,7 +363,7 @@ class ECOsteamPlugin:
                     asset.market_hash_name = inventory[asset.assetid]["market_hash_name"]
                     assets.append(asset)
                 except KeyError:
-                    sell_logger.warning(f"检测到悠悠上架物品 {item['name']} 不在Steam库存中！")
+                    sell_logger.warning(f"检测到悠悠上架物品 {item['name']} 不在Steam库存中！{self.describe_missing_asset(asset.assetid)}")
                     assets.append(asset.orderNo)
             return assets
 
@@ -403,27 +430,25 @@ class ECOsteamPlugin:
 
     # 自动同步上架启动线程
     def auto_sync_shelves(self):
-        global sync_lease_shelf_enabled
-        global sync_sell_shelf_enabled
         # 配置检查
         if self.config["ecosteam"]["auto_sync_sell_shelf"]["enable"]:
             config_sync_sell_shelf = self.config["ecosteam"]["auto_sync_sell_shelf"]
-            sync_sell_shelf_enabled = True
+            self.sync_sell_shelf_enabled = True
             config_sync_sell_shelf["enabled_platforms"].append("eco")
             if config_sync_sell_shelf["main_platform"] not in config_sync_sell_shelf["enabled_platforms"]:
                 sell_logger.error("主平台必须在enabled_platforms中！请重新修改检查配置文件！")
-                sync_sell_shelf_enabled = False
+                self.sync_sell_shelf_enabled = False
             platforms = list(copy.deepcopy(config_sync_sell_shelf["enabled_platforms"]))
             while len(platforms) > 0:
                 platform = platforms.pop()
                 if not (platform == "uu" or platform == "eco" or platform == "buff"):
                     sell_logger.error("当前仅支持UU/ECO/BUFF平台，请检查配置！")
-                    sync_sell_shelf_enabled = False
+                    self.sync_sell_shelf_enabled = False
                     break
             if config_sync_sell_shelf["main_platform"] not in config_sync_sell_shelf["enabled_platforms"]:
                 sell_logger.error("由于主平台未启用，自动同步平台功能已经自动关闭")
-                sync_sell_shelf_enabled = False
-            if not sync_sell_shelf_enabled:
+                self.sync_sell_shelf_enabled = False
+            if not self.sync_sell_shelf_enabled:
                 sell_logger.error("由于配置错误，自动同步平台功能已经自动关闭")
                 return
 
@@ -453,7 +478,7 @@ class ECOsteamPlugin:
             # 检查是否有平台可用
             if len(config_sync_sell_shelf["enabled_platforms"]) == 1:
                 sell_logger.error("无平台可用。已经关闭自动同步出售货架功能！")
-                sync_sell_shelf_enabled = False
+                self.sync_sell_shelf_enabled = False
 
         if self.config["ecosteam"]["auto_sync_lease_shelf"]["enable"]:
             # 检查悠悠是否正常登录
@@ -469,23 +494,46 @@ class ECOsteamPlugin:
             if self.lease_main_platform != "uu" and self.lease_main_platform != "eco":
                 lease_logger.error("主平台配置必须为uu或eco！请检查配置文件！")
                 return
-            sync_lease_shelf_enabled = True
-        global uu_queue
-        global eco_queue
+            self.sync_lease_shelf_enabled = True
         if hasattr(self, "uu_client") and self.uu_client:
-            uu_queue = tasks(self.uu_client, self.steam_id)
-        eco_queue = tasks(self.client, self.steam_id)
+            self.uu_queue = tasks(self.uu_client, self.steam_id)
+        self.eco_queue = tasks(self.client, self.steam_id)
 
+        get_trade_delta_worker().subscribe(self.on_trade_delta)
         while True:
-            if sync_sell_shelf_enabled:
+            self.shelf_changed.clear()
+            self.sync_trade_history()
+            if self.sync_sell_shelf_enabled:
                 self.sync_sell_shelves()
-            if sync_lease_shelf_enabled:
+            if self.sync_lease_shelf_enabled:
                 self.sync_lease_shelves()
-            eco_queue.process()
-            if isinstance(uu_queue, tasks):
-                uu_queue.process()
+            self.drop_traded_assets()
+            self.eco_queue.process()
+            if isinstance(self.uu_queue, tasks):
+                self.uu_queue.process()
             logger.info(f"等待 {self.config['ecosteam']['sync_interval']} 秒后重新检查多平台上架物品")
-            time.sleep(self.config["ecosteam"]["sync_interval"])
+            if self.shelf_changed.wait(self.config["ecosteam"]["sync_interval"]):
+                logger.info("检测到Steam库存中有物品已转出，立即重新检查多平台上架物品")
+
+    # 交易增量回调, 运行在 TradeDeltaWorker 线程中, 只记录已转出的资产并唤醒同步线程
+    def on_trade_delta(self, delta: TradeDelta):
+        if delta.steamid != self.steam_id or not delta.removed:
+            return
+        with self.traded_assetids_lock:
+            self.traded_assetids.update(str(asset["assetid"]) for asset in delta.removed)
+        self.shelf_changed.set()
+
+    # 从待上架队列中移除已转出的资产, 避免上架已经不在库存中的物品
+    def drop_traded_assets(self):
+        with self.traded_assetids_lock:
+            traded_assetids = self.traded_assetids
+            self.traded_assetids = set()
+        for queue in (self.eco_queue, self.uu_queue):
+            if not isinstance(queue, tasks):
+                continue
+            for assetid in traded_assetids:
+                queue.sell_remove(assetid)
+                queue.lease_remove(assetid)
 
     # 自动同步租赁货架实现
     def sync_lease_shelves(self):
@@ -520,8 +568,8 @@ class ECOsteamPlugin:
             if self.lease_other_platform == "uu":
                 # 上架商品
                 if len(difference["add"]) > 0:
-                    if isinstance(uu_queue, tasks):
-                        uu_queue.lease_add(difference["add"])
+                    if isinstance(self.uu_queue, tasks):
+                        self.uu_queue.lease_add(difference["add"])
                         lease_logger.info(f"已经添加{len(difference['add'])}个商品到悠悠有品租赁上架队列")
                     else:
                         lease_logger.error("悠悠有品任务队列未初始化！")
@@ -535,16 +583,16 @@ class ECOsteamPlugin:
                         lease_logger.error(f"下架过程中出现失败！错误信息：{rsp['Msg']}")
                 # 修改价格
                 if len(difference["change"]) > 0:
-                    if isinstance(uu_queue, tasks):
-                        uu_queue.lease_change(difference["change"])
+                    if isinstance(self.uu_queue, tasks):
+                        self.uu_queue.lease_change(difference["change"])
                         lease_logger.info(f"已经添加{len(difference['change'])}个商品到悠悠有品租赁改价队列")
                     else:
                         lease_logger.error("悠悠有品任务队列未初始化！")
             elif self.lease_other_platform == "eco":
                 # 上架商品
                 if len(difference["add"]) > 0:
-                    if isinstance(eco_queue, tasks):
-                        eco_queue.lease_add(difference["add"])
+                    if isinstance(self.eco_queue, tasks):
+                        self.eco_queue.lease_add(difference["add"])
                         lease_logger.info(f"已经添加{len(difference['add'])}个商品到ECOsteam租赁上架队列")
                     else:
                         lease_logger.error("ECOsteam.cn任务队列未初始化！")
@@ -568,8 +616,8 @@ class ECOsteamPlugin:
 
                 # 修改价格
                 if len(difference["change"]) > 0:
-                    if isinstance(eco_queue, tasks):
-                        eco_queue.lease_change(difference["change"])
+                    if isinstance(self.eco_queue, tasks):
+                        self.eco_queue.lease_change(difference["change"])
                         lease_logger.info(f"已经添加{len(difference['change'])}个商品到ECOsteam租赁改价队列")
                     else:
                         lease_logger.error("ECOsteam.cn任务队列未初始化！")
@@ -650,8 +698,8 @@ class ECOsteamPlugin:
         if platform == "eco":
             # 上架商品
             if len(difference["add"]) > 0:
-                if isinstance(eco_queue, tasks):
-                    eco_queue.sell_add(difference["add"])
+                if isinstance(self.eco_queue, tasks):
+                    self.eco_queue.sell_add(difference["add"])
                     sell_logger.info(f"已经添加 {len(difference['add'])} 个商品到ECOsteam出售上架队列")
                 else:
                     sell_logger.error("ECOsteam.cn任务队列未初始化！")
@@ -667,8 +715,8 @@ class ECOsteamPlugin:
 
             # 修改价格
             if len(difference["change"]) > 0:
-                if isinstance(eco_queue, tasks):
-                    eco_queue.sell_change(difference["change"])
+                if isinstance(self.eco_queue, tasks):
+                    self.eco_queue.sell_change(difference["change"])
                     sell_logger.info(f"已经添加 {len(difference['change'])} 个商品到ECOsteam出售改价队列")
                 else:
                     sell_logger.error("ECOsteam.cn任务队列未初始化！")
@@ -732,8 +780,8 @@ class ECOsteamPlugin:
         elif platform == "uu":
             # 上架商品
             if len(difference["add"]) > 0:
-                if isinstance(uu_queue, tasks):
-                    uu_queue.sell_add(difference["add"])
+                if isinstance(self.uu_queue, tasks):
+                    self.uu_queue.sell_add(difference["add"])
                     sell_logger.info(f"已经添加 {len(difference['add'])} 个商品到悠悠有品出售上架队列")
                 else:
                     sell_logger.error("悠悠有品任务队列未初始化！")
@@ -751,8 +799,8 @@ class ECOsteamPlugin:
 
             # 修改价格
             if len(difference["change"]) > 0:
-                if isinstance(uu_queue, tasks):
-                    uu_queue.sell_change(difference["change"])
+                if isinstance(self.uu_queue, tasks):
+                    self.uu_queue.sell_change(difference["change"])
                     sell_logger.info(f"已经添加 {len(difference['change'])} 个商品到悠悠有品出售改价队列")
                 else:
                     sell_logger.error("悠悠有品任务队列未初始化！")
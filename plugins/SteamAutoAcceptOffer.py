@@ -1,10 +1,13 @@
 import json
-import os
-import pickle
+import queue
 import time
 
+from steampy.models import TradeOfferState
 from utils.logger import PluginLogger, handle_caught_exception
-from utils.static import SESSION_FOLDER
+from utils.steam_client import get_trade_offer_watcher, save_session_snapshot
+
+# 会话有效的探测结果缓存时间(秒)
+SESSION_CHECK_MAX_AGE = 600
 
 
 class SteamAutoAcceptOffer:
@@ -18,63 +21,73 @@ class SteamAutoAcceptOffer:
     def init(self):
         return False
 
+    def _on_trade_offer(self, offer, old_state):
+        # 只处理收到的活跃报价
+        if offer.get("is_our_offer") or offer.get("trade_offer_state") != TradeOfferState.Active:
+            return
+        self._offer_queue.put(offer)
+
     def exec(self):
+        offer_queue = self._offer_queue = queue.Queue()
+        watcher = get_trade_offer_watcher(self.steam_client, self.steam_client_mutex, self.config["steam_auto_accept_offer"]["interval"])
+        watcher.subscribe(self._on_trade_offer)
+        retry_offers = []
         while True:
             try:
-                with self.steam_client_mutex:
-                    if not self.steam_client.is_session_alive():
+                # 会话状态由真实请求被动维护, 只有过期或出现失效迹象时才会发起探测, 且无需持有账号锁
+                if not self.steam_client.is_session_alive(max_age=SESSION_CHECK_MAX_AGE):
+                    with self.steam_client_mutex:
                         self.logger.info("Steam会话已过期, 正在重新登录...")
                         self.steam_client.relogin()
                         self.logger.info("Steam会话已更新")
-                        steam_session_path = os.path.join(SESSION_FOLDER, self.steam_client.username.lower() + ".pkl")
-                        with open(steam_session_path, "wb") as f:
-                            pickle.dump(self.steam_client.session, f)
+                        save_session_snapshot(self.steam_client)
                 self.logger.info("正在检查待处理的交易报价...")
-                with self.steam_client_mutex:
-                    trade_summary = self.steam_client.get_trade_offers(merge=False)["response"]
+                watcher.refresh()
+                # 上一轮处理失败的报价, 与本轮新报价一起重试
+                trade_offers, retry_offers = retry_offers, []
+                # 重试的报价可能已被上一轮接受过, 缓存中的状态已经过期, 需要重新查询
+                retry_ids = {trade_offer["tradeofferid"] for trade_offer in trade_offers}
+                try:
+                    trade_offers.append(offer_queue.get(timeout=self.config["steam_auto_accept_offer"]["interval"]))
+                    while True:
+                        trade_offers.append(offer_queue.get_nowait())
+                except queue.Empty:
+                    pass
                 # 过滤掉已忽略的交易报价
-                for key, offer in trade_summary.items():
-                    if isinstance(offer, list):
-                        original_count = len(offer)
-                        # 使用列表推导式过滤掉已忽略的交易报价
-                        filtered_offers = [trade_offer for trade_offer in offer if trade_offer.get("tradeofferid", None) not in self.ignored_trade_offers]
-                        trade_summary[key] = filtered_offers
+                original_count = len(trade_offers)
+                trade_offers = [trade_offer for trade_offer in trade_offers if trade_offer.get("tradeofferid", None) not in self.ignored_trade_offers]
+                filtered_count = original_count - len(trade_offers)
+                if filtered_count > 0:
+                    self.logger.debug(f"已过滤掉 {filtered_count} 个被忽略的交易报价")
+                self.logger.info(f"检测到有{len(trade_offers)}个待处理的交易报价")
+                self.logger.debug(f"待处理的交易报价详情: {json.dumps(trade_offers, ensure_ascii=False)}")
 
-                        # 记录过滤掉的报价数量
-                        filtered_count = original_count - len(filtered_offers)
-                        if filtered_count > 0:
-                            self.logger.debug(f"已过滤掉 {filtered_count} 个被忽略的交易报价")
-                self.logger.info(f"检测到有{len(trade_summary['trade_offers_received'])}个待处理的交易报价")
-                self.logger.debug(f"待处理的交易报价简介: {json.dumps(trade_summary, ensure_ascii=False)}")
-
-                if len(trade_summary["trade_offers_received"]) > 0:
-                    with self.steam_client_mutex:
-                        trade_offers = self.steam_client.get_trade_offers(merge=False)["response"]
-                    self.logger.debug(f"待处理的交易报价详情: {json.dumps(trade_offers, ensure_ascii=False)}")
-                    if len(trade_offers["trade_offers_received"]) > 0:
-                        for trade_offer in trade_offers["trade_offers_received"]:
-                            self.logger.debug(
-                                f"\n报价[{trade_offer['tradeofferid']}] "
-                                f"\n支出: {len(trade_offer.get('items_to_give', {}))} 个物品"
-                                f"\n接收: {len(trade_offer.get('items_to_receive', {}))} 个物品"
-                            )
-                            if len(trade_offer.get("items_to_give", {})) == 0:
-                                self.logger.info(f"检测到报价[{trade_offer['tradeofferid']}]属于礼物报价，正在接受报价...")
-                                try:
-                                    with self.steam_client_mutex:
-                                        self.steam_client.accept_trade_offer(trade_offer["tradeofferid"])
-                                    self.logger.info(f"报价[{trade_offer['tradeofferid']}]接受成功！")
-                                except Exception as e:
-                                    if "Invalid trade offer state" in str(e):
-                                        self.logger.warning(f"报价[{trade_offer['tradeofferid']}]已被接受或取消，将被忽略")
-                                        self.ignored_trade_offers.append(trade_offer["tradeofferid"])
-                                        continue
-                                    handle_caught_exception(e, "SteamAutoAcceptOffer", known=True)
-                                    self.logger.error("Steam异常! 稍后再试")
+                for trade_offer in trade_offers:
+                    self.logger.debug(
+                        f"\n报价[{trade_offer['tradeofferid']}] "
+                        f"\n支出: {len(trade_offer.get('items_to_give', {}))} 个物品"
+                        f"\n接收: {len(trade_offer.get('items_to_receive', {}))} 个物品"
+                    )
+                    if len(trade_offer.get("items_to_give", {})) == 0:
+                        self.logger.info(f"检测到报价[{trade_offer['tradeofferid']}]属于礼物报价，正在接受报价...")
+                        try:
+                            with self.steam_client_mutex:
+                                # 首次处理时直接使用监视线程推送的报价, 省去一次报价查询
+                                watched_offer = None if trade_offer["tradeofferid"] in retry_ids else trade_offer
+                                self.steam_client.accept_trade_offer(trade_offer["tradeofferid"], watched_offer)
+                            self.logger.info(f"报价[{trade_offer['tradeofferid']}]接受成功！")
+                        except Exception as e:
+                            if "Invalid trade offer state" in str(e):
+                                self.logger.warning(f"报价[{trade_offer['tradeofferid']}]已被接受或取消，将被忽略")
+                                self.ignored_trade_offers.append(trade_offer["tradeofferid"])
+                                continue
+                            handle_caught_exception(e, "SteamAutoAcceptOffer", known=True)
+                            self.logger.error("Steam异常! 稍后再试")
+                            retry_offers.append(trade_offer)
 
-                            else:
-                                self.logger.info(f"检测到报价[{trade_offer['tradeofferid']}]需要支出物品，自动跳过处理")
+                    else:
+                        self.logger.info(f"检测到报价[{trade_offer['tradeofferid']}]需要支出物品，自动跳过处理")
             except Exception as e:
                 handle_caught_exception(e, "SteamAutoAcceptOffer")
                 self.logger.error("发生未知错误！稍后再试...")
-            time.sleep(self.config["steam_auto_accept_offer"]["interval"])
+                time.sleep(self.config["steam_auto_accept_offer"]["interval"])
@@ -1,9 +1,11 @@
+import queue
+import threading
 import time
 
 import uuyoupinapi
 from utils.logger import PluginLogger, handle_caught_exception
 from utils.notifier import send_notification
-from utils.steam_client import accept_trade_offer
+from utils.steam_client import accept_trade_offers
 from utils.tools import exit_code
 from utils.uu_helper import get_valid_token_for_uu
 
@@ -36,12 +38,13 @@ class UUAutoAcceptOffer:
                 try:
                     self.uuyoupin.send_device_info()
                     self.logger.info("正在检查悠悠有品待发货信息...")
-                    uu_wait_deliver_list = self.uuyoupin.get_wait_deliver_list()
-                    len_uu_wait_deliver_list = len(uu_wait_deliver_list)
-                    self.logger.info("" + str(len_uu_wait_deliver_list) + "个悠悠有品待发货订单")
-                    if len(uu_wait_deliver_list) != 0:
-                        for item in uu_wait_deliver_list:
-                            accepted = False
+                    len_uu_wait_deliver_list = 0
+                    # 报价号在后台逐个解析, 已解析出的订单先行发货, 不必等待全部订单查询完成
+                    for batch in self._iter_wait_deliver_batches():
+                        len_uu_wait_deliver_list += len(batch)
+                        to_accept = {}
+                        order_ids = {}
+                        for item in batch:
                             self.logger.info(f"正在接受悠悠有品待发货报价, 商品名: {item['item_name']}, 报价ID: {item['offer_id']}")
                             if item["offer_id"] is None:
                                 self.logger.warning("此订单为需要手动发货(或异常)的订单, 不能自动处理, 跳过此订单! ")
@@ -49,13 +52,16 @@ class UUAutoAcceptOffer:
                                 self.logger.info("此交易报价已经被Steamauto处理过, 出现此提示的原因是悠悠系统延迟或者该订单为批量购买订单.这不是一个报错!")
                                 ignored_offer[item["offer_id"]] += 1
                             else:
-                                if accept_trade_offer(self.steam_client, self.steam_client_mutex, str(item["offer_id"]), desc=f"发货平台：悠悠有品\n发货饰品：{item['item_name']}"):
-                                    ignored_offer[str(item["offer_id"])] = 1
-                                    self.logger.info(f"接受报价[{str(item['offer_id'])}]完成!")
-                                    accepted = True
-                            if (uu_wait_deliver_list.index(item) != len_uu_wait_deliver_list - 1) and accepted:
-                                self.logger.info("为了避免频繁访问Steam接口, 等待5秒后继续...")
-                                time.sleep(5)
+                                to_accept[str(item["offer_id"])] = f"发货平台：悠悠有品\n发货饰品：{item['item_name']}"
+                                order_ids[str(item["offer_id"])] = item.get("order_id")
+                        # 同一批报价统一进行一次手机确认
+                        for offer_id, accepted in accept_trade_offers(self.steam_client, self.steam_client_mutex, to_accept).items():
+                            if accepted:
+                                ignored_offer[offer_id] = 1
+                                self.logger.info(f"接受报价[{offer_id}]完成!")
+                            elif order_ids.get(offer_id):
+                                self.uuyoupin.offer_id_cache.invalidate(order_ids[offer_id])
+                    self.logger.info("" + str(len_uu_wait_deliver_list) + "个悠悠有品待发货订单")
                 except Exception as e:
                     if "登录状态失效，请重新登录" in str(e):
                         handle_caught_exception(e, "UUAutoAcceptOffer", known=True)
@@ -69,3 +75,37 @@ class UUAutoAcceptOffer:
                         self.logger.error("出现未知错误, 稍后再试! ")
                 self.logger.info("将在{0}秒后再次检查待发货订单信息!".format(str(interval)))
                 time.sleep(interval)
+
+    def _iter_wait_deliver_batches(self):
+        """
+        在后台线程中消费 iter_wait_deliver_list, 每次返回当前已解析出的全部订单
+        """
+        results = queue.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for item in self.uuyoupin.iter_wait_deliver_list():
+                    results.put(item)
+            except Exception as e:
+                results.put(e)
+            finally:
+                results.put(done)
+
+        threading.Thread(target=produce, daemon=True).start()
+        finished = False
+        while not finished:
+            batch = [results.get()]
+            while True:
+                try:
+                    batch.append(results.get_nowait())
+                except queue.Empty:
+                    break
+            if done in batch:
+                finished = True
+                batch.remove(done)
+            for item in batch:
+                if isinstance(item, Exception):
+                    raise item
+            if batch:
+                yield batch
@@ -1,5 +1,5 @@
-import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import json5
 import schedule
@@ -8,6 +8,7 @@ import uuyoupinapi
 from utils.logger import PluginLogger, handle_caught_exception
 from utils.models import LeaseAsset
 from utils.notifier import send_notification
+from utils.price_cache import get_price_cache
 from utils.tools import exit_code, is_subsequence
 from utils.uu_helper import get_valid_token_for_uu
 from uuyoupinapi import models
@@ -23,7 +24,6 @@ class UUAutoLeaseItem:
         self.config = config
         self.timeSleep = 10
         self.inventory_list = []
-        self.lease_price_cache = {}
         self.compensation_type = 0
         self.steam_client = steam_client
 
@@ -42,56 +42,83 @@ class UUAutoLeaseItem:
         return False
 
     def get_lease_price(self, template_id, min_price=0, max_price=20000, cnt=15):
-        if template_id in self.lease_price_cache:
-            if datetime.datetime.now() - self.lease_price_cache[template_id]["cache_time"] <= datetime.timedelta(minutes=20):
-                commodity_name = self.lease_price_cache[template_id]["commodity_name"]
-                lease_unit_price = self.lease_price_cache[template_id]["lease_unit_price"]
-                long_lease_unit_price = self.lease_price_cache[template_id]["long_lease_unit_price"]
-                lease_deposit = self.lease_price_cache[template_id]["lease_deposit"]
-                self.logger.info(f"物品 {commodity_name} 使用缓存价格设置，短租价格：{lease_unit_price:.2f}，长租价格：{long_lease_unit_price:.2f}，押金：{lease_deposit:.2f}")
-                return {
-                    "LeaseUnitPrice": lease_unit_price,
-                    "LongLeaseUnitPrice": long_lease_unit_price,
-                    "LeaseDeposit": lease_deposit,
-                }
+        # 缓存中只保存市场上的原始租金数据(与筛选条件一一对应), 定价公式与比例定价等配置在取出后再应用, 修改配置后立即生效
+        ttl = self.config["uu_auto_lease_item"].get("price_cache_minutes", 20) * 60
+        market, from_cache = get_price_cache().get_or_load(
+            (template_id, "lease_market", (min_price, max_price, cnt)),
+            lambda: self._query_lease_market(template_id, min_price, max_price, cnt),
+            ttl,
+            cache_if=lambda market: len(market["lease_unit_prices"]) > 0,
+        )
+        if from_cache:
+            self.logger.info(f"物品 {market['commodity_name']} 使用缓存的市场租金数据")
+        price = self._calculate_lease_price(market, min_price)
+        return {
+            "LeaseUnitPrice": price["lease_unit_price"],
+            "LongLeaseUnitPrice": price["long_lease_unit_price"],
+            "LeaseDeposit": price["lease_deposit"],
+        }
+
+    def get_lease_prices(self, template_prices: dict) -> dict:
+        """
+        并发查询多个模板的租金, template_prices 为 {template_id: 市场价}, 返回 {template_id: get_lease_price 的结果}
+        请求速率由 UUAccount.rate_budget 控制, 触发风控时自动降速
+        """
+        result = {}
+        if not template_prices:
+            return result
+        workers = self.config["uu_auto_lease_item"].get("price_query_workers", 4)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(template_prices)))) as executor:
+            futures = {
+                executor.submit(self.get_lease_price, template_id, min_price=price, max_price=price * 2): template_id for template_id, price in template_prices.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    result[futures[future]] = future.result()
+                except Exception as e:
+                    handle_caught_exception(e, "UUAutoLeaseItem", known=True)
+                    self.logger.error(f"查询模板 {futures[future]} 的租金失败")
+        return result
+
+    def _query_lease_market(self, template_id, min_price=0, max_price=20000, cnt=15):
         max_price = 20000 if max_price == 0 else max_price
         rsp_list = self.uuyoupin.get_market_lease_price(template_id, min_price=min_price, max_price=max_price, cnt=cnt)
+        market = {"commodity_name": "", "lease_unit_prices": [], "long_lease_unit_prices": [], "lease_deposits": []}
         if len(rsp_list) > 0:
             rsp_cnt = len(rsp_list)
-            commodity_name = rsp_list[0].CommodityName
-
-            lease_unit_price_list = []
-            long_lease_unit_price_list = []
-            lease_deposit_list = []
+            market["commodity_name"] = rsp_list[0].CommodityName
             for i, item in enumerate(rsp_list):
                 if item.LeaseUnitPrice and i < min(10, rsp_cnt):
-                    lease_unit_price_list.append(float(item.LeaseUnitPrice))
+                    market["lease_unit_prices"].append(float(item.LeaseUnitPrice))
                     if item.LeaseDeposit:
-                        lease_deposit_list.append(float(item.LeaseDeposit))
+                        market["lease_deposits"].append(float(item.LeaseDeposit))
                 if item.LongLeaseUnitPrice:
-                    long_lease_unit_price_list.append(float(item.LongLeaseUnitPrice))
-
-            if len(lease_unit_price_list) > 0:
-                lease_unit_price = _mean(lease_unit_price_list) * 0.97
-                lease_unit_price = max(lease_unit_price, float(lease_unit_price_list[0]), 0.01)
-            else:
-                lease_unit_price = 0
-
-            if len(long_lease_unit_price_list) == 0:
-                long_lease_unit_price = max(lease_unit_price - 0.01, 0.01) if lease_unit_price > 0 else 0
-            else:
-                long_lease_unit_price = min(lease_unit_price * 0.98, _mean(long_lease_unit_price_list) * 0.95)
-                long_lease_unit_price = max(long_lease_unit_price, float(long_lease_unit_price_list[0]), 0.01)
+                    market["long_lease_unit_prices"].append(float(item.LongLeaseUnitPrice))
+            self.logger.info(f"短租参考价格：{market['lease_unit_prices']}，长租参考价格：{market['long_lease_unit_prices']}")
+        return market
+
+    def _calculate_lease_price(self, market, min_price=0):
+        commodity_name = market["commodity_name"]
+        lease_unit_price_list = market["lease_unit_prices"]
+        long_lease_unit_price_list = market["long_lease_unit_prices"]
+        lease_deposit_list = market["lease_deposits"]
+
+        if len(lease_unit_price_list) > 0:
+            lease_unit_price = _mean(lease_unit_price_list) * 0.97
+            lease_unit_price = max(lease_unit_price, float(lease_unit_price_list[0]), 0.01)
+        else:
+            lease_unit_price = 0
 
-            if len(lease_deposit_list) > 0:
-                lease_deposit = max(_mean(lease_deposit_list) * 0.98, float(min(lease_deposit_list)))
-            else:
-                lease_deposit = 0
+        if len(long_lease_unit_price_list) == 0:
+            long_lease_unit_price = max(lease_unit_price - 0.01, 0.01) if lease_unit_price > 0 else 0
+        else:
+            long_lease_unit_price = min(lease_unit_price * 0.98, _mean(long_lease_unit_price_list) * 0.95)
+            long_lease_unit_price = max(long_lease_unit_price, float(long_lease_unit_price_list[0]), 0.01)
 
-            self.logger.info(f"短租参考价格：{lease_unit_price_list}，长租参考价格：{long_lease_unit_price_list}")
+        if len(lease_deposit_list) > 0:
+            lease_deposit = max(_mean(lease_deposit_list) * 0.98, float(min(lease_deposit_list)))
         else:
-            lease_unit_price = long_lease_unit_price = lease_deposit = 0
-            commodity_name = ""
+            lease_deposit = 0
 
         lease_unit_price = round(lease_unit_price, 2)
         long_lease_unit_price = min(round(long_lease_unit_price, 2), lease_unit_price)
@@ -105,19 +132,11 @@ class UUAutoLeaseItem:
             self.logger.info(f"物品 {commodity_name}，启用比例定价，市场价 {min_price}，租金比例 {ratio}")
 
         self.logger.info(f"物品 {commodity_name}，短租价格：{lease_unit_price:.2f}，长租价格：{long_lease_unit_price:.2f}，押金：{lease_deposit:.2f}")
-        if lease_unit_price != 0:
-            self.lease_price_cache[template_id] = {
-                "commodity_name": commodity_name,
-                "lease_unit_price": lease_unit_price,
-                "long_lease_unit_price": long_lease_unit_price,
-                "lease_deposit": lease_deposit,
-                "cache_time": datetime.datetime.now(),
-            }
-
         return {
-            "LeaseUnitPrice": lease_unit_price,
-            "LongLeaseUnitPrice": long_lease_unit_price,
-            "LeaseDeposit": lease_deposit,
+            "commodity_name": commodity_name,
+            "lease_unit_price": lease_unit_price,
+            "long_lease_unit_price": long_lease_unit_price,
+            "lease_deposit": lease_deposit,
         }
 
     def auto_lease(self):
@@ -131,11 +150,10 @@ class UUAutoLeaseItem:
 
                 self.inventory_list = self.uuyoupin.get_inventory(refresh=True)
 
-                for i, item in enumerate(self.inventory_list):
+                candidates = []
+                for item in self.inventory_list:
                     if item["AssetInfo"] is None:
                         continue
-                    asset_id = item["SteamAssetId"]
-                    template_id = item["TemplateInfo"]["Id"]
                     short_name = item["ShotName"]
                     price = item["TemplateInfo"]["MarkPrice"]
                     if (
@@ -145,14 +163,17 @@ class UUAutoLeaseItem:
                         or any(s != "" and is_subsequence(s, short_name) for s in self.config["uu_auto_lease_item"]["filter_name"])
                     ):
                         continue
-                    self.operate_sleep()
+                    candidates.append(item)
 
-                    price_rsp = self.get_lease_price(template_id, min_price=price, max_price=price * 2)
-                    if price_rsp["LeaseUnitPrice"] == 0:
+                # 先并发查询所有模板的租金, 再一次性构建上架列表
+                lease_prices = self.get_lease_prices({item["TemplateInfo"]["Id"]: item["TemplateInfo"]["MarkPrice"] for item in candidates})
+                for item in candidates:
+                    price_rsp = lease_prices.get(item["TemplateInfo"]["Id"])
+                    if not price_rsp or price_rsp["LeaseUnitPrice"] == 0:
                         continue
 
                     lease_item = models.UUOnLeaseShelfItem(
-                        AssetId=asset_id,
+                        AssetId=item["SteamAssetId"],
                         IsCanLease=True,
                         IsCanSold=False,
                         LeaseMaxDays=self.config["uu_auto_lease_item"]["lease_max_days"],
@@ -168,7 +189,6 @@ class UUAutoLeaseItem:
 
                 self.logger.info(f"共 {len(lease_item_list)} 件物品可以出租。")
 
-                self.operate_sleep()
                 if len(lease_item_list) > 0:
                     success_count = self.uuyoupin.put_items_on_lease_shelf(lease_item_list)
                     if success_count > 0:
@@ -203,16 +223,13 @@ class UUAutoLeaseItem:
             self.uuyoupin.send_device_info()
             self.logger.info("正在获取悠悠有品出租已上架物品...")
             leased_item_list = self.leased_inventory_list
-            for i, item in enumerate(leased_item_list):
-                template_id = item.templateid
-                short_name = item.short_name
-                price = item.price
-
-                if any(s != "" and is_subsequence(s, short_name) for s in self.config["uu_auto_lease_item"]["filter_name"]):
-                    continue
-
-                price_rsp = self.get_lease_price(template_id, min_price=price, max_price=price * 2)
-                if price_rsp["LeaseUnitPrice"] == 0:
+            candidates = [
+                item for item in leased_item_list if not any(s != "" and is_subsequence(s, item.short_name) for s in self.config["uu_auto_lease_item"]["filter_name"])
+            ]
+            lease_prices = self.get_lease_prices({item.templateid: item.price for item in candidates})
+            for item in candidates:
+                price_rsp = lease_prices.get(item.templateid)
+                if not price_rsp or price_rsp["LeaseUnitPrice"] == 0:
                     continue
 
                 item.LeaseUnitPrice = price_rsp["LeaseUnitPrice"]
@@ -274,6 +291,7 @@ class UUAutoLeaseItem:
             self.compensation_type = self.config["uu_auto_lease_item"]["compensation_type"]
 
         self.uuyoupin = uuyoupinapi.UUAccount(get_valid_token_for_uu(self.steam_client))
+        self.uuyoupin.set_rate_limit(self.config["uu_auto_lease_item"].get("max_requests_per_second", 1.0))
 
         self.pre_check_price()
         self.auto_lease()
@@ -1,4 +1,3 @@
-import datetime
 import random
 import time
 
@@ -7,12 +6,10 @@ import schedule
 import uuyoupinapi
 from utils.logger import PluginLogger, handle_caught_exception, logger
 from utils.notifier import send_notification
+from utils.price_cache import get_price_cache
 from utils.tools import exit_code
 from utils.uu_helper import get_valid_token_for_uu
 
-# 将sale_price_cache从实例变量改为模块级变量
-sale_price_cache = {}
-
 
 class UUAutoSellItem:
     def __init__(self, steam_client, steam_client_mutex, config):
@@ -38,22 +35,22 @@ class UUAutoSellItem:
             return []
 
     def get_market_sale_price(self, item_id, cnt=10, good_name=None):
-        if item_id in sale_price_cache:
-            if datetime.datetime.now() - sale_price_cache[item_id]["cache_time"] <= datetime.timedelta(minutes=5):
-                commodity_name = sale_price_cache[item_id]["commodity_name"]
-                sale_price = sale_price_cache[item_id]["sale_price"]
-                self.logger.info(f"{commodity_name} 使用缓存结果，出售价格： {sale_price:.2f}")
-                return sale_price
-
+        ttl = self.config["uu_auto_sell_item"].get("price_cache_minutes", 5) * 60
+        price, from_cache = get_price_cache().get_or_load(
+            (item_id, "sale", cnt), lambda: self._query_market_sale_price(item_id, cnt), ttl, cache_if=lambda price: price["sale_price"] != 0
+        )
+        if from_cache:
+            self.logger.info(f"{price['commodity_name']} 使用缓存结果，出售价格： {price['sale_price']:.2f}")
+        return price["sale_price"]
+
+    def _query_market_sale_price(self, item_id, cnt=10):
         sale_price_rsp = self.uuyoupin.get_market_sale_list_with_abrade(item_id).json()
         if sale_price_rsp["Code"] == 0:
             rsp_list = sale_price_rsp["Data"]
             rsp_cnt = len(rsp_list)
             if rsp_cnt == 0:
-                sale_price = 0
-                commodity_name = ""
                 self.logger.warning(f"市场上没有指定筛选条件的物品")
-                return sale_price
+                return {"commodity_name": "", "sale_price": 0}
             commodity_name = rsp_list[0]["commodityName"]
 
             sale_price_list = []
@@ -79,16 +76,7 @@ class UUAutoSellItem:
             commodity_name = ""
             self.logger.error(f"查询出售价格失败，返回结果：{sale_price_rsp['Code']}，全部内容：{sale_price_rsp}")
 
-        sale_price = round(sale_price, 2)
-
-        if sale_price != 0:
-            sale_price_cache[item_id] = {
-                "commodity_name": commodity_name,
-                "sale_price": sale_price,
-                "cache_time": datetime.datetime.now(),
-            }
-
-        return sale_price
+        return {"commodity_name": commodity_name, "sale_price": round(sale_price, 2)}
 
     def sell_item(self, items):
         item_infos = items
@@ -1,5 +1,5 @@
-import bs4
 import re
+from steampy.html_parser import make_soup
 from steampy.models import Endpoints, SteamUrl
 from steampy.utils import account_id_to_steam_id
 
@@ -12,7 +12,7 @@ class SteamChat:
     def _get_access_token(self):
         response = self._session.get(SteamUrl.COMMUNITY_URL + "/chat")
         response.raise_for_status()
-        response_soup = bs4.BeautifulSoup(response.text, "html.parser")
+        response_soup = make_soup(response.text)
         elems = response_soup.select("body > div > div > div > script[type]")
         token_pattern = re.compile(r"\"(\w{32})\"")
         access_token = token_pattern.search(str(elems[0])).group(1)
@@ -1,30 +1,36 @@
-import copy
+import contextlib
 import decimal
 import json
+import threading
 import time
 import urllib.parse as urlparse
 from typing import List, Union, Optional
 
-import bs4
 import requests
 
 from steampy import guard
 from steampy.chat import SteamChat
 from steampy.confirmation import ConfirmationExecutor
+from steampy.description_cache import description_cache, make_description_key
 from steampy.exceptions import (
     ApiException,
+    ConfirmationExpected,
     EmptyResponse,
     InvalidResponse,
     LoginRequired,
     SevenDaysHoldException,
 )
+from steampy.html_parser import make_soup
 from steampy.login import InvalidCredentials, LoginExecutor
 from steampy.market import SteamMarket
 from steampy.models import Asset, GameOptions, SteamUrl, TradeOfferState
+from steampy.rate_limit import RateController, RateLimitedAdapter
+from steampy.transport import get_transport
 from steampy.utils import (
     account_id_to_steam_id,
-    get_description_key,
     get_key_value_from_url,
+    get_offer_description_keys,
+    intern_descriptions,
     merge_items_with_descriptions_from_inventory,
     merge_items_with_descriptions_from_offer,
     merge_items_with_descriptions_from_offers,
@@ -34,6 +40,11 @@ from steampy.utils import (
     texts_between,
 )
 
+# 单次 GetAssetClassInfo 请求最多查询的物品数
+CLASS_INFO_BATCH_SIZE = 100
+# 交易收据中属于单个资产而非物品描述的字段
+RECEIPT_ASSET_FIELDS = ("id", "amount", "contextid", "pos", "owner", "new_assetid", "new_contextid")
+
 STEAM_USER_AGENT = (
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -63,6 +74,14 @@ class SteamClient:
         self._api_key = api_key
         self._session = requests.Session()
         self._session.headers["User-Agent"] = STEAM_USER_AGENT
+        self._session.hooks["response"].append(self._observe_response)
+        self._session_alive: Optional[bool] = None
+        self._session_checked_at = 0.0
+        self._session_suspect = False
+        self._session_probe_lock = threading.Lock()
+        self.session_mutex = None  # 账号锁(可重入), 由登录流程设置, 刷新 access_token 修改会话 Cookie 时需持有
+        self.rate_controller = RateController()
+        self._session.mount("https://", RateLimitedAdapter(self.rate_controller))
         self.steam_guard = steam_guard
         self.was_login_executed = False
         self.username = username
@@ -154,6 +173,45 @@ class SteamClient:
         except Exception:
             return False
 
+    def export_session_snapshot(self) -> dict:
+        """导出完整的会话状态(所有域的 cookie 与 steamid), 用于下次启动时直接恢复"""
+        cookies = [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure,
+                "expires": cookie.expires,
+            }
+            for cookie in self._session.cookies
+        ]
+        return {"steamid": self.steamid, "cookies": cookies, "saved_at": int(time.time())}
+
+    def restore_session_snapshot(self, snapshot: dict, steam_guard) -> bool:
+        """
+        从快照恢复会话, 不发起任何网络请求
+        快照中缺少 steamLoginSecure 或 sessionid 时返回 False, 调用方应回退到正常登录流程
+        """
+        for cookie in snapshot.get("cookies", []):
+            self._session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+                secure=cookie.get("secure", False),
+                expires=cookie.get("expires"),
+            )
+        community_cookies = self._session.cookies.get_dict("steamcommunity.com")
+        if "steamLoginSecure" not in community_cookies or "sessionid" not in community_cookies:
+            self._session.cookies.clear()
+            return False
+        self.steamid = snapshot.get("steamid") or community_cookies["steamLoginSecure"].split("%7C%7C")[0]
+        self.steam_guard = guard.load_steam_guard(steam_guard)
+        self.was_login_executed = True
+        self.market._set_login_executed(self.steam_guard, self._get_session_id())
+        return True
+
     def login(
         self,
         username: str,
@@ -274,15 +332,65 @@ class SteamClient:
         self.logout()
 
     @login_required
-    def is_session_alive(self):
-        guard.try_to_get_time_delta_from_steam(self._session)
-        if not self.is_access_token_valid():
-            try:
-                self.update_access_token()
-                return self.is_access_token_valid()
-            except Exception:
-                return False
-        return True
+    def is_session_alive(self, max_age: Optional[float] = None) -> bool:
+        """
+        max_age 为 None 时总是主动探测;
+        否则若最近 max_age 秒内探测为有效、且之后的真实请求没有出现登录失效迹象, 直接返回 True
+        只缓存有效的结果, 会话失效时每次调用都会重新探测
+        """
+        if max_age is not None and self._is_cached_session_alive(max_age):
+            return True
+        probe_started = time.time()
+        with self._session_probe_lock:
+            # 等待锁期间其他线程可能已经完成探测
+            if max_age is not None and self._is_cached_session_alive(max_age):
+                return True
+            guard.try_to_get_time_delta_from_steam(self._session)
+            if self.is_access_token_valid():
+                return self._record_session_probe(True)
+        # 刷新 access_token 会修改其他插件正在使用的会话 Cookie, 需要持有账号锁
+        # 账号锁总是先于探测锁获取, 与持有账号锁后调用本方法的线程(如刷新线程)保持相同的加锁顺序
+        with self.session_mutex or contextlib.nullcontext():
+            with self._session_probe_lock:
+                if self._session_checked_at > probe_started:
+                    # 等待账号锁期间其他线程已经完成刷新
+                    return bool(self._session_alive)
+                try:
+                    self.update_access_token()
+                    alive = self.is_access_token_valid()
+                except Exception:
+                    alive = False
+                return self._record_session_probe(alive)
+
+    def _record_session_probe(self, alive: bool) -> bool:
+        self._session_alive = alive
+        self._session_suspect = False
+        self._session_checked_at = time.time()
+        return alive
+
+    def _is_cached_session_alive(self, max_age: float) -> bool:
+        return bool(self._session_alive) and not self._session_suspect and time.time() - self._session_checked_at < max_age and bool(self.access_token)
+
+    @property
+    def session_alive(self) -> Optional[bool]:
+        """
+        不发起请求, 返回被动维护的会话状态: True/False, 或 None(从未探测过或出现了失效迹象)
+        """
+        if not self.access_token:
+            return False
+        if self._session_suspect:
+            return None
+        return self._session_alive
+
+    def _observe_response(self, response: requests.Response, *args, **kwargs):
+        """Session 的 response hook, 根据真实请求的结果被动更新会话状态"""
+        host = urlparse.urlparse(response.url).hostname or ""
+        if not host.endswith("steamcommunity.com") and not host.endswith("steampowered.com"):
+            return
+        if response.status_code in (401, 403):
+            self._session_suspect = True
+        elif response.status_code == 302 and "/login" in response.headers.get("Location", ""):
+            self._session_suspect = True
 
     def is_access_token_valid(self) -> bool:
         try:
@@ -293,24 +401,19 @@ class SteamClient:
 
     def api_call(self, request_method: str, interface: str, api_method: str, version: str, params: dict = None) -> requests.Response:
         url = "/".join([SteamUrl.API_URL, interface, api_method, version])
-        if request_method == "GET":
-            response = requests.get(
-                url,
-                params=params,
-                headers=self._session.headers,
-                verify=self._session.verify,
-                auth=self._session.auth,
-                timeout=15,
-            )
-        else:
-            response = requests.post(
-                url,
-                data=params,
-                headers=self._session.headers,
-                verify=self._session.verify,
-                auth=self._session.auth,
-                timeout=15,
-            )
+        self.rate_controller.acquire(url)
+        response = get_transport().request(
+            request_method,
+            url,
+            params=params if request_method == "GET" else None,
+            data=None if request_method == "GET" else params,
+            headers=self._session.headers,
+            verify=self._session.verify,
+            auth=self._session.auth,
+            proxies=self._session.proxies,
+            timeout=15,
+        )
+        self.rate_controller.record(url, response)
         if self.is_invalid_api_key(response):
             raise InvalidCredentials("Invalid API key")
         return response
@@ -327,24 +430,12 @@ class SteamClient:
 
     @login_required
     def get_partner_inventory(self, partner_steam_id: str, game: GameOptions, merge: bool = True) -> dict:
-        COUNT_PER_BATCH = 1000
         more_items = 1
         last_assetid = None
         full_response = {}
         while more_items:
-            url = "/".join([SteamUrl.COMMUNITY_URL, "inventory", str(partner_steam_id), game.app_id, game.context_id])
-            params = {"l": "english", "count": COUNT_PER_BATCH}
-            if last_assetid:
-                params["start_assetid"] = last_assetid
-            response_dict = self._session.get(url, params=params).json()
-            if "success" not in response_dict:
-                raise InvalidResponse()
-            if response_dict["success"] != 1:
-                raise ApiException("Success value should be 1.")
-            if "more_items" in response_dict:
-                more_items = response_dict["more_items"]
-            else:
-                more_items = 0
+            response_dict = self.get_partner_inventory_page(partner_steam_id, game, last_assetid)
+            more_items = response_dict.get("more_items", 0)
             if more_items:
                 last_assetid = response_dict["last_assetid"]
             if full_response == {}:
@@ -358,13 +449,41 @@ class SteamClient:
             return merge_items_with_descriptions_from_inventory(full_response, game)
         return full_response
 
+    def get_partner_inventory_page(self, partner_steam_id: str, game: GameOptions, start_assetid: Optional[str] = None, count: int = 1000) -> dict:
+        """获取单页库存, 返回原始响应(包含 assets/descriptions/more_items/last_assetid/total_inventory_count)"""
+        url = "/".join([SteamUrl.COMMUNITY_URL, "inventory", str(partner_steam_id), game.app_id, game.context_id])
+        params = {"l": "english", "count": count}
+        if start_assetid:
+            params["start_assetid"] = start_assetid
+        response_dict = self._session.get(url, params=params).json()
+        if "success" not in response_dict:
+            raise InvalidResponse()
+        if response_dict["success"] != 1:
+            raise ApiException("Success value should be 1.")
+        return response_dict
+
     def _get_session_id(self) -> str:
         return self._session.cookies.get_dict("steamcommunity.com")["sessionid"]
 
-    def get_trade_offers_summary(self) -> dict:
-        params = {"key": self._api_key}
+    def get_trade_offers_summary(self, time_last_visit: Optional[int] = None) -> dict:
+        """
+        获取报价数量摘要(待处理/新收到/有更新的报价数), 请求开销远小于 GetTradeOffers
+        time_last_visit: 统计该时间之后新收到和有更新的报价
+        """
+        params = self._get_api_auth_params()
+        if time_last_visit:
+            params["time_last_visit"] = time_last_visit
         return self.api_call("GET", "IEconService", "GetTradeOffersSummary", "v1", params).json()
 
+    def _get_api_auth_params(self) -> dict:
+        # 未配置 API Key 时使用 access_token 调用 WebAPI
+        if self._api_key:
+            return {"key": self._api_key}
+        access_token = self.access_token
+        if not access_token:
+            raise ApiException("Missing steamLoginSecure cookie")
+        return {"access_token": access_token}
+
     def get_trade_offers(self, merge: bool = True) -> dict:
         access_token_cookie = self._session.cookies.get_dict("steamcommunity.com").get("steamLoginSecure")
         if not access_token_cookie or "%7C%7C" not in access_token_cookie:
@@ -374,7 +493,7 @@ class SteamClient:
             "access_token": access_token,
             "get_sent_offers": 1,
             "get_received_offers": 1,
-            "get_descriptions": 1,
+            "get_descriptions": 0,
             "language": "english",
             "active_only": 1,
             "historical_only": 0,
@@ -384,6 +503,10 @@ class SteamClient:
             response = self.api_call("GET", "IEconService", "GetTradeOffers", "v1", params).json()
             if response == {"response": {"next_cursor": 0}}:
                 response = self.get_all_trade_offer_by_bs4()
+            elif merge and self._has_uncached_descriptions(response):
+                # 描述缓存中缺少部分物品时, 才请求带描述的完整响应
+                params["get_descriptions"] = 1
+                response = self.api_call("GET", "IEconService", "GetTradeOffers", "v1", params).json()
         except Exception:
             response = self.get_all_trade_offer_by_bs4()
         response = self._filter_non_active_offers(response)
@@ -391,15 +514,39 @@ class SteamClient:
             response = merge_items_with_descriptions_from_offers(response)
         return response
 
+    def get_trade_offers_page(self, time_historical_cutoff: int = 0, cursor: int = 0, get_descriptions: bool = False) -> dict:
+        """
+        获取单页交易报价, 返回 IEconService/GetTradeOffers 的原始响应。
+        active_only=1 时, Steam 会返回所有活跃报价, 以及 time_historical_cutoff 之后状态发生变化的报价。
+        翻页时使用上一页返回的 next_cursor, 为 0 时表示没有更多数据。
+        """
+        access_token_cookie = self._session.cookies.get_dict("steamcommunity.com").get("steamLoginSecure")
+        if not access_token_cookie or "%7C%7C" not in access_token_cookie:
+            raise ApiException("Missing steamLoginSecure cookie")
+        access_token = access_token_cookie.split("%7C%7C")[1]
+        params = {
+            "access_token": access_token,
+            "get_sent_offers": 1,
+            "get_received_offers": 1,
+            "get_descriptions": int(get_descriptions),
+            "language": "english",
+            "active_only": 1,
+            "historical_only": 0,
+            "time_historical_cutoff": time_historical_cutoff or "",
+            "cursor": cursor,
+        }
+        return self.api_call("GET", "IEconService", "GetTradeOffers", "v1", params).json()
+
     def get_all_trade_offer_by_bs4(self, get_item_name: bool = False):
         return_data = {"response": {"trade_offers_received": [], "trade_offers_sent": []}}
         steam_id = self.get_steam64id_from_cookies()
         response = self._session.get(f"https://steamcommunity.com/profiles/{steam_id}/tradeoffers/?l=english", timeout=15)
-        soup = bs4.BeautifulSoup(response.text, "html.parser")
+        soup = make_soup(response.text)
         trade_offer_list = soup.find_all("div", class_="tradeoffer")
         if not trade_offer_list:
             return {"response": {"next_cursor": 0}}
 
+        parsed_offers = []
         for trade_offer in trade_offer_list:
             trade_offer_status = TradeOfferState.Active
             trade_offer_id = trade_offer["id"].split("_")[1]
@@ -428,64 +575,21 @@ class SteamClient:
                         items_to_receive.append({"app_id": game_app_id, "class_id": item_class, "instance_id": instance_id})
                     else:
                         items_to_give.append({"app_id": game_app_id, "class_id": item_class, "instance_id": instance_id})
-            tmp = copy.copy(items_to_receive)
-            items_to_receive = []
-            for item in tmp:
-                if get_item_name and item["app_id"] == 730:
-                    url = f"http://api.steampowered.com/ISteamEconomy/GetAssetClassInfo/v1?key={self._api_key}&format=json&appid=730&class_count=1&classid0={item['class_id']}"
-                    data = self._session.get(url, timeout=15).json()
-
-                    icon_url = data["result"][str(item["class_id"])]["icon_url"]
-                    market_hash_name = data["result"][item["class_id"]]["market_hash_name"]
-                    items_to_receive.append(
-                        {
-                            "class_id": item["class_id"],
-                            "instanceid": item["instance_id"],
-                            "icon_url": icon_url,
-                            "market_hash_name": market_hash_name,
-                        }
-                    )
-                else:
-                    items_to_receive.append(
-                        {
-                            "classid": item["class_id"],
-                            "instanceid": item["instance_id"],
-                            "icon_url": "",
-                            "market_hash_name": "",
-                        }
-                    )
-            tmp = copy.copy(items_to_give)
-            items_to_give = []
-            for item in tmp:
-                if get_item_name and item["app_id"] == 730:
-                    url = f"http://api.steampowered.com/ISteamEconomy/GetAssetClassInfo/v1?key={self._api_key}&format=json&appid=730&class_count=1&classid0={item['class_id']}"
-                    data = self._session.get(url, timeout=15).json()
-
-                    icon_url = data["result"][str(item["class_id"])]["icon_url"]
-                    market_hash_name = data["result"][item["class_id"]]["market_hash_name"]
-                    items_to_give.append(
-                        {
-                            "class_id": item["class_id"],
-                            "instanceid": item["instance_id"],
-                            "icon_url": icon_url,
-                            "market_hash_name": market_hash_name,
-                        }
-                    )
-                else:
-                    items_to_give.append(
-                        {
-                            "classid": item["class_id"],
-                            "instanceid": item["instance_id"],
-                            "icon_url": "",
-                            "market_hash_name": "",
-                        }
-                    )
+            parsed_offers.append((trade_offer_id, trade_offer_status, is_received_offer, items_to_receive, items_to_give))
+
+        class_info = {}
+        if get_item_name:
+            cs_items = [item for offer in parsed_offers for item in offer[3] + offer[4] if item["app_id"] == 730]
+            class_info = self.get_asset_class_info("730", [(item["class_id"], item["instance_id"]) for item in cs_items])
 
+        for trade_offer_id, trade_offer_status, is_received_offer, items_to_receive, items_to_give in parsed_offers:
+            items_to_receive = [self._build_bs4_offer_item(item, class_info) for item in items_to_receive]
+            items_to_give = [self._build_bs4_offer_item(item, class_info) for item in items_to_give]
             trade = {
                 "tradeofferid": trade_offer_id,
                 "trade_offer_state": trade_offer_status,
-                "items_to_receive": copy.copy(items_to_receive),
-                "items_to_give": copy.copy(items_to_give),
+                "items_to_receive": items_to_receive,
+                "items_to_give": items_to_give,
             }
             if is_received_offer:
                 return_data["response"]["trade_offers_received"].append(trade)
@@ -493,6 +597,40 @@ class SteamClient:
                 return_data["response"]["trade_offers_sent"].append(trade)
         return return_data
 
+    @staticmethod
+    def _build_bs4_offer_item(item: dict, class_info: dict) -> dict:
+        description = class_info.get((item["class_id"], item["instance_id"])) if item["app_id"] == 730 else None
+        if description is None:
+            return {"classid": item["class_id"], "instanceid": item["instance_id"], "icon_url": "", "market_hash_name": ""}
+        return {
+            "class_id": item["class_id"],
+            "instanceid": item["instance_id"],
+            "icon_url": description.get("icon_url", ""),
+            "market_hash_name": description.get("market_hash_name", ""),
+        }
+
+    def get_asset_class_info(self, appid: str, class_instance_ids: List[tuple]) -> dict:
+        """
+        批量查询物品描述, class_instance_ids 为 [(classid, instanceid), ...]
+        优先使用进程内共享的描述缓存, 未命中的部分每批最多 CLASS_INFO_BATCH_SIZE 个合并为一次 GetAssetClassInfo 请求
+        返回 {(classid, instanceid): 描述}
+        """
+        keys = [(str(appid), str(classid), str(instanceid)) for classid, instanceid in class_instance_ids]
+        missing = description_cache.missing(keys)
+        for start in range(0, len(missing), CLASS_INFO_BATCH_SIZE):
+            batch = missing[start : start + CLASS_INFO_BATCH_SIZE]
+            params = self._get_api_auth_params()
+            params.update({"appid": appid, "language": "english", "class_count": len(batch)})
+            for i, (_, classid, instanceid) in enumerate(batch):
+                params[f"classid{i}"] = classid
+                params[f"instanceid{i}"] = instanceid
+            result = self.api_call("GET", "ISteamEconomy", "GetAssetClassInfo", "v1", params).json().get("result", {})
+            for _, classid, instanceid in batch:
+                description = result.get(f"{classid}_{instanceid}") or result.get(classid)
+                if isinstance(description, dict):
+                    description_cache.put((str(appid), classid, instanceid), description)
+        return {key[1:]: description for key, description in description_cache.get_many(keys).items()}
+
     @staticmethod
     def _filter_non_active_offers(offers_response):
         offers_received = offers_response["response"].get("trade_offers_received", [])
@@ -506,14 +644,30 @@ class SteamClient:
         if not access_token_cookie or "%7C%7C" not in access_token_cookie:
             raise ApiException("Missing steamLoginSecure cookie")
         access_token = access_token_cookie.split("%7C%7C")[1]
-        params = {"access_token": access_token, "tradeofferid": trade_offer_id, "language": "english"}
+        params = {"access_token": access_token, "tradeofferid": trade_offer_id, "language": "english", "get_descriptions": 0}
         response = self.api_call("GET", "IEconService", "GetTradeOffer", "v1", params).json()
-        if merge and "descriptions" in response["response"]:
-            descriptions = {get_description_key(offer): offer for offer in response["response"]["descriptions"]}
+        if merge and "offer" in response.get("response", {}):
+            if description_cache.missing(get_offer_description_keys([response["response"]["offer"]])):
+                params["get_descriptions"] = 1
+                response = self.api_call("GET", "IEconService", "GetTradeOffer", "v1", params).json()
+            descriptions = intern_descriptions(response["response"].get("descriptions", []))
             offer = response["response"]["offer"]
             response["response"]["offer"] = merge_items_with_descriptions_from_offer(offer, descriptions)
         return response
 
+    @staticmethod
+    def _has_uncached_descriptions(offers_response: dict) -> bool:
+        offers = offers_response.get("response", {}).get("trade_offers_received", []) + offers_response.get("response", {}).get("trade_offers_sent", [])
+        offers = [offer for offer in offers if offer.get("trade_offer_state") == TradeOfferState.Active]
+        return bool(description_cache.missing(get_offer_description_keys(offers)))
+
+    def get_trade_status(self, trade_id: str, get_descriptions: bool = True) -> dict:
+        """
+        IEconService/GetTradeStatus, 返回交易中双方物品的 assetid 与交易后的 new_assetid
+        """
+        params = {**self._get_api_auth_params(), "tradeid": trade_id, "get_descriptions": int(get_descriptions), "language": "english"}
+        return self.api_call("GET", "IEconService", "GetTradeStatus", "v1", params).json()
+
     def get_trade_history(
         self,
         max_trades=100,
@@ -525,7 +679,7 @@ class SteamClient:
         include_total=True,
     ) -> dict:
         params = {
-            "key": self._api_key,
+            **self._get_api_auth_params(),
             "max_trades": max_trades,
             "start_after_time": start_after_time,
             "start_after_tradeid": start_after_tradeid,
@@ -542,17 +696,62 @@ class SteamClient:
         html = self._session.get(f"https://steamcommunity.com/trade/{trade_id}/receipt").content.decode()
         items = []
         for item in texts_between(html, "oItem = ", ";\r\n\toItem"):
-            items.append(json.loads(item))
+            item = json.loads(item)
+            if "classid" in item and "appid" in item:
+                key = make_description_key(item)
+                if key not in description_cache:
+                    # 收据中的物品带有完整描述, 去掉资产相关字段后写入描述缓存
+                    description_cache.put(key, {k: v for k, v in item.items() if k not in RECEIPT_ASSET_FIELDS})
+            items.append(item)
         return items
 
     @login_required
-    def accept_trade_offer(self, trade_offer_id: str) -> dict:
-        trade = self.get_trade_offer(trade_offer_id)
-        trade_offer_state = TradeOfferState(trade["response"]["offer"]["trade_offer_state"])
+    def accept_trade_offer(self, trade_offer_id: str, offer: Optional[dict] = None) -> dict:
+        """
+        offer 为已获取到的报价(GetTradeOffer(s) 返回的 offer 对象), 传入后可省去一次报价查询
+        """
+        if self._send_accept_request(trade_offer_id, offer):
+            return self._confirm_transaction(trade_offer_id)
+
+    @login_required
+    def accept_trade_offers(self, trade_offer_ids: List[str], offers: Optional[dict] = None) -> dict:
+        """
+        批量接受报价: 逐个发送接受请求, 最后对需要手机确认的报价统一进行一次批量确认
+        offers 为 {报价号: 已获取到的报价对象}, 可选
+        返回 {报价号: True 或 对应的异常}
+        """
+        offers = offers or {}
+        result = {}
+        need_confirmation = []
+        for trade_offer_id in trade_offer_ids:
+            trade_offer_id = str(trade_offer_id)
+            try:
+                if self._send_accept_request(trade_offer_id, offers.get(trade_offer_id)):
+                    need_confirmation.append(trade_offer_id)
+                else:
+                    result[trade_offer_id] = True
+            except Exception as e:
+                result[trade_offer_id] = e
+        if need_confirmation:
+            confirmation_executor = ConfirmationExecutor(self.steam_guard["identity_secret"], self.get_steam64id_from_cookies(), self._session)
+            for trade_offer_id, confirmed in confirmation_executor.send_trade_allow_requests(need_confirmation).items():
+                result[trade_offer_id] = True if confirmed else ConfirmationExpected()
+        return result
+
+    def _send_accept_request(self, trade_offer_id: str, offer: Optional[dict] = None) -> bool:
+        """发送接受报价请求, 返回该报价是否还需要手机确认"""
+        # 缓存的报价状态可能已过期, 只信任活跃状态, 其余情况重新查询
+        if offer is None or offer.get("trade_offer_state") != TradeOfferState.Active:
+            offer = self.get_trade_offer(trade_offer_id, merge=False)["response"]["offer"]
+        trade_offer_state = TradeOfferState(offer["trade_offer_state"])
         if trade_offer_state not in [TradeOfferState.Active, TradeOfferState.ConfirmationNeed]:
             raise ApiException("Invalid trade offer state: {} ({})".format(trade_offer_state.name, trade_offer_state.value))
         if trade_offer_state == TradeOfferState.Active:
-            partner = self._fetch_trade_partner_id(trade_offer_id)
+            # 报价中的 accountid_other 即可换算出交易对象, 仅在缺失时才去解析报价页面
+            if offer.get("accountid_other"):
+                partner = account_id_to_steam_id(offer["accountid_other"])
+            else:
+                partner = self._fetch_trade_partner_id(trade_offer_id)
             session_id = self._get_session_id()
             accept_url = SteamUrl.COMMUNITY_URL + "/tradeoffer/" + trade_offer_id + "/accept"
             params = {
@@ -566,10 +765,10 @@ class SteamClient:
             response = self._session.post(accept_url, data=params, headers=headers, timeout=10).json()
             if response is None:
                 raise EmptyResponse("Login response is empty")
-            if response.get("needs_mobile_confirmation", False):
-                return self._confirm_transaction(trade_offer_id)
-        else:
-            return self._confirm_transaction(trade_offer_id)
+            if response.get("strError"):
+                raise ApiException(response["strError"])
+            return response.get("needs_mobile_confirmation", False)
+        return True
 
     def _fetch_trade_partner_id(self, trade_offer_id: str) -> str:
         url = self._get_trade_offer_url(trade_offer_id)
@@ -699,7 +898,7 @@ class SteamClient:
             email_confirm_response = self._session.get(confirm_url)
             response_dict = {}
             if "error_msg" in email_confirm_response.text:
-                bs = bs4.BeautifulSoup(email_confirm_response.text, "html.parser")
+                bs = make_soup(email_confirm_response.text)
                 error = bs.find("div", {"id": "error_msg"})
                 response_dict["strError"] = error.text.split()[-1]
             else:
@@ -716,7 +915,7 @@ class SteamClient:
     def get_wallet_balance(self, convert_to_decimal: bool = True) -> Union[str, decimal.Decimal]:
         url = SteamUrl.STORE_URL + "/account/history/"
         response = self._session.get(url)
-        response_soup = bs4.BeautifulSoup(response.text, "html.parser")
+        response_soup = make_soup(response.text)
         balance = response_soup.find(id="header_wallet_balance").string
         if convert_to_decimal:
             return parse_price(balance)
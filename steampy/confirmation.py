@@ -1,21 +1,27 @@
 import enum
 import json
 import time
-from typing import List
+from typing import Dict, Iterable, List, Optional, Set
 
 import requests
-from bs4 import BeautifulSoup
 
 from steampy import guard
 from steampy.exceptions import ConfirmationExpected
+from steampy.html_parser import extract_trade_offer_id, make_soup
 from steampy.login import InvalidCredentials
 
 
 class Confirmation:
-    def __init__(self, data_confid, nonce, creator_id=-1):
+    def __init__(self, data_confid, nonce, creator_id=-1, conf_type=None):
         self.data_confid = data_confid
         self.nonce = nonce
         self.creator_id = creator_id
+        self.conf_type = conf_type
+
+
+class ConfirmationType(enum.IntEnum):
+    TRADE = 2
+    MARKET_LISTING = 3
 
 
 class Tag(enum.Enum):
@@ -43,11 +49,65 @@ class ConfirmationExecutor:
                 time.sleep(3)
         raise ConfirmationExpected
 
+    def send_trade_allow_requests(self, trade_offer_ids: List[str]) -> Dict[str, bool]:
+        """
+        批量确认交易报价: 只拉取一次 getlist, 按 creator_id 匹配报价, 并通过一次 multiajaxop 请求全部确认
+        返回 {报价号: 是否确认成功}
+        """
+        pending = [str(trade_offer_id) for trade_offer_id in trade_offer_ids]
+        result = {trade_offer_id: False for trade_offer_id in pending}
+        for attempt in range(3):
+            if attempt:
+                time.sleep(3)
+            matched = self._select_trade_offer_confirmations(self._get_confirmations(), pending)
+            if matched:
+                response = self._send_confirmations(list(matched.values()))
+                if response.get("success"):
+                    for trade_offer_id in matched:
+                        result[trade_offer_id] = True
+            pending = [trade_offer_id for trade_offer_id in pending if not result[trade_offer_id]]
+            if not pending:
+                break
+        return result
+
     def confirm_sell_listing(self, asset_id: str) -> dict:
         confirmations = self._get_confirmations()
         confirmation = self._select_sell_listing_confirmation(confirmations, asset_id)
         return self._send_confirmation(confirmation)
 
+    def get_confirmation_ids(self) -> Set[str]:
+        """当前待确认列表中所有确认的 id, 用于批量上架前记录快照"""
+        return {confirmation.data_confid for confirmation in self._get_confirmations()}
+
+    def confirm_sell_listings(self, asset_ids: List[str], known_confirmation_ids: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """
+        批量确认市场上架: 只拉取一次 getlist, 并通过一次 multiajaxop 请求全部确认
+        传入上架前的确认快照时, 只需下载新出现的上架确认的详情页来对应资产
+        (同一时间可能有其他途径产生的上架确认, 因此仍需按详情页中的资产id逐个核对)
+        返回 {assetid: 是否确认成功}
+        """
+        pending = [str(asset_id) for asset_id in asset_ids]
+        result = {asset_id: False for asset_id in pending}
+        known = set(known_confirmation_ids) if known_confirmation_ids is not None else None
+        for attempt in range(3):
+            if attempt:
+                time.sleep(3)
+            confirmations = [
+                confirmation
+                for confirmation in self._get_confirmations()
+                if confirmation.conf_type in (None, ConfirmationType.MARKET_LISTING) and (known is None or confirmation.data_confid not in known)
+            ]
+            matched = self._select_sell_listing_confirmations(confirmations, pending, known)
+            if matched:
+                response = self._send_confirmations(list(matched.values()))
+                if response.get("success"):
+                    for asset_id in matched:
+                        result[asset_id] = True
+            pending = [asset_id for asset_id in pending if not result[asset_id]]
+            if not pending:
+                break
+        return result
+
     def _send_confirmation(self, confirmation: Confirmation) -> dict:
         tag = Tag.ALLOW
         params = self._create_confirmation_params(tag.value)
@@ -57,17 +117,33 @@ class ConfirmationExecutor:
         headers = {"X-Requested-With": "XMLHttpRequest"}
         return self._session.get(self.CONF_URL + "/ajaxop", params=params, headers=headers, timeout=15).json()
 
+    def _send_confirmations(self, confirmations: List[Confirmation]) -> dict:
+        if len(confirmations) == 1:
+            return self._send_confirmation(confirmations[0])
+        tag = Tag.ALLOW
+        data = self._create_confirmation_params(tag.value)
+        data["op"] = tag.value
+        data["cid[]"] = [confirmation.data_confid for confirmation in confirmations]
+        data["ck[]"] = [confirmation.nonce for confirmation in confirmations]
+        headers = {"X-Requested-With": "XMLHttpRequest"}
+        return self._session.post(self.CONF_URL + "/multiajaxop", data=data, headers=headers, timeout=15).json()
+
     def _get_confirmations(self) -> List[Confirmation]:
         confirmations = []
         for i in range(5):
             confirmations_page = self._fetch_confirmations_page()
             if confirmations_page.status_code == 200:
                 confirmations_json = json.loads(confirmations_page.text)
+                if not confirmations_json.get("success", True):
+                    # 确认密钥被拒绝, 多半是本地时间与Steam不同步, 重新同步后再试
+                    guard.time_offset.invalidate()
+                    time.sleep(1)
+                    continue
                 for conf in confirmations_json["conf"]:
                     data_confid = conf["id"]
                     nonce = conf["nonce"]
                     creator_id = conf["creator_id"]
-                    confirmations.append(Confirmation(data_confid, nonce, creator_id))
+                    confirmations.append(Confirmation(data_confid, nonce, creator_id, conf.get("type")))
                 return confirmations
             time.sleep(1)
         else:
@@ -89,12 +165,16 @@ class ConfirmationExecutor:
         return response.json()["html"]
 
     def _create_confirmation_params(self, tag_string: str) -> dict:
-        timestamp = int(time.time())
+        timestamp = guard.time_offset.now(self._session)
         confirmation_key = guard.generate_confirmation_key(self._identity_secret, tag_string, timestamp)
         android_id = guard.generate_device_id(self._my_steam_id)
         return {"p": android_id, "a": self._my_steam_id, "k": confirmation_key, "t": timestamp, "m": "android", "tag": tag_string}
 
     def _select_trade_offer_confirmation(self, confirmations: List[Confirmation], trade_offer_id: str, match_end: bool = False) -> Confirmation:
+        # 交易确认的 creator_id 即为报价号, 优先直接匹配, 避免逐个下载详情页
+        for confirmation in confirmations:
+            if confirmation.conf_type == ConfirmationType.TRADE and str(confirmation.creator_id) == trade_offer_id:
+                return confirmation
         for confirmation in confirmations:
             confirmation_details_page = self._fetch_confirmation_details_page(confirmation)
             confirmation_id = self._get_confirmation_trade_offer_id(confirmation_details_page)
@@ -106,6 +186,28 @@ class ConfirmationExecutor:
                 return confirmation
         raise ConfirmationExpected
 
+    def _select_trade_offer_confirmations(self, confirmations: List[Confirmation], trade_offer_ids: List[str]) -> Dict[str, Confirmation]:
+        wanted = set(trade_offer_ids)
+        matched = {}
+        unmatched = []
+        for confirmation in confirmations:
+            creator_id = str(confirmation.creator_id)
+            if confirmation.conf_type == ConfirmationType.TRADE and creator_id in wanted:
+                matched[creator_id] = confirmation
+            else:
+                unmatched.append(confirmation)
+        # 仅当仍有报价未匹配时, 才下载剩余确认的详情页
+        if len(matched) < len(wanted):
+            for confirmation in unmatched:
+                if confirmation.conf_type not in (None, ConfirmationType.TRADE):
+                    continue
+                confirmation_id = self._get_confirmation_trade_offer_id(self._fetch_confirmation_details_page(confirmation))
+                if confirmation_id in wanted and confirmation_id not in matched:
+                    matched[confirmation_id] = confirmation
+                    if len(matched) == len(wanted):
+                        break
+        return matched
+
     def _select_sell_listing_confirmation(self, confirmations: List[Confirmation], asset_id: str) -> Confirmation:
         for confirmation in confirmations:
             confirmation_details_page = self._fetch_confirmation_details_page(confirmation)
@@ -114,9 +216,23 @@ class ConfirmationExecutor:
                 return confirmation
         raise ConfirmationExpected
 
+    def _select_sell_listing_confirmations(self, confirmations: List[Confirmation], asset_ids: List[str], known: Optional[Set[str]] = None) -> Dict[str, Confirmation]:
+        # 已核对过的确认记入 known, 重试时不再重复下载详情页
+        wanted = set(asset_ids)
+        matched = {}
+        for confirmation in confirmations:
+            confirmation_id = self._get_confirmation_sell_listing_id(self._fetch_confirmation_details_page(confirmation))
+            if known is not None and confirmation_id not in wanted:
+                known.add(confirmation.data_confid)
+            if confirmation_id in wanted and confirmation_id not in matched:
+                matched[confirmation_id] = confirmation
+                if len(matched) == len(wanted):
+                    break
+        return matched
+
     @staticmethod
     def _get_confirmation_sell_listing_id(confirmation_details_page: str) -> str:
-        soup = BeautifulSoup(confirmation_details_page, "html.parser")
+        soup = make_soup(confirmation_details_page)
         scr_raw = soup.select("script")[2].string.strip()
         scr_raw = scr_raw[scr_raw.index("'confiteminfo', ") + 16 :]
         scr_raw = scr_raw[: scr_raw.index(", UserYou")].replace("\n", "")
@@ -124,7 +240,10 @@ class ConfirmationExecutor:
 
     @staticmethod
     def _get_confirmation_trade_offer_id(confirmation_details_page: str) -> str:
-        soup = BeautifulSoup(confirmation_details_page, "html.parser")
+        trade_offer_id = extract_trade_offer_id(confirmation_details_page)
+        if trade_offer_id:
+            return trade_offer_id
+        soup = make_soup(confirmation_details_page)
         trade_offer_id = soup.select(".tradeoffer")
         if len(trade_offer_id) != 0:
             full_offer_id = soup.select(".tradeoffer")[0]["id"]
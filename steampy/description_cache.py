@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DescriptionKey = Tuple[str, str, str]  # (appid, classid, instanceid)
+
+
+def make_description_key(item: dict, appid=None) -> DescriptionKey:
+    return (str(item.get("appid", appid)), str(item["classid"]), str(item.get("instanceid", "0")))
+
+
+class DescriptionCache:
+    """
+    线程安全的有界 LRU 物品描述缓存, 以 (appid, classid, instanceid) 为键
+    同一类物品的描述在各处共享, 避免重复向Steam请求
+    """
+
+    def __init__(self, maxsize: int = 20000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[DescriptionKey, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: DescriptionKey) -> Optional[dict]:
+        with self._lock:
+            description = self._data.get(key)
+            if description is not None:
+                self._data.move_to_end(key)
+            return description
+
+    def put(self, key: DescriptionKey, description: dict) -> dict:
+        """写入描述, 已存在时返回缓存中的原对象, 使调用方共享同一份描述"""
+        with self._lock:
+            cached = self._data.get(key)
+            if cached is not None:
+                self._data.move_to_end(key)
+                return cached
+            self._data[key] = description
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return description
+
+    def put_many(self, descriptions: Iterable[dict], appid=None):
+        for description in descriptions:
+            self.put(make_description_key(description, appid), description)
+
+    def get_many(self, keys: Iterable[DescriptionKey]) -> Dict[DescriptionKey, dict]:
+        result = {}
+        with self._lock:
+            for key in keys:
+                description = self._data.get(key)
+                if description is not None:
+                    self._data.move_to_end(key)
+                    result[key] = description
+        return result
+
+    def missing(self, keys: Iterable[DescriptionKey]) -> List[DescriptionKey]:
+        with self._lock:
+            return list(dict.fromkeys(key for key in keys if key not in self._data))
+
+    def __contains__(self, key: DescriptionKey) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# 全局共享的描述缓存
+description_cache = DescriptionCache()
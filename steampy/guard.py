@@ -7,11 +7,11 @@ import time
 import os
 
 from hashlib import sha1
-import sys
+import threading
 
 from requests import Session
 
-time_delta = sys.maxsize
+CODE_CHARS = "23456789BCDFGHJKMNPQRTVWXY"
 
 
 def get_steam_server_time(session: Session) -> int:
@@ -23,19 +23,84 @@ def get_steam_server_time(session: Session) -> int:
         return -1
 
 
-def try_to_get_time_delta_from_steam(session: Session) -> int:
-    return 0
-    global time_delta
-    if time_delta == sys.maxsize:
+class SteamTimeOffset:
+    """
+    维护本地时间与Steam服务器时间的差值
+      - 首次使用时通过 ITwoFactorService/QueryTime 同步一次
+      - 超过 RESYNC_INTERVAL, 或检测到本地时钟被调整(系统时间与单调时钟的差发生跳变)时重新同步
+      - 同步失败时沿用上一次的差值, RETRY_INTERVAL 后再试
+      - 只通过调用方传入的会话同步(带有该账号的代理设置); 未传入会话时直接使用上一次的差值, 不发起请求,
+        因此从未传入过会话时差值始终为 0(即使用本地时间), 需要时间同步的调用方必须传入会话
+    """
+
+    RESYNC_INTERVAL = 6 * 3600
+    RETRY_INTERVAL = 60
+    MAX_CLOCK_JUMP = 2
+
+    def __init__(self):
+        self.offset = 0
+        self._synced = False
+        self._next_sync = 0.0
+        self._clock_base = None
+        self._lock = threading.Lock()
+
+    def get_offset(self, session: Session = None) -> int:
+        if session is None:
+            return self.offset
+        monotonic_now = time.monotonic()
+        if self._needs_sync(monotonic_now):
+            with self._lock:
+                if self._needs_sync(time.monotonic()):
+                    self.sync(session)
+        return self.offset
+
+    def now(self, session: Session = None) -> int:
+        return int(time.time()) + self.get_offset(session)
+
+    def sync(self, session: Session) -> bool:
         for _ in range(3):
+            request_start = time.time()
             server_time = get_steam_server_time(session)
             if server_time != -1:
-                time_delta = server_time - int(time.time())
-                logging.debug(f"Time delta from steam: {time_delta}")
-                return time_delta
-        logging.debug("Failed to get time delta from steam, use system time instead")
-        time_delta = 0
-    return time_delta
+                # 以请求往返的中点作为服务器返回时间对应的本地时间
+                self.offset = server_time - int((request_start + time.time()) / 2)
+                self._synced = True
+                self._next_sync = time.monotonic() + self.RESYNC_INTERVAL
+                self._clock_base = time.time() - time.monotonic()
+                logging.debug(f"Time delta from steam: {self.offset}")
+                return True
+        logging.debug("Failed to get time delta from steam, use last known delta instead")
+        self._next_sync = time.monotonic() + self.RETRY_INTERVAL
+        self._clock_base = time.time() - time.monotonic()
+        return False
+
+    def invalidate(self):
+        """怀疑时间不同步时调用(例如确认请求被拒绝), 下一次使用时会重新同步"""
+        self._next_sync = 0.0
+
+    def _needs_sync(self, monotonic_now: float) -> bool:
+        if monotonic_now >= self._next_sync:
+            return True
+        # 本地系统时间被调整后, 之前的差值已不再准确
+        return self._clock_base is not None and abs(time.time() - monotonic_now - self._clock_base) > self.MAX_CLOCK_JUMP
+
+
+time_offset = SteamTimeOffset()
+
+
+def try_to_get_time_delta_from_steam(session: Session = None) -> int:
+    return time_offset.get_offset(session)
+
+
+_hmac_cache = {}
+
+
+def _get_hmac(secret: str) -> hmac.HMAC:
+    """按 secret 缓存已初始化的 HMAC 对象, 每次生成时只需 copy 后 update"""
+    base = _hmac_cache.get(secret)
+    if base is None:
+        base = _hmac_cache[secret] = hmac.new(base64.b64decode(secret), digestmod=sha1)
+    return base.copy()
 
 
 def load_steam_guard(steam_guard) -> dict:
@@ -52,31 +117,83 @@ def load_steam_guard(steam_guard) -> dict:
 
 def generate_one_time_code(shared_secret: str, timestamp: int = None) -> str:
     if timestamp is None:
-        timestamp = int(time.time())
-        timestamp += try_to_get_time_delta_from_steam(Session())
-    time_buffer = struct.pack(">Q", timestamp // 30)  # pack as Big endian, uint64
-    time_hmac = hmac.new(base64.b64decode(shared_secret), time_buffer, digestmod=sha1).digest()
+        # 不传入时间戳时使用上一次同步得到的时间差, 不会发起同步; 需要同步时请传入 time_offset.now(session)
+        timestamp = time_offset.now()
+    time_hmac = _get_hmac(shared_secret)
+    time_hmac.update(struct.pack(">Q", timestamp // 30))  # pack as Big endian, uint64
+    time_hmac = time_hmac.digest()
     begin = ord(time_hmac[19:20]) & 0xF
     full_code = struct.unpack(">I", time_hmac[begin : begin + 4])[0] & 0x7FFFFFFF  # unpack as Big endian uint32
-    chars = "23456789BCDFGHJKMNPQRTVWXY"
     code = ""
 
     for _ in range(5):
-        full_code, i = divmod(full_code, len(chars))
-        code += chars[i]
+        full_code, i = divmod(full_code, len(CODE_CHARS))
+        code += CODE_CHARS[i]
 
     return code
 
 
 def generate_confirmation_key(identity_secret: str, tag: str, timestamp: int = None) -> bytes:
     if timestamp is None:
-        timestamp = int(time.time())
-        timestamp += try_to_get_time_delta_from_steam(Session())
-    buffer = struct.pack(">Q", timestamp) + tag.encode("ascii")
-    return base64.b64encode(hmac.new(base64.b64decode(identity_secret), buffer, digestmod=sha1).digest())
+        timestamp = time_offset.now()
+    confirmation_hmac = _get_hmac(identity_secret)
+    confirmation_hmac.update(struct.pack(">Q", timestamp) + tag.encode("ascii"))
+    return base64.b64encode(confirmation_hmac.digest())
 
 
 # It works, however it's different that one generated from mobile app
 def generate_device_id(steam_id: str) -> str:
     hexed_steam_id = sha1(steam_id.encode("ascii")).hexdigest()
     return "android:" + "-".join([hexed_steam_id[:8], hexed_steam_id[8:12], hexed_steam_id[12:16], hexed_steam_id[16:20], hexed_steam_id[20:32]])
+
+
+def _legacy_generate_one_time_code(shared_secret: str, timestamp: int) -> str:
+    """原先的实现: 每次调用都新建 Session(用于获取时间差), 并重新解码 secret 初始化 HMAC, 仅用于基准测试对比"""
+    Session().close()
+    time_hmac = hmac.new(base64.b64decode(shared_secret), struct.pack(">Q", timestamp // 30), digestmod=sha1).digest()
+    begin = ord(time_hmac[19:20]) & 0xF
+    full_code = struct.unpack(">I", time_hmac[begin : begin + 4])[0] & 0x7FFFFFFF
+    code = ""
+    for _ in range(5):
+        full_code, i = divmod(full_code, len(CODE_CHARS))
+        code += CODE_CHARS[i]
+    return code
+
+
+def _legacy_generate_confirmation_key(identity_secret: str, tag: str, timestamp: int) -> bytes:
+    Session().close()
+    return base64.b64encode(hmac.new(base64.b64decode(identity_secret), struct.pack(">Q", timestamp) + tag.encode("ascii"), digestmod=sha1).digest())
+
+
+def benchmark(calls: int = 10000) -> dict:
+    """
+    对比原先的实现与缓存 HMAC 后的 generate_one_time_code / generate_confirmation_key 单次调用耗时(微秒), 并校验两者结果一致
+    用法: python -m steampy.guard [调用次数]
+    """
+    secret = base64.b64encode(os.urandom(20)).decode()
+    timestamp = int(time.time())
+    assert _legacy_generate_one_time_code(secret, timestamp) == generate_one_time_code(secret, timestamp)
+    assert _legacy_generate_confirmation_key(secret, "conf", timestamp) == generate_confirmation_key(secret, "conf", timestamp)
+
+    def measure(call) -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        return (time.perf_counter() - start) / calls * 1000000
+
+    return {
+        "calls": calls,
+        "legacy_one_time_code_us": measure(lambda: _legacy_generate_one_time_code(secret, timestamp)),
+        "one_time_code_us": measure(lambda: generate_one_time_code(secret, timestamp)),
+        "legacy_confirmation_key_us": measure(lambda: _legacy_generate_confirmation_key(secret, "conf", timestamp)),
+        "confirmation_key_us": measure(lambda: generate_confirmation_key(secret, "conf", timestamp)),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    result = benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
+    print("调用次数: %d" % result["calls"])
+    print("一次性验证码: 原实现 %.2f us/次, 当前 %.2f us/次" % (result["legacy_one_time_code_us"], result["one_time_code_us"]))
+    print("确认密钥: 原实现 %.2f us/次, 当前 %.2f us/次" % (result["legacy_confirmation_key_us"], result["confirmation_key_us"]))
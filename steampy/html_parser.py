@@ -0,0 +1,112 @@
+import html
+import re
+from typing import Dict, Iterable, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401 可选依赖, 安装后使用更快的 lxml 解析器
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+INPUT_TAG_RE = re.compile(r"<input\b[^>]*>", re.IGNORECASE)
+TAG_ATTR_RE = re.compile(r"([\w.:-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)')")
+TRADE_OFFER_ID_RE = re.compile(r"id=[\"']tradeofferid_(\d+)[\"']")
+
+
+def set_html_parser(parser: str):
+    """指定 BeautifulSoup 使用的解析器, 例如 "lxml" 或 "html.parser" """
+    global HTML_PARSER
+    HTML_PARSER = parser
+
+
+def make_soup(markup: str) -> BeautifulSoup:
+    return BeautifulSoup(markup, HTML_PARSER)
+
+
+def extract_input_values(markup: str, names: Iterable[str]) -> Dict[str, str]:
+    """
+    用正则直接提取 <input name=... value=...> 的值, 不构建整棵DOM
+    只返回找到的字段, 调用方需自行判断是否需要回退到完整解析
+    """
+    wanted = set(names)
+    values = {}
+    for tag in INPUT_TAG_RE.findall(markup):
+        attrs = {key.lower(): html.unescape(double if double or not single else single) for key, double, single in TAG_ATTR_RE.findall(tag)}
+        name = attrs.get("name")
+        if name in wanted and name not in values and "value" in attrs:
+            values[name] = attrs["value"]
+            if len(values) == len(wanted):
+                break
+    return values
+
+
+def extract_trade_offer_id(markup: str) -> Optional[str]:
+    match = TRADE_OFFER_ID_RE.search(markup)
+    return match.group(1) if match else None
+
+
+def _sample_page(rows: int = 2000) -> str:
+    """生成一个体积接近真实报价/市场页面的示例页面, 末尾带有 openidForm 表单与报价号"""
+    body = "".join(
+        '<div class="market_listing_row" id="mylisting_%d"><span title="a">$%d.00</span><span title="b">($%d.50)</span>'
+        '<div class="market_listing_listed_date">1 Jan</div><input type="hidden" name="row_%d" value="%d"></div>' % (i, i, i, i, i)
+        for i in range(rows)
+    )
+    form = (
+        '<form id="openidForm" action="https://steamcommunity.com/openid/login" method="post">'
+        '<input type="hidden" name="action" value="steam_openid_login"><input type="hidden" name="openid.mode" value="checkid_setup">'
+        '<input type="hidden" name="openidparams" value="abc&amp;def"><input type="hidden" name="nonce" value="1234567890"></form>'
+    )
+    return '<html><body>%s<div class="tradeoffer" id="tradeofferid_6543210987">offer</div>%s</body></html>' % (body, form)
+
+
+def benchmark(paths: Iterable[str] = (), rounds: int = 10) -> Dict[str, float]:
+    """
+    对比原先的 BeautifulSoup + html.parser 完整解析与当前的解析方式(make_soup / 正则快速路径), 返回各方式的平均耗时(毫秒)
+    paths 为保存下来的真实页面文件, 未指定时使用生成的示例页面
+    用法: python -m steampy.html_parser [页面文件 ...]
+    """
+    import time
+
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    if not pages:
+        pages.append(_sample_page())
+    names = ["action", "openid.mode", "openidparams", "nonce"]
+
+    def bs4_inputs(page):
+        form = BeautifulSoup(page, "html.parser").find("form", {"id": "openidForm"})
+        return {name: form.find("input", {"name": name}).attrs["value"] for name in names} if form else {}
+
+    def bs4_trade_offer_id(page):
+        node = BeautifulSoup(page, "html.parser").select(".tradeoffer")
+        return node[0]["id"].split("_")[1] if node else None
+
+    cases = {
+        "html.parser 完整解析": lambda page: BeautifulSoup(page, "html.parser"),
+        "make_soup(%s) 完整解析" % HTML_PARSER: make_soup,
+        "html.parser 提取 openidForm 字段": bs4_inputs,
+        "extract_input_values 提取 openidForm 字段": lambda page: extract_input_values(page[page.find('id="openidForm"') :], names),
+        "html.parser 提取报价号": bs4_trade_offer_id,
+        "extract_trade_offer_id 提取报价号": extract_trade_offer_id,
+    }
+    result = {}
+    for name, case in cases.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for page in pages:
+                case(page)
+        result[name] = (time.perf_counter() - start) / (rounds * len(pages)) * 1000
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    for name, elapsed in benchmark(sys.argv[1:]).items():
+        print("%s: %.3f ms/页" % (name, elapsed))
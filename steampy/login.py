@@ -73,7 +73,7 @@ class LoginExecutor:
                 if self.shared_secret == "" and self.func_2fa_input is not None:
                     self.one_time_code = self.func_2fa_input()
                 else:
-                    self.one_time_code = guard.generate_one_time_code(self.shared_secret)
+                    self.one_time_code = guard.generate_one_time_code(self.shared_secret, guard.time_offset.now(self.session))
                 if self.one_time_code == "ok":
                     self._update_auth_session_protobuf(
                         client_id=auth_session.client_id,
@@ -316,7 +316,7 @@ class LoginExecutor:
 
     def _enter_steam_guard_and_email_auth_if_necessary(self, login_response: Response) -> Response:
         if "requires_twofactor" in login_response.json() and login_response.json()["requires_twofactor"]:
-            self.one_time_code = guard.generate_one_time_code(self.shared_secret)
+            self.one_time_code = guard.generate_one_time_code(self.shared_secret, guard.time_offset.now(self.session))
             return self._send_login_request()
         elif "emailauth_needed" in login_response.json() and login_response.json()["emailauth_needed"]:
             self.email_auth_code = self.get_email_on_time_code_func()
@@ -1,7 +1,9 @@
+import re
 import urllib.parse
 import json
 
 from decimal import Decimal
+from typing import Dict, Iterator, List, Tuple
 from requests import Session
 from steampy.confirmation import ConfirmationExecutor
 from steampy.exceptions import ApiException, TooManyRequests, LoginRequired
@@ -14,6 +16,8 @@ from steampy.utils import (
     get_market_sell_listings_from_api,
 )
 
+MY_LISTING_ID_PATTERN = re.compile(r'id="mylisting_(\d+)"')
+
 
 def login_required(func):
     def func_wrapper(self, *args, **kwargs):
@@ -31,6 +35,7 @@ class SteamMarket:
         self._steam_guard = None
         self._session_id = None
         self.was_login_executed = False
+        self._listings_snapshot = None  # 增量模式使用的上一次完整结果, 按页保存 listing id 与解析结果
 
     def _set_login_executed(self, steamguard: dict, session_id: str):
         self._steam_guard = steamguard
@@ -72,38 +77,112 @@ class SteamMarket:
         if '<span id="tabContentsMyActiveMarketListings_end">' in response.text:
             n_showing = int(text_between(response.text, '<span id="tabContentsMyActiveMarketListings_end">', "</span>"))
             n_total = int(text_between(response.text, '<span id="tabContentsMyActiveMarketListings_total">', "</span>").replace(",", ""))
-            if n_showing < n_total < 1000:
-                url = "%s/market/mylistings/render/?query=&start=%s&count=%s" % (SteamUrl.COMMUNITY_URL, n_showing, -1)
-                response = self._session.get(url)
-                if response.status_code != 200:
-                    raise ApiException("There was a problem getting the listings. http code: %s" % response.status_code)
-                jresp = response.json()
-                listing_id_to_assets_address = get_listing_id_to_assets_address_from_html(jresp.get("hovers"))
-                listings_2 = get_market_sell_listings_from_api(jresp.get("results_html"))
-                listings_2 = merge_items_with_descriptions_from_listing(listings_2, listing_id_to_assets_address, jresp.get("assets"))
-                listings["sell_listings"] = {**listings["sell_listings"], **listings_2["sell_listings"]}
-            else:
-                for i in range(0, n_total, 100):
-                    url = "%s/market/mylistings/?query=&start=%s&count=%s" % (SteamUrl.COMMUNITY_URL, n_showing + i, 100)
-                    response = self._session.get(url)
-                    if response.status_code != 200:
-                        raise ApiException("There was a problem getting the listings. http code: %s" % response.status_code)
-                    jresp = response.json()
-                    listing_id_to_assets_address = get_listing_id_to_assets_address_from_html(jresp.get("hovers"))
-                    listings_2 = get_market_sell_listings_from_api(jresp.get("results_html"))
-                    listings_2 = merge_items_with_descriptions_from_listing(listings_2, listing_id_to_assets_address, jresp.get("assets"))
-                    listings["sell_listings"] = {**listings["sell_listings"], **listings_2["sell_listings"]}
+            if n_showing < n_total:
+                # 页面上只显示前一部分, 其余的通过 JSON 接口分页获取, 不再受 1000 个上限的影响
+                for listing in self.iter_my_market_listings(start=n_showing):
+                    listings["sell_listings"][listing["listing_id"]] = listing
         return listings
 
+    @login_required
+    def get_my_market_listings_page(self, start: int = 0, count: int = 100) -> dict:
+        """
+        通过 mylistings/render 接口获取一页在售物品
+        返回 {"total_count": 在售总数, "start": 起始位置, "sell_listings": {listing_id: listing}}
+        """
+        return self._parse_my_market_listings_page(self._fetch_my_market_listings_page(start, count), start)
+
+    def _fetch_my_market_listings_page(self, start: int, count: int) -> dict:
+        url = "%s/market/mylistings/render/" % SteamUrl.COMMUNITY_URL
+        response = self._session.get(url, params={"query": "", "start": start, "count": count})
+        if response.status_code != 200:
+            raise ApiException("There was a problem getting the listings. http code: %s" % response.status_code)
+        jresp = response.json()
+        if not jresp.get("success"):
+            raise ApiException("There was a problem getting the listings. response: %s" % jresp)
+        return jresp
+
+    @staticmethod
+    def _parse_my_market_listings_page(jresp: dict, start: int) -> dict:
+        sell_listings = {}
+        if jresp.get("results_html"):
+            listing_id_to_assets_address = get_listing_id_to_assets_address_from_html(jresp.get("hovers") or "")
+            listings = get_market_sell_listings_from_api(jresp["results_html"])
+            listings = merge_items_with_descriptions_from_listing(listings, listing_id_to_assets_address, jresp.get("assets") or {})
+            sell_listings = listings["sell_listings"]
+        return {"total_count": int(jresp.get("total_count", 0)), "start": int(jresp.get("start", start)), "sell_listings": sell_listings}
+
+    @login_required
+    def iter_my_market_listings(self, start: int = 0, page_size: int = 100, incremental: bool = False) -> Iterator[dict]:
+        """
+        以生成器形式逐页返回在售物品, 页面通过带速率控制的会话依次请求
+        incremental=True 时, 某一页的 listing id 与上一次完整获取时同一页完全相同, 则直接复用上一次的解析结果, 不再解析该页 HTML
+        (上架后价格无法修改, listing id 相同即内容相同; 每一页都会核对, 后面页面的变化不会被遗漏)
+        """
+        snapshot = self._listings_snapshot if incremental and start == 0 else None
+        pages = {}
+        page_start = start
+        total = None
+        while total is None or page_start < total:
+            jresp = self._fetch_my_market_listings_page(page_start, page_size)
+            total = int(jresp.get("total_count", 0))
+            listing_ids = MY_LISTING_ID_PATTERN.findall(jresp.get("results_html") or "")
+            cached = snapshot["pages"].get(page_start) if snapshot else None
+            if cached is not None and cached[0] == listing_ids:
+                listings = cached[1]
+            else:
+                listings = list(self._parse_my_market_listings_page(jresp, page_start)["sell_listings"].values())
+            pages[page_start] = (listing_ids, listings)
+            yield from listings
+            if not listing_ids:
+                break
+            page_start += page_size
+        if start == 0:
+            self._listings_snapshot = {"pages": pages}
+
     @login_required
     def create_sell_order(self, assetid: str, game: GameOptions, money_to_receive: str) -> dict:
-        data = {"assetid": assetid, "sessionid": self._session_id, "contextid": game.context_id, "appid": game.app_id, "amount": 1, "price": money_to_receive}
-        headers = {"Referer": "%s/profiles/%s/inventory" % (SteamUrl.COMMUNITY_URL, self.get_steam64id_from_cookies())}
-        response = self._session.post(SteamUrl.COMMUNITY_URL + "/market/sellitem/", data, headers=headers).json()
+        response = self._post_sell_order(assetid, game, money_to_receive)
         if response.get("needs_mobile_confirmation"):
             return self._confirm_sell_listing(assetid)
         return response
 
+    @login_required
+    def create_sell_orders(self, orders: List[Tuple[str, GameOptions, str]]) -> Dict[str, dict]:
+        """
+        批量上架, orders 为 [(assetid, game, money_to_receive)]
+        先逐个提交上架请求(经由会话上的速率控制), 再一次性确认所有需要手机确认的上架
+        与 create_sell_order 不同, 单个上架请求失败不会抛出异常, 而是记为 {"success": False, "message": ...}
+        返回 {assetid: 上架响应}, 需要确认的响应中附带 confirmed 字段
+        """
+        con_executor = None
+        known_confirmation_ids = None
+        if self._steam_guard and self._steam_guard.get("identity_secret"):
+            con_executor = ConfirmationExecutor(self._steam_guard["identity_secret"], self.get_steam64id_from_cookies(), self._session)
+            # 批量上架时记录上架前的确认快照, 之后只需核对新出现的确认; 只有一个上架时快照省不下请求
+            if len(orders) > 1:
+                known_confirmation_ids = con_executor.get_confirmation_ids()
+        results = {}
+        needs_confirmation = []
+        for assetid, game, money_to_receive in orders:
+            assetid = str(assetid)
+            try:
+                response = self._post_sell_order(assetid, game, money_to_receive)
+            except Exception as e:
+                response = {"success": False, "message": str(e)}
+            results[assetid] = response
+            if response.get("needs_mobile_confirmation"):
+                needs_confirmation.append(assetid)
+        if needs_confirmation and con_executor is not None:
+            confirmed = con_executor.confirm_sell_listings(needs_confirmation, known_confirmation_ids)
+            for assetid in needs_confirmation:
+                results[assetid]["confirmed"] = confirmed.get(assetid, False)
+        return results
+
+    def _post_sell_order(self, assetid: str, game: GameOptions, money_to_receive: str) -> dict:
+        data = {"assetid": assetid, "sessionid": self._session_id, "contextid": game.context_id, "appid": game.app_id, "amount": 1, "price": money_to_receive}
+        headers = {"Referer": "%s/profiles/%s/inventory" % (SteamUrl.COMMUNITY_URL, self.get_steam64id_from_cookies())}
+        return self._session.post(SteamUrl.COMMUNITY_URL + "/market/sellitem/", data, headers=headers).json()
+
     @login_required
     def create_buy_order(self, market_name: str, price_single_item: str, quantity: int, game: GameOptions, currency: Currency = Currency.USD) -> dict:
         data = {
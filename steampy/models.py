@@ -28,6 +28,67 @@ class Asset:
         return {"appid": int(self.game.app_id), "contextid": self.game.context_id, "amount": self.amount, "assetid": self.asset_id}
 
 
+class InventoryItem:
+    """
+    精简的库存物品记录, 只保存插件常用的字段
+    完整的Steam描述按需从共享的描述字典中读取, 同时支持 item["market_hash_name"] 形式的字典式访问
+    """
+
+    __slots__ = ("assetid", "classid", "instanceid", "contextid", "appid", "amount", "market_hash_name", "tradable", "_descriptions")
+
+    def __init__(self, asset: dict, descriptions: dict, context_id: str = None) -> None:
+        self.assetid = asset.get("assetid") or asset["id"]
+        self.classid = asset["classid"]
+        self.instanceid = asset["instanceid"]
+        self.contextid = asset.get("contextid") or context_id
+        self.appid = asset.get("appid")
+        self.amount = asset.get("amount", "1")
+        self._descriptions = descriptions
+        description = descriptions.get(self.description_key, {})
+        self.market_hash_name = description.get("market_hash_name")
+        self.tradable = description.get("tradable")
+        if self.appid is None:
+            self.appid = description.get("appid")
+
+    @property
+    def description_key(self) -> str:
+        return self.classid + "_" + self.instanceid
+
+    @property
+    def description(self) -> dict:
+        return self._descriptions.get(self.description_key, {})
+
+    @property
+    def id(self) -> str:
+        return self.assetid
+
+    def __getitem__(self, key):
+        if key in self.__slots__[:-1] or key == "id":
+            return getattr(self, key)
+        return self.description[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.__slots__[:-1] or key == "id" or key in self.description
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_asset(self) -> dict:
+        return {"appid": self.appid, "contextid": self.contextid, "assetid": self.assetid, "classid": self.classid, "instanceid": self.instanceid, "amount": self.amount}
+
+    def to_dict(self) -> dict:
+        """与 merge_items 输出结构相同的完整字典"""
+        item = dict(self.description)
+        item.update({"contextid": self.contextid, "id": self.assetid, "amount": self.amount})
+        return item
+
+    def __repr__(self) -> str:
+        return f"InventoryItem(assetid={self.assetid!r}, market_hash_name={self.market_hash_name!r})"
+
+
 class Currency(enum.IntEnum):
     USD = 1
     GBP = 2
@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 各域名的初始/最小/最大速率(请求数每秒)与突发容量
+DEFAULT_HOST_LIMITS = {
+    "steamcommunity.com": {"rate": 1.0, "min_rate": 0.1, "max_rate": 5.0, "burst": 5},
+    "api.steampowered.com": {"rate": 2.0, "min_rate": 0.2, "max_rate": 10.0, "burst": 10},
+}
+
+# 视为被Steam限流的状态码
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class TokenBucket:
+    """
+    AIMD 令牌桶:
+      - 每次请求成功, 速率加性增加 increase_step
+      - 被限流时, 速率乘性降低 decrease_factor, 并在冷却时间内暂停发送
+    """
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float, burst: int, increase_step: float = 0.05, decrease_factor: float = 0.5):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, cooldown: float = 0):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + max(cooldown, 1 / self.rate))
+
+
+class RateController:
+    """每个Steam账号一个实例, 按域名分别限速"""
+
+    def __init__(self, host_limits: Optional[Dict[str, dict]] = None):
+        self.host_limits = host_limits or DEFAULT_HOST_LIMITS
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, url_or_host: str) -> Optional[TokenBucket]:
+        host = urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host
+        if not host:
+            return None
+        for limited_host, limits in self.host_limits.items():
+            if host == limited_host or host.endswith("." + limited_host):
+                with self._lock:
+                    if limited_host not in self._buckets:
+                        self._buckets[limited_host] = TokenBucket(**limits)
+                    return self._buckets[limited_host]
+        return None
+
+    def acquire(self, url: str):
+        bucket = self.get_bucket(url)
+        if bucket:
+            bucket.acquire()
+
+    def record(self, url: str, response: requests.Response):
+        bucket = self.get_bucket(url)
+        if not bucket:
+            return
+        if response.status_code in THROTTLE_STATUS_CODES:
+            bucket.on_throttle(self._get_retry_after(response))
+        elif response.status_code < 400:
+            bucket.on_success()
+
+    def penalize(self, url_or_host: str, cooldown: float = 0):
+        """由调用方在识别到风控(如接受报价时页面异常)时主动降速"""
+        bucket = self.get_bucket(url_or_host)
+        if bucket:
+            bucket.on_throttle(cooldown)
+
+    @staticmethod
+    def _get_retry_after(response: requests.Response) -> float:
+        try:
+            return float(response.headers.get("Retry-After", 0))
+        except ValueError:
+            return 0
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """挂载到 Session 上, 使经由该 Session 的所有请求都受 RateController 控制"""
+
+    def __init__(self, rate_controller: RateController, *args, **kwargs):
+        self.rate_controller = rate_controller
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        self.rate_controller.acquire(request.url)
+        response = super().send(request, *args, **kwargs)
+        self.rate_controller.record(request.url, response)
+        return response
@@ -0,0 +1,170 @@
+import threading
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import httpx  # 可选依赖, 安装 httpx[http2] 后可启用 HTTP/2
+except ImportError:
+    httpx = None
+
+
+class PooledTransport:
+    """
+    WebAPI 请求共享的连接池, 所有 SteamClient 复用同一组 keep-alive 连接, 避免每次调用都重新建立 TCP+TLS 连接
+    启用 HTTP/2 且已安装 httpx 时, 未使用加速(auth)的请求通过 HTTP/2 发送, 返回值同样转换为 requests.Response
+    连接池由所有账号共享, 因此不保存任何 Cookie, 避免一个账号的 Cookie 被带到另一个账号的请求中
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 20, http2: bool = False):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.http2 = http2 and httpx is not None
+        self._session = requests.Session()
+        self._session.cookies.set_policy(self._block_all_cookies())
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._http2_clients = {}
+        self._lock = threading.Lock()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: dict = None,
+        data: dict = None,
+        headers: dict = None,
+        verify=True,
+        auth=None,
+        proxies: Optional[dict] = None,
+        timeout: int = 15,
+        allow_redirects: bool = True,
+    ) -> requests.Response:
+        if self.http2 and auth is None:
+            client = self._get_http2_client(verify, proxies)
+            response = client.request(method, url, params=params, data=data, headers=dict(headers or {}), timeout=timeout, follow_redirects=allow_redirects)
+            return self._to_requests_response(response)
+        return self._session.request(
+            method,
+            url,
+            params=params,
+            data=data,
+            headers=headers,
+            verify=verify,
+            auth=auth,
+            proxies=proxies,
+            timeout=timeout,
+            allow_redirects=allow_redirects,
+        )
+
+    def _get_http2_client(self, verify, proxies: Optional[dict]):
+        proxy = (proxies or {}).get("https")
+        key = (verify, proxy)
+        with self._lock:
+            if key not in self._http2_clients:
+                limits = httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+                self._http2_clients[key] = httpx.Client(
+                    http2=True, verify=verify, proxy=proxy, limits=limits, cookies=CookieJar(policy=self._block_all_cookies())
+                )
+            return self._http2_clients[key]
+
+    @staticmethod
+    def _block_all_cookies() -> DefaultCookiePolicy:
+        return DefaultCookiePolicy(allowed_domains=[])
+
+    @staticmethod
+    def _to_requests_response(response) -> requests.Response:
+        """把 httpx.Response 转换为 requests.Response, 调用方无需区分两种后端"""
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.reason = response.reason_phrase
+        result.headers = CaseInsensitiveDict(response.headers.items())
+        result.url = str(response.url)
+        result.encoding = response.encoding
+        result.elapsed = response.elapsed
+        result._content = response.content
+        return result
+
+    def close(self):
+        self._session.close()
+        with self._lock:
+            for client in self._http2_clients.values():
+                client.close()
+            self._http2_clients.clear()
+
+
+_default_transport = PooledTransport()
+
+
+def get_transport() -> PooledTransport:
+    return _default_transport
+
+
+def configure_transport(pool_connections: int = 10, pool_maxsize: int = 20, http2: bool = False) -> PooledTransport:
+    """替换全局共享的连接池, 应在创建 SteamClient 之前调用"""
+    global _default_transport
+    old_transport = _default_transport
+    _default_transport = PooledTransport(pool_connections, pool_maxsize, http2)
+    old_transport.close()
+    return _default_transport
+
+
+def benchmark(calls: int = 200, port: int = 0) -> dict:
+    """
+    在本地启动一个模拟 WebAPI 的 HTTP 服务, 对比每次调用新建连接(requests.get)与复用连接池(PooledTransport)的单次请求耗时
+    用法: python -m steampy.transport [调用次数]
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持 keep-alive
+
+        def do_GET(self):
+            body = b'{"response": {"server_time": "0"}}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/ITwoFactorService/QueryTime/v1" % server.server_address[1]
+    transport = PooledTransport()
+    try:
+
+        def measure(call) -> float:
+            call()  # 预热, 不计入耗时
+            start = time.perf_counter()
+            for _ in range(calls):
+                call()
+            return (time.perf_counter() - start) / calls * 1000
+
+        result = {
+            "calls": calls,
+            "requests_get_ms": measure(lambda: requests.get(url, timeout=15).content),
+            "pooled_transport_ms": measure(lambda: transport.request("GET", url).content),
+        }
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    result = benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
+    print("调用次数: %d" % result["calls"])
+    print("每次新建连接 requests.get: %.3f ms/次" % result["requests_get_ms"])
+    print("共享连接池 PooledTransport: %.3f ms/次" % result["pooled_transport_ms"])
+    print("提升: %.1f%%" % ((1 - result["pooled_transport_ms"] / result["requests_get_ms"]) * 100))
@@ -9,10 +9,12 @@ from requests.structures import CaseInsensitiveDict
 from requests import Response
 from typing import List
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import Tag
 
+from steampy.description_cache import description_cache, make_description_key
 from steampy.models import GameOptions
 from steampy.exceptions import SteamError
+from steampy.html_parser import make_soup
 from steampy.steam_error_codes import STEAM_ERROR_CODES
 
 
@@ -67,16 +69,24 @@ def parse_price(price: str) -> decimal.Decimal:
     return decimal.Decimal(decimal_str)
 
 
+def intern_descriptions(descriptions: List[dict], appid=None) -> dict:
+    """
+    把响应中的描述写入全局描述缓存, 返回 {classid_instanceid: description}
+    已缓存的描述直接复用缓存中的对象, 相同物品的描述在进程内只保留一份
+    """
+    return {get_description_key(description): description_cache.put(make_description_key(description, appid), description) for description in descriptions}
+
+
 def merge_items_with_descriptions_from_inventory(inventory_response: dict, game: GameOptions) -> dict:
     inventory = inventory_response.get("assets", [])
     if not inventory:
         return {}
-    descriptions = {get_description_key(description): description for description in inventory_response["descriptions"]}
+    descriptions = intern_descriptions(inventory_response["descriptions"], game.app_id)
     return merge_items(inventory, descriptions, context_id=game.context_id)
 
 
 def merge_items_with_descriptions_from_offers(offers_response: dict) -> dict:
-    descriptions = {get_description_key(offer): offer for offer in offers_response["response"].get("descriptions", [])}
+    descriptions = intern_descriptions(offers_response["response"].get("descriptions", []))
     received_offers = offers_response["response"].get("trade_offers_received", [])
     sent_offers = offers_response["response"].get("trade_offers_sent", [])
     offers_response["response"]["trade_offers_received"] = list(map(lambda offer: merge_items_with_descriptions_from_offer(offer, descriptions), received_offers))
@@ -92,6 +102,11 @@ def merge_items_with_descriptions_from_offer(offer: dict, descriptions: dict) ->
     return offer
 
 
+def get_offer_description_keys(offers: List[dict]) -> list:
+    """报价中所有物品的描述缓存键"""
+    return [make_description_key(item) for offer in offers for key in ("items_to_give", "items_to_receive") for item in offer.get(key, [])]
+
+
 def merge_items_with_descriptions_from_listing(listings: dict, ids_to_assets_address: dict, descriptions: dict) -> dict:
     for listing_id, listing in listings.get("sell_listings").items():
         asset_address = ids_to_assets_address[listing_id]
@@ -104,6 +119,11 @@ def merge_items(items: List[dict], descriptions: dict, **kwargs) -> dict:
     merged_items = {}
     for item in items:
         description_key = get_description_key(item)
+        if description_key not in descriptions and "appid" in item:
+            # 响应中没有带描述(get_descriptions=0)时, 从全局描述缓存中查找
+            cached = description_cache.get(make_description_key(item))
+            if cached is not None:
+                descriptions[description_key] = cached
         if description_key not in descriptions:
             description = copy.copy(item)
             merged_items[description_key] = description
@@ -118,7 +138,7 @@ def merge_items(items: List[dict], descriptions: dict, **kwargs) -> dict:
 
 
 def get_market_listings_from_html(html: str) -> dict:
-    document = BeautifulSoup(html, "html.parser")
+    document = make_soup(html)
     nodes = document.select("div[id=myListings]")[0].findAll("div", {"class": "market_home_listing_table"})
     sell_listings_dict = {}
     buy_orders_dict = {}
@@ -152,7 +172,7 @@ def get_sell_listings_from_node(node: Tag) -> dict:
 
 
 def get_market_sell_listings_from_api(html: str) -> dict:
-    document = BeautifulSoup(html, "html.parser")
+    document = make_soup(html)
     sell_listings_dict = get_sell_listings_from_node(document)
     return {"sell_listings": sell_listings_dict}
 
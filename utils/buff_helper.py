@@ -7,10 +7,10 @@ import json5
 import qrcode
 import qrcode_terminal
 import requests
-from bs4 import BeautifulSoup
 from requests_toolbelt.multipart.encoder import MultipartEncoder
 
 from steampy.client import SteamClient
+from steampy.html_parser import extract_input_values, make_soup
 from utils.logger import handle_caught_exception
 from utils.notifier import send_notification
 from utils.static import BUFF_COOKIES_FILE_PATH
@@ -18,8 +18,14 @@ from utils.tools import get_encoding, logger
 
 
 def parse_openid_params(response: str) -> Dict[str, str]:
-    bs = BeautifulSoup(response, "html.parser")
     params_to_find = ["action", "openid.mode", "openidparams", "nonce"]
+    # 优先只截取 openidForm 表单, 用正则提取字段
+    form_start = response.find('id="openidForm"')
+    if form_start != -1:
+        params = extract_input_values(response[form_start : response.find("</form>", form_start)], params_to_find)
+        if len(params) == len(params_to_find):
+            return params
+    bs = make_soup(response)
     input_form = bs.find("form", {"id": "openidForm"})
     params = {}
     for param in params_to_find:
@@ -0,0 +1,284 @@
+import json
+import os
+import threading
+from typing import Dict, List
+
+from steampy.client import SteamClient
+from steampy.description_cache import description_cache, make_description_key
+from steampy.models import GameOptions, InventoryItem
+from steampy.utils import get_description_key
+from utils.logger import PluginLogger, handle_caught_exception
+from utils.static import CACHE_FOLDER
+from utils.tools import atomic_write_json
+
+logger = PluginLogger("InventoryCache")
+
+inventory_caches = {}  # (steamid, appid, contextid) -> InventoryCache
+inventory_caches_lock = threading.Lock()
+
+
+class InventoryCache:
+    """
+    Steam库存本地缓存
+      - 资产与描述保存在磁盘, 重启后可直接使用
+      - 描述按 classid_instanceid 去重, 同一描述只保存一份; 物品以精简的 InventoryItem 记录保存, 完整描述按需读取
+      - 刷新时先比较第一页, 库存没有变化则不再请求后续页面; 后续页面与缓存对齐后直接复用缓存中剩余的部分
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, steamid: str, game: GameOptions):
+        self.steamid = str(steamid)
+        self.game = game
+        self.path = os.path.join(CACHE_FOLDER, f"inventory_{self.steamid}_{game.app_id}_{game.context_id}.json")
+        self.total_inventory_count = 0
+        self._items: List[InventoryItem] = []
+        self._descriptions: Dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def load(self):
+        with self._lock:
+            self._loaded = True
+            if not os.path.exists(self.path):
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.total_inventory_count = data.get("total_inventory_count", 0)
+                self._descriptions = data.get("descriptions", {})
+                self._items = self._to_items(data.get("assets", []))
+            except Exception as e:
+                handle_caught_exception(e, known=True)
+                logger.warning(f"读取库存缓存失败, 将重新获取库存: {self.path}")
+                self.total_inventory_count = 0
+                self._items = []
+                self._descriptions = {}
+
+    def save(self):
+        with self._lock:
+            data = {
+                "total_inventory_count": self.total_inventory_count,
+                "assets": [item.to_asset() for item in self._items],
+                "descriptions": self._descriptions,
+            }
+        try:
+            atomic_write_json(self.path, data, ensure_ascii=False)
+        except Exception as e:
+            handle_caught_exception(e, known=True)
+            logger.warning(f"保存库存缓存失败: {self.path}")
+
+    def refresh(self, steam_client: SteamClient) -> bool:
+        """
+        与Steam同步库存, 返回库存是否发生变化
+        """
+        with self._lock:
+            if not self._loaded:
+                self.load()
+            page = steam_client.get_partner_inventory_page(self.steamid, self.game, count=self.PAGE_SIZE)
+            total = page.get("total_inventory_count", 0)
+            self._intern_descriptions(page.get("descriptions", []))
+            items = self._to_items(page.get("assets", []))
+
+            if total == self.total_inventory_count and self._item_keys(items) == self._item_keys(self._items[: len(items)]):
+                logger.debug("库存没有变化, 使用缓存")
+                return False
+
+            cached_index = {item.assetid: index for index, item in enumerate(self._items)}
+            fetched_pages = 1
+            while page.get("more_items"):
+                # 当前页与缓存中相同位置的资产完全一致, 且剩余数量吻合时, 认为之后的部分没有变化
+                last_index = cached_index.get(items[-1].assetid) if items else None
+                if last_index is not None:
+                    page_size = len(page.get("assets", []))
+                    start = last_index + 1 - page_size
+                    if (
+                        start >= 0
+                        and total - len(items) == len(self._items) - (last_index + 1)
+                        and self._item_keys(items[-page_size:]) == self._item_keys(self._items[start : last_index + 1])
+                    ):
+                        items += self._items[last_index + 1 :]
+                        break
+                page = steam_client.get_partner_inventory_page(self.steamid, self.game, page["last_assetid"], count=self.PAGE_SIZE)
+                fetched_pages += 1
+                self._intern_descriptions(page.get("descriptions", []))
+                items += self._to_items(page.get("assets", []))
+
+            self._items = items
+            self.total_inventory_count = total
+            self._prune_descriptions()
+            logger.debug(f"库存已更新, 共请求{fetched_pages}页, 当前共{len(self._items)}个物品")
+        self.save()
+        return True
+
+    def apply_delta(self, removed_assetids: List[str], added_assets: List[dict], descriptions: List[dict] = None) -> bool:
+        """
+        应用交易产生的库存增量, 无需重新下载整个库存
+        removed_assetids 为已转出的资产, added_assets 为新获得的资产(assetid 为交易后的新 id)
+        缓存尚未加载时不做处理, 返回是否已应用
+        """
+        with self._lock:
+            if not self._loaded or not self._items:
+                return False
+            self._intern_descriptions(descriptions or [])
+            removed = set(removed_assetids)
+            existing = {item.assetid for item in self._items}
+            # Steam库存中新获得的物品排在最前面
+            added = [item for item in self._to_items(added_assets) if item.assetid not in existing and item.description_key in self._descriptions]
+            kept = [item for item in self._items if item.assetid not in removed]
+            removed_count = len(self._items) - len(kept)
+            if not removed_count and not added:
+                return False
+            self.total_inventory_count += len(added) - removed_count
+            self._items = added + kept
+            self._prune_descriptions()
+            logger.debug(f"已应用交易增量: 转出{removed_count}个, 获得{len(added)}个")
+        self.save()
+        return True
+
+    def get_items(self) -> Dict[str, InventoryItem]:
+        """
+        返回 {assetid: InventoryItem}, 支持与 merge_items_with_descriptions_from_inventory 结果相同的字典式访问
+        """
+        with self._lock:
+            return {item.assetid: item for item in self._items}
+
+    def _to_items(self, assets: List[dict]) -> List[InventoryItem]:
+        return [InventoryItem(asset, self._descriptions, self.game.context_id) for asset in assets]
+
+    def _intern_descriptions(self, descriptions: List[dict]):
+        for description in descriptions:
+            # 已存在的描述继续沿用原对象, 不做替换; 新描述与全局描述缓存共享同一对象
+            key = get_description_key(description)
+            if key not in self._descriptions:
+                self._descriptions[key] = description_cache.put(make_description_key(description, self.game.app_id), description)
+
+    def _prune_descriptions(self):
+        used = {item.description_key for item in self._items}
+        for key in list(self._descriptions.keys()):
+            if key not in used:
+                del self._descriptions[key]
+
+    @staticmethod
+    def _item_keys(items: List[InventoryItem]) -> list:
+        return [(item.assetid, item.amount) for item in items]
+
+
+def get_inventory_cache(steamid: str, game: GameOptions) -> InventoryCache:
+    key = (str(steamid), game.app_id, game.context_id)
+    with inventory_caches_lock:
+        if key not in inventory_caches:
+            inventory_caches[key] = InventoryCache(steamid, game)
+        return inventory_caches[key]
+
+
+def benchmark(assets: int = 5000, unique_descriptions: int = 800, rounds: int = 5) -> dict:
+    """
+    在生成的库存上对比原先每次下载完整库存并逐个复制描述(merge_items_with_descriptions_from_inventory)与 InventoryCache 的耗时和内存峰值
+    分别测量库存没有变化的刷新, 以及新增一个物品(其余页面与缓存对齐)的刷新; 不发起网络请求, 各方式处理的页面数记为 pages
+    用法: python -m utils.inventory_cache [资产数量] [不同描述数量]
+    """
+    import copy
+    import tempfile
+    import time
+    import tracemalloc
+
+    from steampy.utils import merge_items_with_descriptions_from_inventory
+
+    game = GameOptions.CS
+
+    def make_description(index: int) -> dict:
+        return {
+            "appid": int(game.app_id),
+            "classid": str(index),
+            "instanceid": "0",
+            "market_hash_name": f"Item {index}",
+            "tradable": 1,
+            "icon_url": "x" * 120,
+            "descriptions": [{"type": "html", "value": "y" * 200} for _ in range(5)],
+            "tags": [{"category": "Type", "internal_name": f"tag_{i}", "localized_tag_name": "z" * 20} for i in range(6)],
+            "actions": [{"link": "steam://rungame/730/" + "a" * 80, "name": "Inspect"}],
+        }
+
+    class InventoryStandIn:
+        """模拟 Steam 库存分页接口, 统计请求的页数"""
+
+        def __init__(self, asset_list):
+            self.asset_list = asset_list
+            self.pages = 0
+
+        def get_partner_inventory_page(self, steamid, game, start_assetid=None, count=1000):
+            self.pages += 1
+            start = 0 if start_assetid is None else next(i for i, asset in enumerate(self.asset_list) if asset["assetid"] == start_assetid) + 1
+            page_assets = self.asset_list[start : start + count]
+            keys = {asset["classid"] for asset in page_assets}
+            page = {
+                "assets": copy.deepcopy(page_assets),
+                "descriptions": [make_description(int(key)) for key in keys],
+                "total_inventory_count": len(self.asset_list),
+                "more_items": start + count < len(self.asset_list),
+            }
+            if page["more_items"]:
+                page["last_assetid"] = page_assets[-1]["assetid"]
+            return page
+
+    asset_list = [
+        {"appid": int(game.app_id), "contextid": game.context_id, "assetid": str(10**10 + i), "classid": str(i % unique_descriptions), "instanceid": "0", "amount": "1"}
+        for i in range(assets)
+    ]
+    changed_asset_list = [dict(asset_list[0], assetid=str(10**11), classid="0")] + asset_list
+
+    def legacy_fetch(asset_list):
+        stand_in = InventoryStandIn(asset_list)
+        response = {"assets": [], "descriptions": []}
+        page = {"more_items": True}
+        last_assetid = None
+        while page.get("more_items"):
+            page = stand_in.get_partner_inventory_page(None, game, last_assetid)
+            response["assets"] += page["assets"]
+            response["descriptions"] += page["descriptions"]
+            last_assetid = page.get("last_assetid")
+        return merge_items_with_descriptions_from_inventory(response, game), stand_in.pages
+
+    def measure(call) -> dict:
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            result, pages = call()
+        elapsed = (time.perf_counter() - start) / rounds * 1000
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {"ms": elapsed, "peak_mb": peak / 1024 / 1024, "pages": pages}
+
+    result = {"assets": assets, "unique_descriptions": unique_descriptions}
+    result["legacy_full_download"] = measure(lambda: legacy_fetch(asset_list))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = InventoryCache("0", game)
+        cache.path = os.path.join(tmp_dir, "inventory.json")
+        cache.refresh(InventoryStandIn(asset_list))
+
+        def cached_refresh(asset_list):
+            stand_in = InventoryStandIn(asset_list)
+            cache.refresh(stand_in)
+            return cache.get_items(), stand_in.pages
+
+        result["cache_unchanged"] = measure(lambda: cached_refresh(asset_list))
+
+        def changed_refresh():
+            # 每轮先恢复到变化前的状态, 再刷新到新增一个物品后的库存
+            cache.refresh(InventoryStandIn(asset_list))
+            return cached_refresh(changed_asset_list)
+
+        result["cache_one_new_item"] = measure(changed_refresh)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = [int(arg) for arg in sys.argv[1:3]]
+    result = benchmark(*args)
+    print("资产数量: %d, 不同描述数量: %d" % (result["assets"], result["unique_descriptions"]))
+    for name in ("legacy_full_download", "cache_unchanged", "cache_one_new_item"):
+        stats = result[name]
+        print("%s: %.1f ms/次, 内存峰值 %.1f MB, 请求 %d 页" % (name, stats["ms"], stats["peak_mb"], stats["pages"]))
@@ -180,6 +180,11 @@ class PluginLogger:
         else:
             self.pluginName = pluginName
 
+    @staticmethod
+    def isEnabledFor(level) -> bool:
+        """是否有日志处理器会输出该级别的日志, 可在构造开销较大的日志内容前判断"""
+        return logger.isEnabledFor(level) and any(level >= handler.level for handler in logger.handlers)
+
     def debug(self, msg, *args, **kwargs):
         logger.debug(f"{self.pluginName} {msg}", *args, **kwargs)
 
@@ -0,0 +1,144 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from utils.logger import PluginLogger, handle_caught_exception
+from utils.static import CACHE_FOLDER
+from utils.tools import atomic_write_json
+
+logger = PluginLogger("PriceCache")
+
+PriceKey = Tuple[Any, str, Hashable]  # (template_id, kind, filter)
+
+
+class PriceCache:
+    """
+    悠悠插件共享的市场价格缓存, 以 (template_id, kind, filter) 为键
+      - 每条记录带有各自的过期时间, 超出容量时淘汰最久未使用的记录
+      - 同一个键的并发查询只会请求一次, 其余调用方等待并共享结果
+      - 定期把未过期的记录写入磁盘, 重启后可直接使用
+    """
+
+    SAVE_INTERVAL = 30
+
+    def __init__(self, path: str = os.path.join(CACHE_FOLDER, "uu_price_cache.json"), maxsize: int = 5000):
+        self.path = path
+        self.maxsize = maxsize
+        self._data: "OrderedDict[PriceKey, Tuple[Any, float]]" = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._inflight = {}  # key -> {"event", "done", "value"}, 正在进行中的查询
+        self._dirty = False
+        self._last_save = 0.0
+        self._load()
+        atexit.register(self.save)
+
+    @staticmethod
+    def _encode_key(key: PriceKey) -> str:
+        return json.dumps([key[0], key[1], key[2]])
+
+    @staticmethod
+    def _decode_key(raw: str) -> PriceKey:
+        template_id, kind, price_filter = json.loads(raw)
+        return (template_id, kind, tuple(price_filter) if isinstance(price_filter, list) else price_filter)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            for raw_key, (value, expires_at) in data.items():
+                if expires_at > now:
+                    self._data[self._decode_key(raw_key)] = (value, expires_at)
+            logger.debug(f"已从磁盘加载{len(self._data)}条价格缓存")
+        except Exception as e:
+            handle_caught_exception(e, "PriceCache", known=True)
+            logger.warning(f"读取价格缓存失败, 将重新查询价格: {self.path}")
+            self._data.clear()
+
+    def get(self, key: PriceKey) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: PriceKey, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            self._dirty = True
+            should_save = time.time() - self._last_save >= self.SAVE_INTERVAL
+        if should_save:
+            self.save()
+
+    def get_or_load(self, key: PriceKey, loader: Callable[[], Any], ttl: float, cache_if: Callable[[Any], bool] = None) -> Tuple[Any, bool]:
+        """
+        返回 (价格, 是否来自缓存)
+        缓存未命中时调用 loader 查询; 已有其他线程在查询同一个键时, 等待其完成后复用结果
+        cache_if 返回 False 的结果(例如查询失败得到的 0)不会写入缓存
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value, True
+            with self._lock:
+                flight = self._inflight.get(key)
+                owner = flight is None
+                if owner:
+                    flight = self._inflight[key] = {"event": threading.Event(), "done": False, "value": None}
+            if not owner:
+                flight["event"].wait()
+                if flight["done"]:
+                    return flight["value"], True
+                # 查询方出现异常, 重新竞争查询
+                continue
+            try:
+                value = loader()
+                flight["value"], flight["done"] = value, True
+                if value is not None and (cache_if is None or cache_if(value)):
+                    self.put(key, value, ttl)
+                return value, False
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                flight["event"].set()
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            data = {self._encode_key(key): [value, expires_at] for key, (value, expires_at) in self._data.items() if expires_at > now}
+            self._dirty = False
+            self._last_save = now
+        try:
+            with self._save_lock:
+                atomic_write_json(self.path, data, ensure_ascii=False)
+        except Exception as e:
+            handle_caught_exception(e, "PriceCache", known=True)
+            logger.warning(f"保存价格缓存失败: {self.path}")
+
+
+_price_cache = None
+_price_cache_lock = threading.Lock()
+
+
+def get_price_cache() -> PriceCache:
+    global _price_cache
+    with _price_cache_lock:
+        if _price_cache is None:
+            _price_cache = PriceCache()
+        return _price_cache
@@ -18,6 +18,8 @@ UU_TOKEN_FILE_PATH = os.path.join(CONFIG_FOLDER, "uu_token_{steam_username}.txt"
 STEAM_ACCOUNT_INFO_FILE_PATH = os.path.join(CONFIG_FOLDER, "steam_account_info.json5")
 SESSION_FOLDER = "session"
 os.makedirs(SESSION_FOLDER, exist_ok=True)
+CACHE_FOLDER = "cache"
+os.makedirs(CACHE_FOLDER, exist_ok=True)
 SUPPORT_GAME_TYPES = [{"game": "csgo", "app_id": 730}, {"game": "dota2", "app_id": 570}]
 ECOSTEAM_RSAKEY_FILE = os.path.join(CONFIG_FOLDER, "rsakey.txt")
 BUILD_INFO = info
@@ -48,6 +50,11 @@ DEFAULT_STEAM_ACCOUNT_JSON = """
   // Steam 登录时填写的密码
   "steam_password": ""
 }
+// 多账号: 将整个文件改为数组, 每个元素是一个与上面格式相同的账号配置, 例如
+// [
+//   {"shared_secret": "", "identity_secret": "", "steam_username": "账号1", "steam_password": ""},
+//   {"shared_secret": "", "identity_secret": "", "steam_username": "账号2", "steam_password": ""}
+// ]
 """
 
 DEFAULT_CONFIG_JSON = r"""
@@ -72,6 +79,11 @@ DEFAULT_CONFIG_JSON = r"""
     "http": "http://127.0.0.1:7890",
     "https": "http://127.0.0.1:7890"
   },
+
+  // Steam WebAPI 共享连接池大小
+  "steam_http_pool_size": 20,
+  // 是否使用HTTP/2连接Steam WebAPI(需要额外安装 httpx[http2]，开启本地加速时不生效)
+  "steam_http2": false,
   
   "notify_service": {
     // 通知器 使用Apprise格式 支持Telegram、钉钉、飞书、WxPusher、Server酱等
@@ -127,7 +139,13 @@ DEFAULT_CONFIG_JSON = r"""
     // 出租价格比例, 如现价1000元, 0.001比例，出租价格为1000 * 0.001 = 1元 (不会低于正常计算的出租价格)
     "fix_lease_ratio": 0.001,
     // 赔付方式: 0(非会员), 7(v1), 其余的不知道
-    "compensation_type": 7
+    "compensation_type": 7,
+    // 市场租金查询结果的缓存时间（单位：分钟），缓存会保存到磁盘，重启后仍然有效
+    "price_cache_minutes": 20,
+    // 查询租金时每秒最多请求悠悠接口的次数，触发悠悠风控时会自动降速
+    "max_requests_per_second": 1.0,
+    // 同时查询租金的线程数
+    "price_query_workers": 4
   },
   // 悠悠有品出售自动上架配置
   "uu_auto_sell_item": {
@@ -141,6 +159,8 @@ DEFAULT_CONFIG_JSON = r"""
     "run_time": "15:30",
     // 每隔多长时间重新请求市场并改价一次（单位：分钟）
     "sell_interval": 20,
+    // 市场售价查询结果的缓存时间（单位：分钟），缓存会保存到磁盘，重启后仍然有效
+    "price_cache_minutes": 5,
     // 价格高于 max_on_sale_price 的物品不会上架，设置为0则不限制
     "max_on_sale_price": 1000,
     // 已上架的物品可以定时修改价格。设置的轮询间隔，单位为分钟
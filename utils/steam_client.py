@@ -1,3 +1,4 @@
+import atexit
 import base64
 import json
 import os
@@ -13,18 +14,24 @@ from requests.exceptions import RequestException
 
 import steampy.exceptions
 from steampy.client import STEAM_USER_AGENT, SteamClient
+from steampy.description_cache import description_cache, make_description_key
 from steampy.exceptions import ApiException
-from steampy.models import GameOptions
+from steampy.models import GameOptions, TradeOfferState
+from steampy.transport import configure_transport, get_transport
 from utils import static
+from utils.inventory_cache import get_inventory_cache
 from utils.logger import PluginLogger, handle_caught_exception
 from utils.notifier import send_notification
+from utils.trade_delta import get_trade_delta_worker
 from utils.static import SESSION_FOLDER, STEAM_ACCOUNT_INFO_FILE_PATH, CONFIG_FILE_PATH
-from utils.tools import accelerator, get_encoding, pause
+from utils.tools import accelerator, atomic_write_json, get_encoding, pause
 
 logger = PluginLogger("SteamClient")
 
 steam_client_mutex = {}  # 每个SteamClient实例对应一个互斥锁
 token_refresh_thread = []  # 后台刷新线程引用
+trade_offer_watchers = {}  # 每个Steam账号对应一个报价监视线程
+trade_offer_watchers_lock = threading.Lock()
 
 try:
     with open(CONFIG_FILE_PATH, "r", encoding=get_encoding(CONFIG_FILE_PATH)) as f:
@@ -57,68 +64,157 @@ def _get_token_cache_path(username: str) -> str:
     return os.path.join(SESSION_FOLDER, f"steam_account_{username.lower()}.json")
 
 
-def _load_token_cache(username: str) -> dict:
-    cache_path = _get_token_cache_path(username)
-    if os.path.exists(cache_path):
-        try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            handle_caught_exception(e, known=True)
-            logger.warning(f"读取token缓存文件失败: {cache_path}")
-    return {}
-
-
-def _save_token_cache(username: str, auth_info: Dict[str, Any]):
+class TokenStore:
     """
-    auth_info 期望结构:
-    {
-        steamid: str,
-        access_token: Optional[str],
-        refresh_token: Optional[str]
-    }
+    内存中的token状态, 每个账号一份, 过期时间只在token变化时解析一次
+    写入磁盘由后台线程合并后原子写入(write-behind), 程序退出时会立即写入尚未保存的数据
     """
-    cache_path = _get_token_cache_path(username)
-    steamid = auth_info.get("steamid")
-    access_token = auth_info.get("access_token")
-    refresh_token = auth_info.get("refresh_token")
-
-    access_exp = _parse_jwt_exp(access_token)
-    refresh_exp = _parse_jwt_exp(refresh_token)
-
-    cache_data = {
-        "steamid": steamid,
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "access_token_exp_timestamp": access_exp,
-        "refresh_token_exp_timestamp": refresh_exp,
-    }
-
-    # 友好可读时间
-    try:
-        if access_exp:
-            cache_data["access_token_exp_readable"] = datetime.fromtimestamp(access_exp).strftime("%Y-%m-%d %H:%M:%S")
-        if refresh_exp:
-            cache_data["refresh_token_exp_readable"] = datetime.fromtimestamp(refresh_exp).strftime("%Y-%m-%d %H:%M:%S")
-    except Exception:
-        pass
 
-    try:
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(cache_data, f, indent=2, ensure_ascii=False)
-        logger.info("已保存token缓存: %s", cache_path)
+    WRITE_DELAY = 1
+
+    def __init__(self):
+        self._cache: Dict[str, dict] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._write_event = threading.Event()
+        self._writer = None
+
+    def get(self, username: str) -> dict:
+        key = username.lower()
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = self._read(username)
+            return dict(self._cache[key])
+
+    def update(self, username: str, auth_info: Dict[str, Any]) -> dict:
+        """
+        auth_info 期望结构:
+        {
+            steamid: str,
+            access_token: Optional[str],
+            refresh_token: Optional[str]
+        }
+        """
+        old = self.get(username)
+        access_token = auth_info.get("access_token")
+        refresh_token = auth_info.get("refresh_token")
+        # token 没有变化时沿用已解析的过期时间
+        access_exp = old.get("access_token_exp_timestamp", 0) if access_token and access_token == old.get("access_token") else _parse_jwt_exp(access_token)
+        refresh_exp = old.get("refresh_token_exp_timestamp", 0) if refresh_token and refresh_token == old.get("refresh_token") else _parse_jwt_exp(refresh_token)
+
+        cache_data = {
+            "steamid": auth_info.get("steamid"),
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "access_token_exp_timestamp": access_exp,
+            "refresh_token_exp_timestamp": refresh_exp,
+        }
+
+        # 友好可读时间
+        try:
+            if access_exp:
+                cache_data["access_token_exp_readable"] = datetime.fromtimestamp(access_exp).strftime("%Y-%m-%d %H:%M:%S")
+            if refresh_exp:
+                cache_data["refresh_token_exp_readable"] = datetime.fromtimestamp(refresh_exp).strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            pass
+
+        with self._lock:
+            self._cache[username.lower()] = cache_data
+            self._dirty.add(username)
+            self._start_writer()
+        self._write_event.set()
+        logger.info("已更新token缓存: %s", username)
         if access_exp:
             logger.info(" access_token 过期时间: %s", cache_data.get("access_token_exp_readable"))
         if refresh_exp:
             logger.info(" refresh_token 过期时间: %s", cache_data.get("refresh_token_exp_readable"))
+        return dict(cache_data)
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            pending = [(username, dict(self._cache[username.lower()])) for username in dirty]
+        for username, cache_data in pending:
+            cache_path = _get_token_cache_path(username)
+            try:
+                atomic_write_json(cache_path, cache_data, indent=2, ensure_ascii=False)
+                logger.debug(f"已保存token缓存: {cache_path}")
+            except Exception as e:
+                handle_caught_exception(e, known=True)
+                logger.error(f"保存token缓存失败: {cache_path}")
+
+    def _start_writer(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            self._write_event.wait()
+            # 短暂等待以合并连续的多次更新
+            time.sleep(self.WRITE_DELAY)
+            self._write_event.clear()
+            self.flush()
+
+    @staticmethod
+    def _read(username: str) -> dict:
+        cache_path = _get_token_cache_path(username)
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception as e:
+                handle_caught_exception(e, known=True)
+                logger.warning(f"读取token缓存文件失败: {cache_path}")
+        return {}
+
+
+token_store = TokenStore()
+
+
+def _load_token_cache(username: str) -> dict:
+    return token_store.get(username)
+
+
+def _save_token_cache(username: str, auth_info: Dict[str, Any]):
+    token_store.update(username, auth_info)
+
+
+def _get_session_snapshot_path(username: str) -> str:
+    return os.path.join(SESSION_FOLDER, f"steam_session_{username.lower()}.json")
+
+
+def save_session_snapshot(client: SteamClient):
+    """保存完整的会话快照(cookie/steamid), 下次启动时可直接恢复而无需登录"""
+    if not client.username:
+        return
+    snapshot_path = _get_session_snapshot_path(client.username)
+    try:
+        atomic_write_json(snapshot_path, client.export_session_snapshot(), ensure_ascii=False)
+        logger.debug(f"已保存Steam会话快照: {snapshot_path}")
     except Exception as e:
         handle_caught_exception(e, known=True)
-        logger.error(f"保存token缓存失败: {cache_path}")
+        logger.warning(f"保存Steam会话快照失败: {snapshot_path}")
+
+
+def _load_session_snapshot(username: str) -> dict:
+    snapshot_path = _get_session_snapshot_path(username)
+    if os.path.exists(snapshot_path):
+        try:
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            handle_caught_exception(e, known=True)
+            logger.warning(f"读取Steam会话快照失败: {snapshot_path}")
+    return {}
 
 
 def _bind_client_credentials(client: SteamClient, username: str, password: str):
     client.username = username
     client._password = password
+    client.session_mutex = steam_client_mutex.get(username)
 
 
 def _refresh_steam_session(client: SteamClient) -> bool:
@@ -141,6 +237,7 @@ def _refresh_steam_session(client: SteamClient) -> bool:
             auth_info = client.loginByRefreshToken(refresh_token, steamid, client.steam_guard)
             if auth_info and isinstance(auth_info, dict):
                 _save_token_cache(username, auth_info)
+                save_session_snapshot(client)
                 logger.info("Steam 会话 refresh_token 刷新成功")
                 return True
             raise Exception("loginByRefreshToken 未返回有效 auth_info")
@@ -153,6 +250,7 @@ def _refresh_steam_session(client: SteamClient) -> bool:
         auth_info = client.relogin()
         if auth_info and isinstance(auth_info, dict):
             _save_token_cache(username, auth_info)
+            save_session_snapshot(client)
             logger.info("Steam 会话账密重新登录成功")
             return True
         raise Exception("relogin 未返回有效 auth_info")
@@ -182,6 +280,17 @@ def _setup_client_session(client: SteamClient, config: dict):
         logger.info("已经启用Steam代理")
 
 
+def _setup_transport(config: dict):
+    pool_size = config.get("steam_http_pool_size", 20)
+    http2 = config.get("steam_http2", False)
+    transport = get_transport()
+    if transport.pool_maxsize == pool_size and transport.http2 == http2:
+        return
+    transport = configure_transport(pool_maxsize=pool_size, http2=http2)
+    if http2 and not transport.http2:
+        logger.warning("未安装 httpx[http2]，Steam WebAPI 将继续使用HTTP/1.1")
+
+
 def _check_proxy_availability(config: dict) -> bool:
     if not config.get("use_proxies", False):
         return True
@@ -211,7 +320,7 @@ class TokenRefreshThread(threading.Thread):
     """
     后台维护 access_token / refresh_token
     策略:
-      - 每次循环检查距离 access_token 过期时间
+      - 根据内存中的 access_token 过期时间, 直接等待到过期前 1 小时
       - 距离过期 < 3600 秒则尝试刷新 (loginByRefreshToken)
       - 如果 session 失效或刷新失败 -> relogin()
       - 若完全失败 -> 发送通知
@@ -223,6 +332,13 @@ class TokenRefreshThread(threading.Thread):
         self.config = config
         self.stop_event = threading.Event()
 
+    # access_token 距离过期多久时刷新
+    REFRESH_LEAD = 3600
+    # 两次会话检查之间的最长间隔
+    MAX_WAIT = 6 * 3600
+    # 已过期但刷新失败时的重试间隔
+    RETRY_WAIT = 300
+
     def run(self):
         while not self.stop_event.is_set():
             try:
@@ -230,34 +346,25 @@ class TokenRefreshThread(threading.Thread):
             except Exception as e:
                 handle_caught_exception(e, known=True)
                 logger.error("后台Token刷新循环出现异常")
-            # 计算下一次检查间隔
+            # 直接等待到下一次需要刷新的时间点
             wait_seconds = self._compute_wait_interval()
+            logger.debug(f"下一次检查Steam会话将在{int(wait_seconds)}秒后")
             self.stop_event.wait(wait_seconds)
 
-    def _compute_wait_interval(self) -> int:
+    def _compute_wait_interval(self) -> float:
         """
-        基于缓存中 access_token 过期时间决定下一次检查:
-          - 距离过期 > 6h: 3h 后检查
-          - 距离过期 1h~6h: 1h 后检查
-          - 距离过期 < 1h: 10 分钟后检查
-          - 没有过期信息: 默认 6 小时
+        根据内存中 access_token 的过期时间计算下一次检查的时间点:
+          - 在过期前 REFRESH_LEAD 秒醒来刷新
+          - 最长不超过 MAX_WAIT, 以便定期检查会话是否被Steam注销
+          - 已到刷新时间(刷新失败)时, RETRY_WAIT 秒后重试
         """
-        try:
-            cache = _load_token_cache(self.steam_client.username)
-            exp = cache.get("access_token_exp_timestamp", 0)
-            if not exp:
-                return 6 * 3600
-            now = int(time.time())
-            remain = exp - now
-            if remain <= 0:
-                return 300  # 已过期, 5分钟后再试(避免频密)
-            if remain > 6 * 3600:
-                return 3 * 3600
-            if remain > 3600:
-                return 3600
-            return 600
-        except Exception:
-            return 6 * 3600
+        exp = _load_token_cache(self.steam_client.username).get("access_token_exp_timestamp", 0)
+        if not exp:
+            return self.MAX_WAIT
+        remain = exp - self.REFRESH_LEAD - time.time()
+        if remain <= 0:
+            return self.RETRY_WAIT
+        return min(remain, self.MAX_WAIT)
 
     def _refresh_cycle(self):
         try:
@@ -267,7 +374,7 @@ class TokenRefreshThread(threading.Thread):
                 access_exp = cache.get("access_token_exp_timestamp", 0)
                 now = int(time.time())
                 need_refresh = False
-                if access_exp and access_exp - now < 3600:  # 1 小时内过期
+                if access_exp and access_exp - now < self.REFRESH_LEAD:  # 1 小时内过期
                     need_refresh = True
 
                 if not self.steam_client.is_session_alive():
@@ -291,19 +398,224 @@ class TokenRefreshThread(threading.Thread):
         self.stop_event.set()
 
 
-# ================== 登录主流程 ==========================
+# ================== 交易报价监视线程 ====================
 
 
-def login_to_steam(config: dict):
+class TradeOfferWatcher(threading.Thread):
     """
-    登录策略 (优先级):
-    1) 缓存的 access_token (未过期)
-    2) refresh_token 登录
-    3) 账密登录
+    每个Steam账号共享一个报价监视线程, 代替各插件各自轮询Steam
+    策略:
+      - 每轮先请求开销很小的 GetTradeOffersSummary, 只有报价数量发生变化时才拉取完整报价; 重叠窗口内已见过的报价不算作变化
+      - 通过 IEconService/GetTradeOffers 的 time_historical_cutoff 与 cursor 增量拉取报价
+      - 拉取报价时不带描述, 只有出现描述缓存中没有的物品时才重新请求描述
+      - 在内存中按 tradeofferid 维护报价索引
+      - 报价新增或状态变化时推送给所有订阅者: callback(offer, old_state)
     """
-    global token_refresh_thread
 
-    # 读取Steam账号信息
+    # 增量拉取时向前多取的秒数, 避免本地与Steam时间差导致漏掉报价
+    CUTOFF_MARGIN = 120
+    # 非活跃报价在索引中保留的时间
+    INACTIVE_RETENTION = 24 * 3600
+    # 即使摘要没有变化, 也至少每隔这么久完整拉取一次报价
+    FULL_POLL_INTERVAL = 600
+    # 摘要中表示自上次拉取后有新报价或报价有更新的字段
+    SUMMARY_CHANGE_KEYS = ("new_received_count", "updated_received_count", "newly_accepted_sent_count", "updated_sent_count")
+    SUMMARY_PENDING_KEYS = ("pending_received_count", "pending_sent_count", "escrow_received_count", "escrow_sent_count")
+
+    def __init__(self, steam_client: SteamClient, mutex, interval: int = 30):
+        super().__init__(daemon=True)
+        self.steam_client = steam_client
+        self.mutex = mutex
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.wakeup_event = threading.Event()
+        self._offers: Dict[str, dict] = {}
+        self._offers_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._subscribers = []
+        self._last_poll_time = 0
+        self._last_pending = None
+        self._force_full_poll = False
+
+    def subscribe(self, callback, replay: bool = True):
+        """
+        订阅报价变化。replay 为 True 时, 会立即把索引中现有的活跃报价推送给该订阅者
+        """
+        with self._offers_lock:
+            self._subscribers.append(callback)
+            current = [offer for offer in self._offers.values() if offer.get("trade_offer_state") == TradeOfferState.Active] if replay else []
+        for offer in current:
+            self._notify(callback, offer, None)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._offers_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def get_offer(self, trade_offer_id) -> Optional[dict]:
+        with self._offers_lock:
+            return self._offers.get(str(trade_offer_id))
+
+    def get_active_offers(self, received: bool = True) -> list:
+        with self._offers_lock:
+            return [
+                offer
+                for offer in self._offers.values()
+                if offer.get("trade_offer_state") == TradeOfferState.Active and bool(offer.get("is_our_offer")) != received
+            ]
+
+    def refresh(self, full: bool = False):
+        """唤醒监视线程立即进行一次轮询, full 为 True 时跳过摘要检查直接拉取完整报价"""
+        if full:
+            self._force_full_poll = True
+        self.wakeup_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.poll()
+            except requests.exceptions.RequestException:
+                logger.warning("获取Steam交易报价失败，请检查网络连接或代理设置")
+            except Exception as e:
+                handle_caught_exception(e, known=True)
+                logger.error("交易报价监视线程出现异常")
+            self.wakeup_event.wait(self.interval)
+            self.wakeup_event.clear()
+
+    def poll(self) -> list:
+        """
+        增量拉取一次报价, 返回本次发生变化的报价列表
+        """
+        with self._poll_lock:
+            poll_start = int(time.time())
+            cutoff = (self._last_poll_time or poll_start) - self.CUTOFF_MARGIN
+            if not self._should_fetch_offers(poll_start, cutoff):
+                return []
+            self._force_full_poll = False
+            offers = []
+            cursor = 0
+            while True:
+                with self.mutex:
+                    response = self.steam_client.get_trade_offers_page(time_historical_cutoff=cutoff, cursor=cursor).get("response", {})
+                    if self._has_uncached_items(response):
+                        response = self.steam_client.get_trade_offers_page(time_historical_cutoff=cutoff, cursor=cursor, get_descriptions=True).get("response", {})
+                        description_cache.put_many(response.get("descriptions", []))
+                offers += response.get("trade_offers_received", [])
+                offers += response.get("trade_offers_sent", [])
+                cursor = response.get("next_cursor", 0)
+                if not cursor:
+                    break
+            self._last_poll_time = poll_start
+
+            changes = []
+            with self._offers_lock:
+                for offer in offers:
+                    trade_offer_id = str(offer["tradeofferid"])
+                    old_offer = self._offers.get(trade_offer_id)
+                    old_state = old_offer.get("trade_offer_state") if old_offer else None
+                    self._offers[trade_offer_id] = offer
+                    if old_state != offer.get("trade_offer_state"):
+                        changes.append((offer, old_state))
+                self._prune(poll_start)
+                subscribers = list(self._subscribers)
+
+            if changes:
+                logger.debug(f"检测到{len(changes)}个交易报价发生变化")
+            for offer, old_state in changes:
+                for callback in subscribers:
+                    self._notify(callback, offer, old_state)
+            return [offer for offer, _ in changes]
+
+    def _should_fetch_offers(self, now: int, cutoff: int) -> bool:
+        if self._force_full_poll or not self._last_poll_time or now - self._last_poll_time >= self.FULL_POLL_INTERVAL:
+            return True
+        try:
+            with self.mutex:
+                summary = self.steam_client.get_trade_offers_summary(time_last_visit=cutoff).get("response", {})
+        except Exception as e:
+            handle_caught_exception(e, known=True)
+            logger.debug("获取报价摘要失败, 直接拉取完整报价")
+            return True
+        pending = tuple(summary.get(key, 0) for key in self.SUMMARY_PENDING_KEYS)
+        # 重叠窗口内上一轮已经拉取过的报价也会计入摘要, 只有超出这部分的数量才表示有新的变化
+        seen = self._seen_summary_counts(cutoff)
+        changed = pending != self._last_pending or any(summary.get(key, 0) > seen[key] for key in self.SUMMARY_CHANGE_KEYS)
+        self._last_pending = pending
+        return changed
+
+    def _seen_summary_counts(self, cutoff: int) -> Dict[str, int]:
+        """按摘要字段统计索引中 cutoff 之后更新过的报价, 即上一轮已经见过、会被摘要重复计入的报价"""
+        counts = dict.fromkeys(self.SUMMARY_CHANGE_KEYS, 0)
+        with self._offers_lock:
+            for offer in self._offers.values():
+                if offer.get("time_updated", 0) < cutoff:
+                    continue
+                state = offer.get("trade_offer_state")
+                if offer.get("is_our_offer"):
+                    counts["updated_sent_count"] += 1
+                    if state == TradeOfferState.Accepted:
+                        counts["newly_accepted_sent_count"] += 1
+                else:
+                    counts["updated_received_count"] += 1
+                    if state == TradeOfferState.Active and offer.get("time_created", 0) >= cutoff:
+                        counts["new_received_count"] += 1
+        return counts
+
+    @staticmethod
+    def _has_uncached_items(response: dict) -> bool:
+        keys = []
+        for offer in response.get("trade_offers_received", []) + response.get("trade_offers_sent", []):
+            for item in offer.get("items_to_give", []) + offer.get("items_to_receive", []):
+                keys.append(make_description_key(item))
+        return bool(description_cache.missing(keys))
+
+    def _prune(self, now: int):
+        for trade_offer_id, offer in list(self._offers.items()):
+            if offer.get("trade_offer_state") == TradeOfferState.Active:
+                continue
+            if now - offer.get("time_updated", now) > self.INACTIVE_RETENTION:
+                del self._offers[trade_offer_id]
+
+    @staticmethod
+    def _notify(callback, offer, old_state):
+        try:
+            callback(offer, old_state)
+        except Exception as e:
+            handle_caught_exception(e, known=True)
+            logger.error("交易报价订阅者处理报价变化时出现异常")
+
+    def stop(self):
+        self.stop_event.set()
+        self.wakeup_event.set()
+
+
+def get_trade_offer_watcher(steam_client: SteamClient, mutex=None, interval: Optional[int] = None) -> TradeOfferWatcher:
+    """
+    获取(必要时启动)该Steam账号共享的报价监视线程。
+    多个插件请求不同的轮询间隔时, 使用其中最短的一个
+    """
+    with trade_offer_watchers_lock:
+        watcher = trade_offer_watchers.get(steam_client.username)
+        if watcher is None or not watcher.is_alive():
+            if mutex is None:
+                mutex = steam_client_mutex[steam_client.username]
+            watcher = TradeOfferWatcher(steam_client, mutex, interval or 30)
+            trade_offer_watchers[steam_client.username] = watcher
+            watcher.start()
+        elif interval and interval < watcher.interval:
+            watcher.interval = interval
+            watcher.refresh()
+        return watcher
+
+
+# ================== 登录主流程 ==========================
+
+
+def _read_steam_account_infos() -> Optional[list]:
+    """
+    读取Steam账号配置文件, 文件可以是单个账号对象, 也可以是账号对象数组(多账号)
+    """
     try:
         with open(STEAM_ACCOUNT_INFO_FILE_PATH, "r", encoding=get_encoding(STEAM_ACCOUNT_INFO_FILE_PATH)) as f:
             try:
@@ -318,13 +630,60 @@ def login_to_steam(config: dict):
         pause()
         return None
 
-    if not isinstance(steam_account_info, dict):
-        logger.error("配置文件格式错误，请检查配置文件")
+    steam_account_infos = steam_account_info if isinstance(steam_account_info, list) else [steam_account_info]
+    if not steam_account_infos:
+        logger.error("配置文件中没有任何Steam账号，请检查配置文件")
         return None
-    for key, value in steam_account_info.items():
-        if not value:
-            logger.error(f"Steam账号配置文件中 {key} 为空，请检查配置文件")
+    for steam_account_info in steam_account_infos:
+        if not isinstance(steam_account_info, dict):
+            logger.error("配置文件格式错误，请检查配置文件")
             return None
+        for key, value in steam_account_info.items():
+            if not value:
+                logger.error(f"Steam账号配置文件中 {key} 为空，请检查配置文件")
+                return None
+    return steam_account_infos
+
+
+def login_to_steam_accounts(config: dict) -> list:
+    """
+    登录配置文件中的所有Steam账号, 返回登录成功的 SteamClient 列表
+    各账号共享连接池、日志、通知与缓存, 各自拥有独立的 SteamClient、互斥锁、刷新线程与报价监视线程
+    """
+    steam_account_infos = _read_steam_account_infos()
+    if steam_account_infos is None:
+        return []
+    steam_clients = []
+    for steam_account_info in steam_account_infos:
+        if len(steam_account_infos) > 1:
+            logger.info(f"正在登录Steam账号 {steam_account_info.get('steam_username', '')} ...")
+        client = login_to_steam(config, steam_account_info)
+        if client is None:
+            logger.error(f"Steam账号 {steam_account_info.get('steam_username', '')} 登录失败, 已跳过")
+            continue
+        # 每个账号在登录后启动一个报价监视线程, 所有插件接受报价时都复用其报价索引, 不依赖某个插件是否启用
+        get_trade_offer_watcher(client, steam_client_mutex[client.username])
+        steam_clients.append(client)
+    return steam_clients
+
+
+def login_to_steam(config: dict, steam_account_info: Optional[dict] = None):
+    """
+    登录策略 (优先级):
+    1) 缓存的 access_token (未过期)
+    2) refresh_token 登录
+    3) 账密登录
+    未传入 steam_account_info 时读取配置文件中的第一个账号
+    """
+    global token_refresh_thread
+
+    if steam_account_info is None:
+        steam_account_infos = _read_steam_account_infos()
+        if steam_account_infos is None:
+            return None
+        if len(steam_account_infos) > 1:
+            logger.warning("检测到多个Steam账号配置, 仅登录第一个账号")
+        steam_account_info = steam_account_infos[0]
 
     username = steam_account_info.get("steam_username", "")
     password = steam_account_info.get("steam_password", "")
@@ -332,16 +691,24 @@ def login_to_steam(config: dict):
         logger.error("Steam用户名或密码为空，请检查配置文件")
         return None
     if steam_client_mutex.get(username) is None:
-        steam_client_mutex[username] = threading.Lock()
+        # 可重入: 持有账号锁的线程(如刷新线程)探测会话时, 刷新 access_token 需要再次获取该锁
+        steam_client_mutex[username] = threading.RLock()
 
     config["use_proxies"] = config.get("use_proxies", False)
-    if not _check_proxy_availability(config):
-        pause()
-        return None
+    _setup_transport(config)
 
     token_cache = _load_token_cache(username)
     now = int(time.time())
 
+    # 0. 尝试从会话快照热启动, 不发起网络请求, 会话校验在后台进行
+    client = _warm_start_from_snapshot(config, steam_account_info, username, password, token_cache)
+    if client is not None:
+        return client
+
+    if not _check_proxy_availability(config):
+        pause()
+        return None
+
     # 1. 尝试使用缓存 access_token
     access_token = token_cache.get("access_token")
     access_exp = token_cache.get("access_token_exp_timestamp", 0)
@@ -357,6 +724,7 @@ def login_to_steam(config: dict):
             if client.set_and_verify_access_token(steamid_cache, access_token, steam_account_info):
                 logger.info("使用缓存 access_token 登录成功")
                 _bind_client_credentials(client, username, password)
+                save_session_snapshot(client)
                 # 启动刷新线程
                 _start_token_refresh_thread(client, config)
                 return client
@@ -390,6 +758,7 @@ def login_to_steam(config: dict):
                     logger.info("使用 refresh_token 登录成功")
                     _save_token_cache(username, auth_info)
                     _bind_client_credentials(client, username, password)
+                    save_session_snapshot(client)
                     _start_token_refresh_thread(client, config)
                     return client
                 else:
@@ -415,6 +784,7 @@ def login_to_steam(config: dict):
             _bind_client_credentials(client, username, password)
             if auth_info and isinstance(auth_info, dict):
                 _save_token_cache(username, auth_info)
+            save_session_snapshot(client)
             _start_token_refresh_thread(client, config)
             return client
         else:
@@ -453,6 +823,50 @@ def login_to_steam(config: dict):
         return None
 
 
+def _warm_start_from_snapshot(config: dict, steam_account_info: dict, username: str, password: str, token_cache: dict) -> Optional[SteamClient]:
+    access_exp = token_cache.get("access_token_exp_timestamp", 0)
+    if not access_exp or access_exp - time.time() <= 60:
+        return None
+    snapshot = _load_session_snapshot(username)
+    if not snapshot:
+        return None
+    try:
+        if config.get("use_proxies", False):
+            client = SteamClient(api_key="", proxies=config["proxies"])
+        else:
+            client = SteamClient(api_key="")
+        _setup_client_session(client, config)
+        if not client.restore_session_snapshot(snapshot, steam_account_info):
+            return None
+        if client.access_token != token_cache.get("access_token"):
+            logger.debug("会话快照与token缓存不一致, 跳过热启动")
+            return None
+    except Exception as e:
+        handle_caught_exception(e, known=True)
+        logger.warning("从会话快照恢复失败")
+        return None
+    _bind_client_credentials(client, username, password)
+    client.refreshToken = token_cache.get("refresh_token")
+    logger.info("已从会话快照恢复Steam会话, 正在后台校验会话有效性...")
+    threading.Thread(target=_verify_warm_session, args=(client,), daemon=True).start()
+    _start_token_refresh_thread(client, config)
+    return client
+
+
+def _verify_warm_session(client: SteamClient):
+    try:
+        if client.is_session_alive():
+            logger.info("会话快照校验通过")
+            return
+        logger.warning("会话快照已失效, 正在刷新Steam会话...")
+        with steam_client_mutex[client.username]:
+            if not _refresh_steam_session(client):
+                send_notification(client, "从会话快照恢复后, Steam 会话刷新失败，请检查账号或网络", title="Steam 会话刷新失败")
+    except Exception as e:
+        handle_caught_exception(e, known=True)
+        logger.error("后台校验会话快照时出现异常")
+
+
 def _start_token_refresh_thread(steam_client: SteamClient, config: dict):
     global token_refresh_thread
     try:
@@ -542,7 +956,19 @@ def external_handler(tradeOfferId, desc) -> bool:
         return False
 
 
-def accept_trade_offer(client: SteamClient, mutex, tradeOfferId, retry=False, desc="", network_retry_count=0, reportToExternal=True, session_retry=False):
+def _get_watched_offer(client: SteamClient, tradeOfferId) -> Optional[dict]:
+    """若报价监视线程已索引该报价, 直接复用, 省去一次报价查询"""
+    watcher = trade_offer_watchers.get(client.username)
+    return watcher.get_offer(tradeOfferId) if watcher else None
+
+
+def accept_trade_offer(
+    client: SteamClient, mutex, tradeOfferId, retry=False, desc="", network_retry_count=0, reportToExternal=True, session_retry=False, use_watched_offer=True
+):
+    """
+    use_watched_offer 为 False 时不复用监视线程中的报价, 重新查询报价状态
+    重试或批量接受失败后回退到此处时, 报价可能已被接受过, 缓存中的"活跃"状态已经过期
+    """
     max_network_retries = 3
     network_retry_delay = 5
 
@@ -552,7 +978,8 @@ def accept_trade_offer(client: SteamClient, mutex, tradeOfferId, retry=False, de
 
     try:
         with mutex:
-            client.accept_trade_offer(str(tradeOfferId))
+            client.accept_trade_offer(str(tradeOfferId), _get_watched_offer(client, tradeOfferId) if use_watched_offer else None)
+        get_trade_delta_worker().submit(client, mutex, tradeOfferId)
         send_notification(client, f"报价号：{tradeOfferId}\n{desc}", title="接受报价成功")
         return True
     except Exception as e:
@@ -575,6 +1002,7 @@ def accept_trade_offer(client: SteamClient, mutex, tradeOfferId, retry=False, de
                     network_retry_count=network_retry_count + 1,
                     reportToExternal=False,
                     session_retry=session_retry,
+                    use_watched_offer=False,
                 )
             else:
                 logger.error(f"接受报价号{tradeOfferId}网络错误重试次数已达到上限({max_network_retries})，操作失败")
@@ -611,6 +1039,7 @@ def accept_trade_offer(client: SteamClient, mutex, tradeOfferId, retry=False, de
                         network_retry_count=network_retry_count,
                         reportToExternal=False,
                         session_retry=True,
+                        use_watched_offer=False,
                     )
                 logger.error(f"接受报价号{tradeOfferId}失败：Steam会话刷新失败，放弃本次处理")
                 send_notification(client, f"报价号：{tradeOfferId}\n{desc}", title="接受报价失败(会话刷新失败)")
@@ -631,6 +1060,8 @@ def accept_trade_offer(client: SteamClient, mutex, tradeOfferId, retry=False, de
             return False
         
         if "substring not found" in str(e):
+            # 页面被风控, 降低 steamcommunity.com 的请求速率
+            client.rate_controller.penalize("steamcommunity.com", cooldown=30)
             logger.error(f"由于网络被Steam风控，报价号 {tradeOfferId} 处理失败，请检查服务器IP/代理软件或稍后再试。")
             handle_caught_exception(e, "SteamClient", known=True)
             return False
@@ -641,12 +1072,50 @@ def accept_trade_offer(client: SteamClient, mutex, tradeOfferId, retry=False, de
         return False
 
 
+def accept_trade_offers(client: SteamClient, mutex, trade_offers: Dict[str, str], reportToExternal=True) -> Dict[str, bool]:
+    """
+    批量接受报价, trade_offers 为 {报价号: 描述}
+    所有报价统一进行一次手机确认; 批量处理失败的报价会回退到 accept_trade_offer 逐个重试
+    """
+    result = {}
+    pending = {}
+    for tradeOfferId, desc in trade_offers.items():
+        tradeOfferId = str(tradeOfferId)
+        if reportToExternal and not external_handler(tradeOfferId, desc):
+            result[tradeOfferId] = True
+            continue
+        pending[tradeOfferId] = desc
+    if not pending:
+        return result
+
+    try:
+        with mutex:
+            batch_result = client.accept_trade_offers(list(pending.keys()), {tradeOfferId: _get_watched_offer(client, tradeOfferId) for tradeOfferId in pending})
+    except Exception as e:
+        handle_caught_exception(e, "SteamClient", known=True)
+        logger.warning("批量接受报价失败，将逐个重试")
+        batch_result = {}
+
+    for tradeOfferId, desc in pending.items():
+        if batch_result.get(tradeOfferId) is True:
+            get_trade_delta_worker().submit(client, mutex, tradeOfferId)
+            send_notification(client, f"报价号：{tradeOfferId}\n{desc}", title="接受报价成功")
+            result[tradeOfferId] = True
+        else:
+            result[tradeOfferId] = accept_trade_offer(client, mutex, tradeOfferId, desc=desc, reportToExternal=False, use_watched_offer=False)
+    if len(pending) > 1:
+        logger.info(f"批量接受报价完成，成功 {sum(result[tradeOfferId] for tradeOfferId in pending)}/{len(pending)} 个")
+    return result
+
+
 def get_cs2_inventory(client: SteamClient, mutex):
     inventory = None
     try:
+        inventory_cache = get_inventory_cache(client.get_steam64id_from_cookies(), GameOptions.CS)
         with mutex:
-            inventory = client.get_my_inventory(game=GameOptions.CS)  # type: ignore
-            logger.log(5, "获取到的Steam库存:" + json.dumps(inventory, ensure_ascii=False))
+            inventory_cache.refresh(client)
+        inventory = inventory_cache.get_items()
+        logger.log(5, "获取到的Steam库存:" + json.dumps(inventory, ensure_ascii=False, default=lambda item: item.to_dict()))
     except Exception as e:
         handle_caught_exception(e, "SteamClient", known=True)
         send_notification(client, "获取库存失败，请检查服务器网络", title="获取库存失败")
@@ -1,3 +1,4 @@
+import json
 import os
 import random
 import re
@@ -31,6 +32,69 @@ def get_encoding(file_path):
     return charset
 
 
+# 先写入临时文件再替换, 避免写入过程中程序退出导致文件损坏
+def atomic_write_json(file_path, data, **kwargs):
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, **kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+# 获取当前进程占用的物理内存(字节), 无法获取时返回 None
+def get_memory_usage():
+    try:
+        if os.name == "nt":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            get_process_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+            get_process_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+            if get_process_memory_info(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        if os.path.exists("/proc/self/statm"):
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        import resource
+        import sys
+
+        # macOS 上 ru_maxrss 的单位是字节, 其余系统为 KB; 这里取到的是峰值
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+    except Exception:
+        return None
+
+
+# 输出多账号模式下每个账号平均占用的内存, baseline 为登录任何账号之前的进程内存
+def log_memory_per_account(account_count: int, baseline, stage: str = ""):
+    current = get_memory_usage()
+    if current is None or baseline is None or account_count <= 0:
+        return
+    per_account = (current - baseline) / account_count
+    logger.info(
+        f"{stage}进程内存 {current / 1024 / 1024:.1f} MB，其中基础占用 {baseline / 1024 / 1024:.1f} MB，"
+        f"{account_count} 个账号平均每个账号占用 {per_account / 1024 / 1024:.1f} MB"
+    )
+
+
 def pause():
     if not static.no_pause:
         logger.info("点击回车键继续...")
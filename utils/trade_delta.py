@@ -0,0 +1,156 @@
+import queue
+import threading
+from typing import Dict, List
+
+from steampy.client import SteamClient
+from utils.inventory_cache import inventory_caches, inventory_caches_lock
+from utils.logger import PluginLogger, handle_caught_exception
+from utils.trade_history import get_trade_history_store
+
+logger = PluginLogger("TradeDelta")
+
+# ETradeStatus
+TRADE_STATUS_COMPLETE = 3
+TRADE_STATUS_IN_ESCROW = 10
+TRADE_STATUS_ESCROW_ROLLBACK = 11
+
+
+class TradeDelta:
+    """
+    一笔交易造成的库存变化
+      - removed: 已转出的资产 [{appid, contextid, assetid, ...}]
+      - added: 新获得的资产, assetid 已替换为交易后的新 id
+      - asset_id_map: 转出资产的 {原assetid: 对方库存中的新assetid}, 用于更新按 assetid 建立的上架索引
+      - trade: GetTradeStatus 返回的原始交易, 会同时写入本地交易历史
+    """
+
+    def __init__(self, steamid: str, trade_offer_id: str, trade: dict, descriptions: List[dict]):
+        self.steamid = str(steamid)
+        self.trade_offer_id = str(trade_offer_id)
+        self.tradeid = str(trade.get("tradeid"))
+        self.trade = trade
+        self.status = trade.get("status")
+        self.removed = trade.get("assets_given", [])
+        self.added = [
+            dict(asset, assetid=asset["new_assetid"], contextid=asset.get("new_contextid", asset.get("contextid")))
+            for asset in trade.get("assets_received", [])
+            if asset.get("new_assetid")
+        ]
+        self.asset_id_map = {asset["assetid"]: asset["new_assetid"] for asset in self.removed if asset.get("new_assetid")}
+        self.descriptions = descriptions
+
+    def __repr__(self) -> str:
+        return f"TradeDelta(trade_offer_id={self.trade_offer_id!r}, removed={len(self.removed)}, added={len(self.added)})"
+
+
+class TradeDeltaWorker(threading.Thread):
+    """
+    报价接受成功后, 在后台通过 GetTradeStatus 获取资产的新旧 assetid 对应关系
+    得到的库存增量会直接应用到已加载的库存缓存, 并推送给所有订阅者: callback(delta)
+    """
+
+    # 交易完成需要一点时间, 查询失败或交易未完成时的重试次数与间隔
+    MAX_ATTEMPTS = 6
+    RETRY_INTERVAL = 5
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self._queue = queue.Queue()
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+
+    def subscribe(self, callback):
+        with self._subscribers_lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._subscribers_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def submit(self, steam_client: SteamClient, mutex, trade_offer_id: str):
+        self._queue.put((steam_client, mutex, str(trade_offer_id), 1))
+
+    def run(self):
+        while True:
+            steam_client, mutex, trade_offer_id, attempt = self._queue.get()
+            try:
+                delta = self._fetch_delta(steam_client, mutex, trade_offer_id)
+            except Exception as e:
+                handle_caught_exception(e, "TradeDelta", known=True)
+                delta = None
+            if delta is False:
+                continue
+            if delta is not None:
+                self._publish(delta)
+            elif attempt < self.MAX_ATTEMPTS:
+                threading.Timer(self.RETRY_INTERVAL, self._queue.put, ((steam_client, mutex, trade_offer_id, attempt + 1),)).start()
+            else:
+                logger.debug(f"报价{trade_offer_id}的交易结果获取失败, 库存将在下次刷新时同步")
+
+    def _fetch_delta(self, steam_client: SteamClient, mutex, trade_offer_id: str):
+        """返回 None 表示交易结果暂不可用, 稍后重试; 返回 False 表示交易已回滚, 不再重试"""
+        with mutex:
+            offer = steam_client.get_trade_offer(trade_offer_id, merge=False)["response"]["offer"]
+        tradeid = offer.get("tradeid")
+        if not tradeid:
+            return None
+        with mutex:
+            response = steam_client.get_trade_status(tradeid).get("response", {})
+        trades = response.get("trades", [])
+        if not trades:
+            return None
+        status = trades[0].get("status")
+        if status == TRADE_STATUS_ESCROW_ROLLBACK:
+            # 暂挂期内被回滚的交易, 资产已退回原库存, 不能作为增量应用, 交由下次刷新库存时同步
+            logger.debug(f"报价{trade_offer_id}的交易已被回滚, 不应用库存增量")
+            return False
+        if status not in (TRADE_STATUS_COMPLETE, TRADE_STATUS_IN_ESCROW):
+            return None
+        return TradeDelta(steam_client.get_steam64id_from_cookies(), trade_offer_id, trades[0], response.get("descriptions", []))
+
+    def _publish(self, delta: TradeDelta):
+        logger.debug(f"获取到报价{delta.trade_offer_id}的库存增量: {delta}")
+        apply_delta_to_inventory_caches(delta)
+        try:
+            get_trade_history_store(delta.steamid).record_trade(delta.trade, delta.descriptions)
+        except Exception as e:
+            handle_caught_exception(e, "TradeDelta", known=True)
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(delta)
+            except Exception as e:
+                handle_caught_exception(e, "TradeDelta", known=True)
+
+
+def apply_delta_to_inventory_caches(delta: TradeDelta):
+    """把增量应用到该账号已加载的库存缓存上, 按 appid/contextid 分组"""
+    removed: Dict[tuple, List[str]] = {}
+    added: Dict[tuple, List[dict]] = {}
+    for asset in delta.removed:
+        removed.setdefault((str(asset.get("appid")), str(asset.get("contextid"))), []).append(asset["assetid"])
+    for asset in delta.added:
+        added.setdefault((str(asset.get("appid")), str(asset.get("contextid"))), []).append(asset)
+    for app_id, context_id in set(removed) | set(added):
+        with inventory_caches_lock:
+            inventory_cache = inventory_caches.get((delta.steamid, app_id, context_id))
+        if inventory_cache is None:
+            continue
+        descriptions = [description for description in delta.descriptions if str(description.get("appid", app_id)) == app_id]
+        inventory_cache.apply_delta(removed.get((app_id, context_id), []), added.get((app_id, context_id), []), descriptions)
+
+
+_trade_delta_worker = None
+_trade_delta_worker_lock = threading.Lock()
+
+
+def get_trade_delta_worker() -> TradeDeltaWorker:
+    global _trade_delta_worker
+    with _trade_delta_worker_lock:
+        if _trade_delta_worker is None:
+            _trade_delta_worker = TradeDeltaWorker()
+            _trade_delta_worker.start()
+        return _trade_delta_worker
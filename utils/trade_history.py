@@ -0,0 +1,242 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from steampy.client import SteamClient
+from steampy.description_cache import description_cache, make_description_key
+from utils.logger import PluginLogger, handle_caught_exception
+from utils.static import CACHE_FOLDER
+
+logger = PluginLogger("TradeHistory")
+
+trade_history_stores = {}  # steamid -> TradeHistoryStore
+trade_history_stores_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    tradeid TEXT PRIMARY KEY,
+    steamid_other TEXT,
+    time_init INTEGER NOT NULL,
+    status INTEGER,
+    raw TEXT
+);
+CREATE TABLE IF NOT EXISTS trade_assets (
+    tradeid TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    appid TEXT,
+    contextid TEXT,
+    assetid TEXT,
+    new_assetid TEXT,
+    new_contextid TEXT,
+    classid TEXT,
+    instanceid TEXT,
+    amount TEXT,
+    market_hash_name TEXT,
+    PRIMARY KEY (tradeid, direction, assetid)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_time ON trades (time_init);
+CREATE INDEX IF NOT EXISTS idx_trade_assets_assetid ON trade_assets (assetid);
+CREATE INDEX IF NOT EXISTS idx_trade_assets_new_assetid ON trade_assets (new_assetid);
+"""
+
+
+class TradeHistoryStore:
+    """
+    基于 SQLite 的本地交易历史
+      - 通过 GetTradeHistory 增量同步, 只请求上次同步之后的新交易
+      - 报价接受后由 TradeDeltaWorker 直接写入该笔交易, 无需等待下次同步
+      - 按 tradeid、assetid 与时间建立索引, 可在本地查询某个资产的去向或最近一段时间的交易
+    """
+
+    PAGE_SIZE = 100
+    INITIAL_SYNC_DAYS = 30
+
+    def __init__(self, steamid: str, path: str = None):
+        self.steamid = str(steamid)
+        self.path = path or os.path.join(CACHE_FOLDER, f"trade_history_{self.steamid}.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def sync(self, steam_client: SteamClient) -> int:
+        """
+        与Steam同步交易历史, 返回新写入的交易数量
+        从未同步过时向前获取最近 INITIAL_SYNC_DAYS 天的交易, 否则只获取上次同步位置之后的交易
+        同步位置取自 GetTradeHistory 实际返回的最新交易, 不受 record_trade 写入的单笔交易影响, 避免尚未同步的交易被跳过
+        """
+        cursor = self._get_sync_cursor()
+        if cursor is None:
+            count, newest = self._sync_backward(steam_client, int(time.time()) - self.INITIAL_SYNC_DAYS * 86400)
+        else:
+            count, newest = self._sync_forward(steam_client, cursor["time_init"], cursor["tradeid"])
+        if newest is not None:
+            self._set_sync_cursor(newest)
+        return count
+
+    def record_trade(self, trade: dict, descriptions: List[dict] = None) -> bool:
+        """写入一笔已知的交易(例如 GetTradeStatus 的结果)"""
+        return self._store_trades([trade], descriptions or []) == 1
+
+    def _get_sync_cursor(self) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = 'cursor'").fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def _set_sync_cursor(self, trade: dict):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state VALUES ('cursor', ?)", (json.dumps({"time_init": trade["time_init"], "tradeid": trade["tradeid"]}),))
+
+    @staticmethod
+    def _newest(trades: List[dict], current: Optional[dict] = None) -> Optional[dict]:
+        candidates = list(trades) + ([current] if current else [])
+        if not candidates:
+            return None
+        return max(candidates, key=lambda trade: (int(trade["time_init"]), int(trade["tradeid"])))
+
+    def _sync_forward(self, steam_client: SteamClient, start_after_time: int, start_after_tradeid: str) -> Tuple[int, Optional[dict]]:
+        """返回 (写入数量, 本次从Steam获取到的最新交易)"""
+        count = 0
+        newest = None
+        while True:
+            response = self._fetch(steam_client, start_after_time, start_after_tradeid, navigating_back=True)
+            trades = response.get("trades", [])
+            count += self._store_trades(trades, response.get("descriptions", []))
+            newest = self._newest(trades, newest)
+            if not response.get("more") or not trades:
+                break
+            start_after_time, start_after_tradeid = newest["time_init"], newest["tradeid"]
+        if count:
+            logger.debug(f"同步了{count}笔新交易")
+        return count, newest
+
+    def _sync_backward(self, steam_client: SteamClient, oldest_time: int) -> Tuple[int, Optional[dict]]:
+        """返回 (写入数量, 本次从Steam获取到的最新交易)"""
+        count = 0
+        newest = None
+        start_after_time, start_after_tradeid = None, None
+        while True:
+            response = self._fetch(steam_client, start_after_time, start_after_tradeid, navigating_back=False)
+            trades = [trade for trade in response.get("trades", []) if int(trade["time_init"]) >= oldest_time]
+            count += self._store_trades(trades, response.get("descriptions", []))
+            newest = self._newest(trades, newest)
+            if not response.get("more") or not trades or len(trades) < len(response.get("trades", [])):
+                break
+            oldest = min(trades, key=lambda trade: (int(trade["time_init"]), int(trade["tradeid"])))
+            start_after_time, start_after_tradeid = oldest["time_init"], oldest["tradeid"]
+        logger.debug(f"首次同步交易历史完成, 共{count}笔交易")
+        return count, newest
+
+    # GetTradeHistory 默认从新到旧翻页, navigating_back=True 表示获取起点之后(更新)的交易
+    def _fetch(self, steam_client: SteamClient, start_after_time, start_after_tradeid, navigating_back: bool) -> dict:
+        response = steam_client.get_trade_history(
+            max_trades=self.PAGE_SIZE,
+            start_after_time=start_after_time,
+            start_after_tradeid=start_after_tradeid,
+            get_descriptions=True,
+            navigating_back=navigating_back,
+            include_failed=True,
+            include_total=False,
+        )
+        return response.get("response", {})
+
+    def _store_trades(self, trades: List[dict], descriptions: List[dict]) -> int:
+        if not trades:
+            return 0
+        description_cache.put_many(descriptions)
+        names = {make_description_key(description): description.get("market_hash_name") for description in descriptions}
+        trade_rows = []
+        asset_rows = []
+        for trade in trades:
+            trade_rows.append((str(trade["tradeid"]), trade.get("steamid_other"), int(trade["time_init"]), trade.get("status"), json.dumps(trade)))
+            for direction in ("received", "given"):
+                for asset in trade.get("assets_" + direction, []):
+                    key = make_description_key(asset) if "classid" in asset else None
+                    asset_rows.append(
+                        (
+                            str(trade["tradeid"]),
+                            direction,
+                            str(asset.get("appid")),
+                            asset.get("contextid"),
+                            asset.get("assetid"),
+                            asset.get("new_assetid"),
+                            asset.get("new_contextid"),
+                            asset.get("classid"),
+                            asset.get("instanceid"),
+                            asset.get("amount"),
+                            names.get(key) if key else None,
+                        )
+                    )
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO trades VALUES (?, ?, ?, ?, ?)", trade_rows)
+                self._conn.executemany("INSERT OR REPLACE INTO trade_assets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", asset_rows)
+        except sqlite3.Error as e:
+            handle_caught_exception(e, known=True)
+            logger.error("写入交易历史失败")
+            return 0
+        return len(trade_rows)
+
+    def get_latest_trade(self) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT tradeid, time_init FROM trades ORDER BY time_init DESC, CAST(tradeid AS INTEGER) DESC LIMIT 1").fetchone()
+        return dict(row) if row else None
+
+    def get_trade(self, tradeid: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT raw FROM trades WHERE tradeid = ?", (str(tradeid),)).fetchone()
+        return json.loads(row["raw"]) if row else None
+
+    def get_trades_since(self, hours: float) -> List[dict]:
+        """最近 hours 小时内的交易, 按时间从新到旧排列"""
+        since = int(time.time() - hours * 3600)
+        with self._lock:
+            rows = self._conn.execute("SELECT raw FROM trades WHERE time_init >= ? ORDER BY time_init DESC", (since,)).fetchall()
+        return [json.loads(row["raw"]) for row in rows]
+
+    def get_asset_history(self, assetid: str) -> List[dict]:
+        """
+        资产的流转记录, 按时间顺序排列
+        交易后资产会获得新的 assetid, 这里沿 assetid -> new_assetid 双向追踪整条链路
+        """
+        seen = set()
+        frontier = [str(assetid)]
+        records = {}
+        with self._lock:
+            while frontier:
+                current = frontier.pop()
+                if current in seen:
+                    continue
+                seen.add(current)
+                rows = self._conn.execute(
+                    "SELECT a.*, t.time_init, t.status, t.steamid_other FROM trade_assets a JOIN trades t ON a.tradeid = t.tradeid "
+                    "WHERE a.assetid = ? OR a.new_assetid = ?",
+                    (current, current),
+                ).fetchall()
+                for row in rows:
+                    record = dict(row)
+                    records[(record["tradeid"], record["direction"], record["assetid"])] = record
+                    for linked in (record["assetid"], record["new_assetid"]):
+                        if linked and linked not in seen:
+                            frontier.append(linked)
+        return sorted(records.values(), key=lambda record: record["time_init"])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_trade_history_store(steamid: str) -> TradeHistoryStore:
+    steamid = str(steamid)
+    with trade_history_stores_lock:
+        if steamid not in trade_history_stores:
+            trade_history_stores[steamid] = TradeHistoryStore(steamid)
+        return trade_history_stores[steamid]
@@ -1,17 +1,34 @@
 import base64
+import threading
+
 from Crypto.Cipher import AES, PKCS1_v1_5
 from Crypto.PublicKey import RSA
 from Crypto.Util.Padding import pad, unpad
 
+PUBLIC_KEY = """-----BEGIN PUBLIC KEY-----\nMIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEAv9BDdhCDahZNFuJeesx3gzoQfD7pE0AeWiNBZlc21ph6kU9zd58X/1warV3C1VIX0vMAmhOcj5u86i+L2Lb2V68dX2Nb70MIDeW6Ibe8d0nF8D30tPsM7kaAyvxkY6ECM6RHGNhV4RrzkHmf5DeR9bybQGE0A9jcjuxszD1wsW/n19eeom7MroHqlRorp5LLNR8bSbmhTw6M/RQ/Fm3lKjKcvs1QNVyBNimrbD+ZVPE/KHSZLQ1jdF6tppvFnGxgJU9NFmxGFU0hx6cZiQHkhOQfGDFkElxgtj8gFJ1narTwYbvfe5nGSiznv/EUJSjTHxzX1TEkex0+5j4vSANt1QIDAQAB\n-----END PUBLIC KEY-----"""
+
+_rsa_cipher = None
+_rsa_cipher_lock = threading.Lock()
+
+
+def get_rsa_cipher():
+    """公钥只导入一次, 之后复用同一个 RSA 加密对象"""
+    global _rsa_cipher
+    with _rsa_cipher_lock:
+        if _rsa_cipher is None:
+            _rsa_cipher = PKCS1_v1_5.new(RSA.import_key(PUBLIC_KEY))
+        return _rsa_cipher
+
+
 class UUApiCrypt:
     def __init__(self, aes_key):
         self.aes_key = aes_key.encode("utf-8")
-        self.public_key = """-----BEGIN PUBLIC KEY-----\nMIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEAv9BDdhCDahZNFuJeesx3gzoQfD7pE0AeWiNBZlc21ph6kU9zd58X/1warV3C1VIX0vMAmhOcj5u86i+L2Lb2V68dX2Nb70MIDeW6Ibe8d0nF8D30tPsM7kaAyvxkY6ECM6RHGNhV4RrzkHmf5DeR9bybQGE0A9jcjuxszD1wsW/n19eeom7MroHqlRorp5LLNR8bSbmhTw6M/RQ/Fm3lKjKcvs1QNVyBNimrbD+ZVPE/KHSZLQ1jdF6tppvFnGxgJU9NFmxGFU0hx6cZiQHkhOQfGDFkElxgtj8gFJ1narTwYbvfe5nGSiznv/EUJSjTHxzX1TEkex0+5j4vSANt1QIDAQAB\n-----END PUBLIC KEY-----"""
+        self.public_key = PUBLIC_KEY
 
     def get_encrypted_aes_key(self):
-        public_key = RSA.import_key(self.public_key)
-        cipher_rsa = PKCS1_v1_5.new(public_key)
-        encrypted_aes_key = cipher_rsa.encrypt(self.aes_key)
+        cipher_rsa = get_rsa_cipher()
+        with _rsa_cipher_lock:
+            encrypted_aes_key = cipher_rsa.encrypt(self.aes_key)
         encrypted_aes_key_base64 = base64.b64encode(encrypted_aes_key).decode("utf-8")
         return encrypted_aes_key_base64
     
@@ -1,19 +1,31 @@
 from __future__ import annotations
 
 import json
+import logging
 import random
 import string
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 
+from steampy.rate_limit import TokenBucket
 from uuyoupinapi.UUApiCrypt import UUApiCrypt
-from utils.logger import PluginLogger
+from uuyoupinapi.offer_cache import OfferIdCache
+from uuyoupinapi.uk_provider import UKProvider
+from utils.logger import PluginLogger, handle_caught_exception
 from uuyoupinapi import models
 
 logger = PluginLogger("uuyoupinapi")
 
+# 悠悠接口的请求速率(请求数每秒), 用于并发查询时的限速
+UU_RATE_LIMIT = {"rate": 1.0, "min_rate": 0.2, "max_rate": 3.0, "burst": 3}
+# 悠悠风控返回码, 以及触发风控后暂停请求的秒数
+UU_RISK_CONTROL_CODE = 84104
+UU_RISK_CONTROL_COOLDOWN = 10
+
 
 def generate_random_string(length):
     """
@@ -55,6 +67,48 @@ def is_json(data):
     return True
 
 
+_NOT_PARSED = object()
+
+
+class UUResponse:
+    """
+    call_api 返回的响应, 响应体只解析一次并缓存, 多次调用 json() 不会重复解析
+    其余属性(status_code、text、headers 等)转发给原始的 requests.Response
+    """
+
+    def __init__(self, response: requests.Response):
+        self.response = response
+        try:
+            self._json = json.loads(response.content)
+        except Exception:
+            self._json = _NOT_PARSED
+
+    @property
+    def is_json(self) -> bool:
+        return self._json is not _NOT_PARSED
+
+    def json(self, **kwargs):
+        if self._json is _NOT_PARSED:
+            return self.response.json(**kwargs)
+        return self._json
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+
+_uk_provider = None
+_uk_provider_lock = threading.Lock()
+
+
+def get_uk_provider() -> UKProvider:
+    """所有 UUAccount 共享的UK提供者, UK 与账号无关"""
+    global _uk_provider
+    with _uk_provider_lock:
+        if _uk_provider is None:
+            _uk_provider = UKProvider(lambda: UUAccount.get_uu_uk())
+        return _uk_provider
+
+
 class UUAccount:
     def __init__(self, token: str, deviceToken="", proxy=None):
         """
@@ -72,6 +126,7 @@ class UUAccount:
             }
             logger.info("UU使用代理：" + str(proxy))
         random.seed(token)
+        self.rate_budget = TokenBucket(**UU_RATE_LIMIT)
         self.deviceToken = deviceToken
         self.session.headers.update(generate_headers(deviceToken, deviceToken, token=token))
         try:
@@ -80,6 +135,7 @@ class UUAccount:
             self.userId = info["Data"]["UserId"]
         except KeyError:
             raise Exception("悠悠有品账号登录失败，请检查token是否正确")
+        self.offer_id_cache = OfferIdCache(self.userId)
 
     @staticmethod
     def __random_str(length):
@@ -172,14 +228,21 @@ class UUAccount:
             },
         )
 
-    def call_api(self, method, path, data=None, uk_verify=False, pc_platform=False):
+    def set_rate_limit(self, rate: float):
+        """设置并发查询使用的请求速率(请求数每秒), 触发风控时会自动降速, 之后逐渐恢复到该速率"""
+        self.rate_budget = TokenBucket(**dict(UU_RATE_LIMIT, rate=rate, max_rate=rate, min_rate=min(UU_RATE_LIMIT["min_rate"], rate)))
+
+    def call_api(self, method, path, data=None, uk_verify=False, pc_platform=False, budgeted=False) -> UUResponse:
         """
         调用API
         :param method: GET, POST, PUT, DELETE
         :param path: 请求路径
         :param data: 发送的数据
+        :param budgeted: 是否受 rate_budget 限速, 返回风控码时自动降速
         :return:
         """
+        if budgeted:
+            self.rate_budget.acquire()
         url = "https://api.youpin898.com" + path
         if pc_platform:
             self.session.headers["platform"] = "pc"
@@ -190,29 +253,11 @@ class UUAccount:
             if "uk" in self.session.headers:
                 self.session.headers.pop("uk")
         else:
-            try:
-
-                if not hasattr(self, "uk") or not hasattr(self, "uk_time") or (time.time() - self.uk_time > 30):
-                    if not hasattr(self, "uk"):
-                        logger.debug("UK缓存不存在，尝试获取悠悠校验参数...")
-                    else:
-                        logger.debug("UK缓存已过期或时间戳无效，尝试获取悠悠校验参数...")
-
-                    fetched_uk = UUAccount.get_uu_uk()
-                    if fetched_uk:
-                        self.uk = fetched_uk
-                        self.uk_time = time.time()
-                        self.session.headers["uk"] = self.uk
-                        logger.debug(f"获取悠悠校验参数成功，已缓存。下次刷新时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.uk_time + 30))}")
-                    else:
-                        logger.error("获取悠悠校验参数失败。本次请求将使用随机生成的UK，且不进行缓存")
-                        self.session.headers["uk"] = generate_random_string(65)
-                else:
-                    self.session.headers["uk"] = self.uk
-                    logger.debug("使用已缓存的悠悠校验参数，下次刷新时间: " + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.uk_time + 30)))
-
-            except Exception as e:
-                logger.warning(f"获取或处理悠悠校验参数时发生错误: {e}。本次请求将使用随机生成的UK，且不进行缓存")
+            uk = get_uk_provider().get()
+            if uk:
+                self.session.headers["uk"] = uk
+            else:
+                logger.error("获取悠悠校验参数失败。本次请求将使用随机生成的UK")
                 self.session.headers["uk"] = generate_random_string(65)
 
         if method == "GET":
@@ -225,19 +270,28 @@ class UUAccount:
             response = self.session.delete(url)
         else:
             raise Exception("Method not supported")
-        log_output = response.content.decode()
-        if is_json(log_output):
-            json_output = json.loads(log_output)
-            log_output = json.dumps(json_output, ensure_ascii=False)
-            logger.debug(f"{method} {path} {json.dumps(data)} {log_output}")
-
-            if json_output.get("code") == 84101:
+        response = UUResponse(response)
+        # 响应体可能很大, 只有日志确实会输出 DEBUG 级别时才序列化
+        log_enabled = logger.isEnabledFor(logging.DEBUG)
+        if response.is_json:
+            json_output = response.json()
+            if log_enabled:
+                logger.debug(f"{method} {path} {json.dumps(data)} {json.dumps(json_output, ensure_ascii=False)}")
+
+            if isinstance(json_output, dict) and json_output.get("code") == 84101:
                 raise Exception("登录状态失效，请重新登录")
+            if budgeted:
+                if isinstance(json_output, dict) and UU_RISK_CONTROL_CODE in (json_output.get("code"), json_output.get("Code")):
+                    logger.warning(f"悠悠风控，降低请求速率，{UU_RISK_CONTROL_COOLDOWN}秒后继续")
+                    self.rate_budget.on_throttle(UU_RISK_CONTROL_COOLDOWN)
+                else:
+                    self.rate_budget.on_success()
         elif response.status_code == 405:
             logger.error("悠悠UK令牌失效，等待一分钟程序继续运行")
             time.sleep(60)
         else:
-            logger.debug(f"{method} {path} {json.dumps(data)} {log_output}")
+            if log_enabled:
+                logger.debug(f"{method} {path} {json.dumps(data)} {response.content.decode(errors='replace')}")
             raise Exception(f"网络错误，或服务器被悠悠屏蔽！请求失败！")
 
         return response
@@ -349,6 +403,75 @@ class UUAccount:
         :param game_id: 游戏ID，默认为730(CSGO)
         :return: 待发货列表，格式为[{'order_id': '订单号', 'item_name': '物品名称', 'offer_id': 'steam交易报价号'}... , ...]
         """
+        return list(self.iter_wait_deliver_list(game_id))
+
+    def iter_wait_deliver_list(self, game_id=730, max_workers=4):
+        """
+        以生成器形式返回待发货订单, 格式同 get_wait_deliver_list
+        报价号的获取顺序: 本地缓存 -> 出售列表 -> 并发查询订单详情(受 rate_budget 限速)
+        已获取到报价号的订单会立即返回, 调用方无需等待所有订单查询完成即可开始发货
+        """
+        toDoList = self._get_todo_orders()
+        active_order_nos = list(toDoList.keys())
+        # 本地缓存中已有报价号的订单直接返回
+        for order_no in list(toDoList.keys()):
+            cached = self.offer_id_cache.get(order_no)
+            if cached:
+                del toDoList[order_no]
+                yield {"order_id": order_no, "offer_id": cached["offer_id"], "item_name": cached["item_name"]}
+        # 傻逼悠悠有3种获取报价ID的方式
+        if len(toDoList.keys()) != 0:
+            page_index = 1
+            page_size = 20
+            while True:
+                data = self.call_api(
+                    "POST",
+                    "/api/youpin/bff/trade/sale/v1/sell/list",
+                    data={
+                        "keys": "",
+                        "orderStatus": "140",
+                        "pageIndex": page_index,
+                        "pageSize": page_size,
+                    },
+                ).json()["data"]
+                order_list = data.get("orderList", [])
+                for order in order_list:
+                    if int(order["offerType"]) == 2:
+                        if order["tradeOfferId"] is not None:
+                            item_name = order["productDetail"]["commodityName"]
+                            # 只返回仍在待发货列表中且尚未返回过的订单
+                            if order["orderNo"] in toDoList.keys():
+                                del toDoList[order["orderNo"]]
+                                self.offer_id_cache.put(order["orderNo"], order["tradeOfferId"], item_name)
+                                yield {"order_id": order["orderNo"], "offer_id": order["tradeOfferId"], "item_name": item_name}
+                if len(order_list) == page_size:
+                    page_index += 1
+                    self.rate_budget.acquire()
+                    continue
+                break
+        # 剩余订单并发查询订单详情
+        if len(toDoList.keys()) != 0:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(toDoList)))) as executor:
+                futures = {executor.submit(self._resolve_offer_id, order_no): order_no for order_no in toDoList.keys()}
+                for future in as_completed(futures):
+                    order_no = futures[future]
+                    try:
+                        resolved = future.result()
+                    except Exception as e:
+                        handle_caught_exception(e, "uuyoupinapi", known=True)
+                        continue
+                    if resolved:
+                        del toDoList[order_no]
+                        self.offer_id_cache.put(order_no, resolved["offer_id"], resolved["item_name"])
+                        yield resolved
+        self.offer_id_cache.prune(active_order_nos)
+        self.offer_id_cache.save()
+        if len(toDoList.keys()) != 0:
+            logger.warning(
+                "[UUAutoAcceptOffer] 有订单未能获取到Steam交易报价号，订单号为：" + str(toDoList.keys()),
+            )
+
+    def _get_todo_orders(self) -> dict:
         page_index = 1
         page_size = 20
         toDoList = dict()
@@ -387,90 +510,39 @@ class UUAccount:
                     toDoList[order["orderNo"]] = order
             if len(current_list) == page_size:
                 page_index += 1
-                time.sleep(0.5)
+                self.rate_budget.acquire()
                 continue
             break
-        data_to_return = []
-        # 傻逼悠悠有3种获取报价ID的方式
-        if len(toDoList.keys()) != 0:
-            page_index = 1
-            page_size = 20
-            while True:
-                data = self.call_api(
-                    "POST",
-                    "/api/youpin/bff/trade/sale/v1/sell/list",
-                    data={
-                        "keys": "",
-                        "orderStatus": "140",
-                        "pageIndex": page_index,
-                        "pageSize": page_size,
-                    },
-                ).json()["data"]
-                order_list = data.get("orderList", [])
-                for order in order_list:
-                    if int(order["offerType"]) == 2:
-                        if order["tradeOfferId"] is not None:
-                            if order["orderNo"] in toDoList.keys():
-                                del toDoList[order["orderNo"]]
-                            data_to_return.append(
-                                {
-                                    "offer_id": order["tradeOfferId"],
-                                    "item_name": order["productDetail"]["commodityName"],
-                                }
-                            )
-                if len(order_list) == page_size:
-                    page_index += 1
-                    time.sleep(0.5)
-                    continue
-                break
-        if len(toDoList.keys()) != 0:
-            for order in list(toDoList.keys()):
-                time.sleep(3)
-                orderDetail = self.call_api(
-                    "POST",
-                    "/api/youpin/bff/order/v2/detail",
-                    data={
-                        "orderId": order,
-                        "Sessionid": self.deviceToken,
-                    },
-                ).json()
-                if orderDetail["data"] and "orderDetail" in orderDetail["data"]:
-                    orderDetail = orderDetail["data"]["orderDetail"]
-                    if "offerId" in orderDetail:
-                        data_to_return.append(
-                            {
-                                "offer_id": orderDetail["offerId"],
-                                "item_name": orderDetail["productDetail"]["commodityName"],
-                            }
-                        )
-                        if order in toDoList.keys():
-                            del toDoList[order]
-        if len(toDoList.keys()) != 0:
-            for order in list(toDoList.keys()):
-                time.sleep(3)
-                orderDetail = self.call_api(
-                    "POST",
-                    "/api/youpin/bff/trade/v1/order/query/detail",
-                    data={
-                        "orderNo": order,
-                        "Sessionid": self.deviceToken,
-                    },
-                ).json()
-                orderDetail = orderDetail["data"]
-                if orderDetail and "tradeOfferId" in orderDetail and "系统验证中" not in str(orderDetail):
-                    data_to_return.append(
-                        {
-                            "offer_id": orderDetail["tradeOfferId"],
-                            "item_name": orderDetail["commodity"]["name"],
-                        }
-                    )
-                    if order in toDoList.keys():
-                        del toDoList[order]
-        if len(toDoList.keys()) != 0:
-            logger.warning(
-                "[UUAutoAcceptOffer] 有订单未能获取到Steam交易报价号，订单号为：" + str(toDoList.keys()),
-            )
-        return data_to_return
+        return toDoList
+
+    def _resolve_offer_id(self, order_no) -> dict | None:
+        """依次通过两个订单详情接口查询报价号, 请求受 rate_budget 限速"""
+        orderDetail = self.call_api(
+            "POST",
+            "/api/youpin/bff/order/v2/detail",
+            data={
+                "orderId": order_no,
+                "Sessionid": self.deviceToken,
+            },
+            budgeted=True,
+        ).json()
+        if orderDetail["data"] and "orderDetail" in orderDetail["data"]:
+            orderDetail = orderDetail["data"]["orderDetail"]
+            if "offerId" in orderDetail:
+                return {"order_id": order_no, "offer_id": orderDetail["offerId"], "item_name": orderDetail["productDetail"]["commodityName"]}
+        orderDetail = self.call_api(
+            "POST",
+            "/api/youpin/bff/trade/v1/order/query/detail",
+            data={
+                "orderNo": order_no,
+                "Sessionid": self.deviceToken,
+            },
+            budgeted=True,
+        ).json()
+        orderDetail = orderDetail["data"]
+        if orderDetail and "tradeOfferId" in orderDetail and "系统验证中" not in str(orderDetail):
+            return {"order_id": order_no, "offer_id": orderDetail["tradeOfferId"], "item_name": orderDetail["commodity"]["name"]}
+        return None
 
     def get_sell_list(self):
         data = {"pageIndex": 0, "pageSize": 100, "whetherMerge": 0}
@@ -602,8 +674,34 @@ class UUAccount:
 
         return inventory_list
 
-    def get_market_lease_price(self, template_id: int, min_price=0, max_price=20000, cnt=15, sortTypeKey="LEASE_DEFAULT") -> list[models.UUMarketLeaseItem]:
-        rsp = self.call_api(
+    def get_market_lease_price(self, template_id: int, min_price=0, max_price=20000, cnt=15, sortTypeKey="LEASE_DEFAULT", max_retries=3) -> list[models.UUMarketLeaseItem]:
+        for _ in range(max_retries):
+            rsp = self._query_market_lease_list(template_id, sortTypeKey)
+            # 触发风控时 rate_budget 已经降速, 直接重试即可
+            if rsp["Code"] != UU_RISK_CONTROL_CODE:
+                break
+        lease_list = []
+        if rsp["Code"] == 0:
+            rsp_list = rsp["Data"]["CommodityList"]
+            rsp_cnt = len(rsp_list)
+            cnt = min(cnt, rsp_cnt)
+            for i in range(cnt):
+                item = rsp_list[i]
+                if item["LeaseDeposit"] and min_price < float(item["LeaseDeposit"]) < max_price:
+                    lease_list.append(
+                        models.UUMarketLeaseItem(
+                            LeaseUnitPrice=item["LeaseUnitPrice"] if item["LeaseUnitPrice"] else None,
+                            LongLeaseUnitPrice=item["LongLeaseUnitPrice"] if item["LongLeaseUnitPrice"] else None,
+                            LeaseDeposit=item["LeaseDeposit"] if item["LeaseDeposit"] else None,
+                            CommodityName=item["CommodityName"],
+                        )
+                    )
+        else:
+            logger.error(f"查询出租价格失败，返回结果：{rsp['Code']}，全部内容：{rsp}")
+        return lease_list
+
+    def _query_market_lease_list(self, template_id: int, sortTypeKey="LEASE_DEFAULT") -> dict:
+        return self.call_api(
             "POST",
             "/api/homepage/v3/detail/commodity/list/lease",
             data={
@@ -624,26 +722,8 @@ class UUAccount:
                 "userId": self.userId,
                 "Sessionid": self.deviceToken,
             },
+            budgeted=True,
         ).json()
-        lease_list = []
-        if rsp["Code"] == 0:
-            rsp_list = rsp["Data"]["CommodityList"]
-            rsp_cnt = len(rsp_list)
-            cnt = min(cnt, rsp_cnt)
-            for i in range(cnt):
-                item = rsp_list[i]
-                if item["LeaseDeposit"] and min_price < float(item["LeaseDeposit"]) < max_price:
-                    lease_list.append(
-                        models.UUMarketLeaseItem(
-                            LeaseUnitPrice=item["LeaseUnitPrice"] if item["LeaseUnitPrice"] else None,
-                            LongLeaseUnitPrice=item["LongLeaseUnitPrice"] if item["LongLeaseUnitPrice"] else None,
-                            LeaseDeposit=item["LeaseDeposit"] if item["LeaseDeposit"] else None,
-                            CommodityName=item["CommodityName"],
-                        )
-                    )
-        else:
-            logger.error(f"查询出租价格失败，返回结果：{rsp['Code']}，全部内容：{rsp}")
-        return lease_list
 
     # def get_market_sale_list_with_abrade(self, template_id: int, pageIndex: int = 1, pageSize: int = 10, minAbrade: float | None = None, maxAbrade: float | None = None):
     #     """
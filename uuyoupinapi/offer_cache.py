@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+from typing import Iterable, Optional
+
+from utils.logger import PluginLogger, handle_caught_exception
+from utils.static import CACHE_FOLDER
+from utils.tools import atomic_write_json
+
+logger = PluginLogger("uuyoupinapi")
+
+
+class OfferIdCache:
+    """
+    持久化的 订单号 -> Steam交易报价号 缓存
+    报价号一旦获取到就不会再变化, 重启或下一轮轮询时无需再次查询订单详情
+    """
+
+    def __init__(self, user_id):
+        self.path = os.path.join(CACHE_FOLDER, f"uu_offer_ids_{user_id}.json")
+        self._data = {}  # orderNo -> {"offer_id": ..., "item_name": ...}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        except Exception as e:
+            handle_caught_exception(e, "uuyoupinapi", known=True)
+            logger.warning(f"读取报价号缓存失败, 将重新查询: {self.path}")
+            self._data = {}
+
+    def get(self, order_no: str) -> Optional[dict]:
+        with self._lock:
+            return self._data.get(str(order_no))
+
+    def put(self, order_no: str, offer_id: str, item_name: str):
+        with self._lock:
+            self._data[str(order_no)] = {"offer_id": str(offer_id), "item_name": item_name}
+            self._dirty = True
+
+    def invalidate(self, order_no: str):
+        """报价处理失败时移除缓存, 下次重新查询(悠悠可能已重新发送报价)"""
+        with self._lock:
+            if self._data.pop(str(order_no), None) is not None:
+                self._dirty = True
+
+    def prune(self, active_order_nos: Iterable[str]):
+        """只保留仍在待发货列表中的订单"""
+        active = {str(order_no) for order_no in active_order_nos}
+        with self._lock:
+            for order_no in list(self._data.keys()):
+                if order_no not in active:
+                    del self._data[order_no]
+                    self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self._data)
+            self._dirty = False
+        try:
+            atomic_write_json(self.path, data, ensure_ascii=False)
+        except Exception as e:
+            handle_caught_exception(e, "uuyoupinapi", known=True)
+            logger.warning(f"保存报价号缓存失败: {self.path}")
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from utils.logger import PluginLogger, handle_caught_exception
+
+logger = PluginLogger("uuyoupinapi")
+
+
+class UKProvider(threading.Thread):
+    """
+    悠悠校验参数(UK)提供者
+      - 后台线程在 UK 过期前提前获取新的 UK, 校验接口调用时不再同步等待 /api/deviceW2
+      - 保存一个小的 UK 池, 并发调用方轮流使用池中仍然有效的 UK
+      - 只在调用方持续使用 UK 时(最近一个有效期内被使用了不止一次)才提前刷新, 空闲后立即停止, 避免无意义的请求
+    """
+
+    # UK 有效期, 与原先的缓存时间一致
+    TTL = 30
+    # 距离过期还剩多少秒时开始刷新
+    REFRESH_LEAD = 8
+    # 统计调用方需求的时间窗口, 窗口内使用次数少于 MIN_DEMAND 时不提前刷新
+    DEMAND_WINDOW = TTL
+    MIN_DEMAND = 2
+
+    def __init__(self, fetch_func: Callable[[], str], pool_size: int = 2):
+        super().__init__(daemon=True)
+        self.fetch_func = fetch_func
+        self.pool_size = max(1, pool_size)
+        self._pool = deque()  # (uk, fetched_at), 按获取时间从旧到新排列
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._wakeup_event = threading.Event()
+        self._uses = deque()  # 最近 DEMAND_WINDOW 秒内调用方使用 UK 的时间
+        self._index = 0
+        self._start_lock = threading.Lock()
+
+    def get(self) -> Optional[str]:
+        """返回一个有效的 UK, 池中没有可用 UK 时同步获取一次, 获取失败返回 None"""
+        with self._lock:
+            self._uses.append(time.time())
+        uk = self._take_valid()
+        if uk is None:
+            logger.debug("UK池中没有可用的悠悠校验参数, 同步获取...")
+            uk = self._fetch_one(reuse_pooled=True)
+        with self._start_lock:
+            if not self.is_alive():
+                self.start()
+        self._wakeup_event.set()
+        return uk
+
+    def _take_valid(self) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            while self._pool and now - self._pool[0][1] >= self.TTL:
+                self._pool.popleft()
+            if not self._pool:
+                return None
+            self._index = (self._index + 1) % len(self._pool)
+            return self._pool[self._index][0]
+
+    def _fetch_one(self, reuse_pooled: bool = False) -> Optional[str]:
+        """
+        获取一个新的 UK 并放入池中
+        reuse_pooled 为 True 时(调用方同步获取), 拿到锁后先检查池中是否已有其他线程刚获取的 UK, 有则直接使用, 避免并发调用方重复请求
+        后台预取线程需要补足池的大小, 不复用池中的 UK
+        """
+        with self._fetch_lock:
+            if reuse_pooled:
+                uk = self._take_valid()
+                if uk is not None:
+                    return uk
+            try:
+                uk = self.fetch_func()
+            except Exception as e:
+                handle_caught_exception(e, "uuyoupinapi", known=True)
+                uk = None
+            if not uk:
+                return None
+            with self._lock:
+                self._pool.append((uk, time.time()))
+                while len(self._pool) > self.pool_size:
+                    self._pool.popleft()
+            return uk
+
+    def _demand(self) -> int:
+        """最近 DEMAND_WINDOW 秒内 UK 的使用次数"""
+        now = time.time()
+        with self._lock:
+            while self._uses and now - self._uses[0] > self.DEMAND_WINDOW:
+                self._uses.popleft()
+            return len(self._uses)
+
+    def _next_refresh_delay(self, demand: int) -> float:
+        # 池的目标大小随需求变化, 偶尔一次调用不会触发额外的预取
+        target = min(self.pool_size, demand)
+        with self._lock:
+            if len(self._pool) < target:
+                return 0
+            # 池已满时, 在最旧的 UK 即将过期时刷新
+            return max(0, self._pool[0][1] + self.TTL - self.REFRESH_LEAD - time.time())
+
+    def run(self):
+        while True:
+            demand = self._demand()
+            if demand < self.MIN_DEMAND:
+                # 没有持续的需求, 等待下一次调用唤醒; 池中剩余的 UK 过期后由调用方同步获取
+                self._wakeup_event.wait()
+                self._wakeup_event.clear()
+                continue
+            delay = self._next_refresh_delay(demand)
+            if delay > 0:
+                self._wakeup_event.wait(delay)
+                self._wakeup_event.clear()
+                continue
+            if self._fetch_one() is None:
+                # 获取失败时稍后再试, 期间调用方会回退到同步获取
+                time.sleep(5)
+            else:
+                # 错开池中各个 UK 的获取时间, 保证总有一个 UK 离过期较远
+                time.sleep(self.TTL / self.pool_size / 2)